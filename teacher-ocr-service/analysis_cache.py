@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+TTL cache of K.A.N.A. analysis results keyed by normalized OCR text.
+
+OCR output for the same worksheet differs in trivial ways between uploads
+(spacing, capitalization, a stray comma), so keys are built from the text
+with whitespace, case, quotes and sentence punctuation folded, plus the
+analysis context. Math stays significant: operators such as ``-``, ``/``,
+``%`` and ``!`` are kept, and so are ``.``, ``,`` and ``:`` between digits
+(``3.5``, ``1,000``, ``2:3``).
+Concurrent requests for the same key share one in-flight K.A.N.A. call
+(single-flight) instead of each paying for their own. Only successful
+analyses are stored; errors are handed to every waiter and then forgotten.
+"""
+import asyncio
+import copy
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HIT = "hit"
+MISS = "miss"
+COALESCED = "coalesced"
+
+_WHITESPACE = re.compile(r"\s+")
+# Sentence punctuation unless it sits between two digits, and quotation marks
+_SENTENCE_PUNCTUATION = re.compile(r"(?<!\d)[.,;:?]|[.,;:?](?!\d)|[\"\u2018\u2019\u201a\u201c\u201d\u201e\u00ab\u00bb]")
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, drop quotes and sentence punctuation and collapse whitespace"""
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    return _WHITESPACE.sub(" ", _SENTENCE_PUNCTUATION.sub(" ", folded)).strip()
+
+
+class AnalysisCache:
+    """In-memory LRU of analysis dictionaries that expire after ``ttl_seconds``"""
+
+    def __init__(self, ttl_seconds: float = 900.0, max_items: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max(1, max_items)
+        # key -> (expires_at, context, result)
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Bumped on invalidation so calls already in flight do not store stale results
+        self._generations: Counter = Counter()
+        self.stats = Counter()
+
+    @staticmethod
+    def make_key(text: str, context: str) -> str:
+        digest = hashlib.sha256(context.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_text(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _store(self, key: str, context: str, result: Dict[str, Any]):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, context, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_compute(self, text: str, context: str,
+                             compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], str]:
+        """Return ``(result, status)`` where status is hit, miss or coalesced.
+
+        Exceptions raised by ``compute`` propagate to the caller that started
+        it and to every caller coalesced onto it.
+        """
+        key = self.make_key(text, context)
+        cached = self._lookup(key)
+        if cached is not None:
+            self.stats[HIT] += 1
+            return copy.deepcopy(cached), HIT
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats[COALESCED] += 1
+            status = COALESCED
+        else:
+            self.stats[MISS] += 1
+            status = MISS
+            generation = (self._generations[context], self._generations[None])
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+
+            def finished(task: asyncio.Future):
+                self._inflight.pop(key, None)
+                if task.cancelled() or task.exception() is not None:
+                    return
+                if generation == (self._generations[context], self._generations[None]):
+                    self._store(key, context, task.result())
+
+            future.add_done_callback(finished)
+
+        # Shielded so one client disconnecting does not cancel the call for the others
+        result = await asyncio.shield(future)
+        return copy.deepcopy(result), status
+
+    def invalidate(self, context: Optional[str] = None) -> int:
+        """Drop every entry for ``context`` (or all entries); returns how many were removed"""
+        self._generations[context] += 1
+        if context is None:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            keys = [key for key, (_, entry_context, _) in self._entries.items() if entry_context == context]
+            for key in keys:
+                del self._entries[key]
+            removed = len(keys)
+        self.stats["invalidated"] += removed
+        logger.info(f"🧹 Invalidated {removed} cached analyses" + (f" for context {context!r}" if context else ""))
+        return removed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters for health/metrics endpoints"""
+        stats = {name: self.stats[name] for name in (HIT, MISS, COALESCED, "expired", "evictions", "invalidated")}
+        lookups = stats[HIT] + stats[MISS] + stats[COALESCED]
+        stats["entries"] = len(self._entries)
+        stats["in_flight"] = len(self._inflight)
+        stats["ttl_seconds"] = self.ttl_seconds
+        # Coalesced requests avoided a K.A.N.A. call too, so they count towards the hit ratio
+        stats["hit_ratio"] = round((stats[HIT] + stats[COALESCED]) / lookups, 3) if lookups else 0.0
+        return stats
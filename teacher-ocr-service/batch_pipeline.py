@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pipelined OCR -> K.A.N.A. analysis for a batch of uploads.
+
+Every file moves through two stages, each behind its own semaphore: OCR
+(bounded by ``ocr_concurrency``) and analysis (bounded by
+``analyze_concurrency``). A file enters analysis as soon as its OCR
+finishes, so the OCR workers move on to the next upload while K.A.N.A. is
+still thinking about the previous one. Results are yielded in completion
+order, which lets a class set of photos show its first result long before
+the last one is read.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+OCRStage = Callable[[str, Any], Awaitable[Dict[str, Any]]]
+AnalyzeStage = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+async def iter_batch_results(uploads: List[Tuple[str, Union[Any, Exception]]], ocr_file: OCRStage,
+                             analyze: AnalyzeStage, ocr_concurrency: int = 2,
+                             analyze_concurrency: int = 4) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one record per upload as it completes, then a summary record.
+
+    ``uploads`` holds ``(filename, upload)`` pairs; an exception in place of
+    the upload marks a file that was rejected at ingest and is reported as an
+    error straight away. ``ocr_file`` and ``analyze`` raise to fail a file.
+    """
+    start_time = time.time()
+    ocr_slots = asyncio.Semaphore(max(1, ocr_concurrency))
+    analyze_slots = asyncio.Semaphore(max(1, analyze_concurrency))
+    first_result_at = None
+    succeeded = 0
+
+    async def process(index: int, filename: str, upload: Any) -> Dict[str, Any]:
+        record = {"event": "result", "index": index, "filename": filename}
+        try:
+            if isinstance(upload, Exception):
+                raise upload
+
+            stage_start = time.time()
+            async with ocr_slots:
+                ocr = await ocr_file(filename, upload)
+            record["ocr_time"] = round(time.time() - stage_start, 4)
+
+            stage_start = time.time()
+            async with analyze_slots:
+                analysis = await analyze(filename, ocr)
+            record["analysis_time"] = round(time.time() - stage_start, 4)
+
+            record.update({"success": True, "ocr": ocr, "analysis": analysis})
+        except Exception as e:
+            # HTTPExceptions from ingest carry their message in ``detail``
+            error = getattr(e, "detail", None) or str(e)
+            logger.error(f"Batch file {filename} failed: {error}")
+            record.update({"event": "error", "success": False, "error": error})
+        return record
+
+    pending = {asyncio.ensure_future(process(index, filename, upload))
+               for index, (filename, upload) in enumerate(uploads)}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                record = task.result()
+                if first_result_at is None:
+                    first_result_at = time.time()
+                succeeded += record["success"]
+                yield record
+    finally:
+        for task in pending:
+            task.cancel()
+
+    yield {
+        "event": "done",
+        "files": len(uploads),
+        "succeeded": succeeded,
+        "failed": len(uploads) - succeeded,
+        "time_to_first_result": round(first_result_at - start_time, 4) if first_result_at else None,
+        "processing_time": round(time.time() - start_time, 4)
+    }
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass equation extractor against the legacy nine-pass
+``extract_equations`` from main_backup.py, on the sample texts of
+test/test_implementation_logic.py and on large synthetic pages.
+
+Usage: python benchmark_equations.py [--repeat 20] [--pages 1 10 100]
+"""
+import argparse
+import random
+import re
+import time
+from typing import List
+
+from equations import extract_equations
+
+# The sample texts from test/test_implementation_logic.py
+SAMPLE_TEXTS = [
+    "Solving quadratic equation: x² + 3x - 4 = 0. Using factoring method: (x + 4)(x - 1) = 0. Therefore x = -4 or x = 1.",
+    "Physics problem: A ball is thrown upward with initial velocity v₀ = 20 m/s. Find the maximum height using h = v₀²/(2g).",
+    "Chemistry: Balance the equation H₂ + O₂ → H₂O. Balanced: 2H₂ + O₂ → 2H₂O. Molar ratio 2:1:2",
+    "Find the derivative of f(x) = x³ + 2x² - 5x + 1. Answer: f'(x) = 3x² + 4x - 5",
+    "Student essay on Shakespeare's themes in Hamlet. The protagonist faces moral dilemmas..."
+]
+
+
+def legacy_extract_equations(text: str) -> List[str]:
+    """The nine-pattern implementation from main_backup.py, kept for comparison"""
+    if not text:
+        return []
+
+    equations = []
+    patterns = [
+        r'[a-z]\s*[²³⁴⁵⁶⁷⁸⁹]?\s*[+\-*/=]\s*[^.!?]*[=][^.!?]*',
+        r'[a-z]\s*[²³⁴⁵⁶⁷⁸⁹]\s*[+\-]\s*\d*[a-z]\s*[+\-]?\s*\d*',
+        r'[a-z]\s*[\^]\s*\d+',
+        r'[a-z]\s*[²³⁴⁵⁶⁷⁸⁹]',
+        r'\d+/\d+',
+        r'\(\s*\d+\s*[+\-*/]\s*\d+\s*\)\s*/\s*\d+',
+        r'[∫∑√±≤≥≠∞∂∆∇].*?[a-z0-9]',
+        r'[a-z]+\s*\(\s*[a-z0-9+\-*/\s,]+\s*\)',
+        r'\[\s*[0-9+\-*/\s,]+\s*\]',
+    ]
+    for pattern in patterns:
+        for match in re.findall(pattern, text, re.IGNORECASE | re.MULTILINE):
+            cleaned = match.strip()
+            if len(cleaned) > 2 and cleaned not in equations:
+                equations.append(cleaned)
+
+    equations = list(set(equations))
+    equations.sort(key=len, reverse=True)
+    return equations[:10]
+
+
+def synthetic_page(lines: int, math_ratio: float = 0.3, seed: int = 0) -> str:
+    """A page of OCR text where ``math_ratio`` of the lines hold expressions"""
+    rng = random.Random(seed)
+    words = ["the", "student", "wrote", "answer", "because", "therefore", "energy", "cell", "method", "solve"]
+    variables = ["x", "y", "a", "b", "n", "v₀", "θ"]
+    out = []
+    for _ in range(lines):
+        if rng.random() < math_ratio:
+            a, b, c = rng.randint(1, 9), rng.randint(1, 20), rng.randint(-20, 20)
+            v = rng.choice(variables)
+            out.append(rng.choice([
+                f"Solve {a}{v}² + {b}{v} - {abs(c)} = 0.",
+                f"f({v}) = {a}{v}³ - {b}{v} + {c}",
+                f"({v} + {a})({v} - {b}) = 0 so {v} = {b}",
+                f"ratio {a}/{b} and √({v}+{a})",
+            ]))
+        else:
+            out.append(" ".join(rng.choice(words) for _ in range(rng.randint(6, 14))) + ".")
+    return "\n".join(out)
+
+
+def time_call(fn, text: str, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    fn(text)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print("🧪 Equation extraction on the sample texts")
+    for i, text in enumerate(SAMPLE_TEXTS, 1):
+        print(f"  {i}. legacy: {legacy_extract_equations(text)}")
+        print(f"     single-pass: {extract_equations(text)}")
+
+    cases = [(f"sample {i}", text) for i, text in enumerate(SAMPLE_TEXTS, 1)]
+    cases += [(f"{pages} page(s), 40 lines each", synthetic_page(40 * pages)) for pages in args.pages]
+
+    print(f"\n🧪 Timing (best of {args.repeat} runs)")
+    print("(single = default limit of 10, stops early; full = limit=None, scans everything like legacy)")
+    print(f"{'input':<28} {'chars':>9} {'legacy ms':>10} {'single ms':>10} {'full ms':>9} {'speedup':>8}")
+    for name, text in cases:
+        legacy_ms = time_call(legacy_extract_equations, text, args.repeat)
+        single_ms = time_call(extract_equations, text, args.repeat)
+        full_ms = time_call(lambda t: extract_equations(t, limit=None), text, args.repeat)
+        print(f"{name:<28} {len(text):>9} {legacy_ms:>10.3f} {single_ms:>10.3f} {full_ms:>9.3f} "
+              f"{legacy_ms / full_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fused NumPy/OpenCV preprocessing kernel against the PIL
+ImageEnhance chain on the bundled test images.
+
+Usage: python benchmark_preprocessing.py [--repeat 20]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from main import PREPROCESS_CONTRAST, PREPROCESS_SHARPNESS, preprocess_image
+from preprocessing import preprocess_array
+
+SERVICE_DIR = Path(__file__).parent
+BUNDLED_IMAGES = [
+    "test_student_note.png",
+    "test_handwritten.jpg",
+    "comprehensive_student_work.png",
+    "debug_test.png",
+]
+
+
+def load_images():
+    """Bundled fixtures plus a phone-photo sized upscale of the largest one"""
+    images = {}
+    for name in BUNDLED_IMAGES:
+        try:
+            image = Image.open(SERVICE_DIR / name)
+            image.load()
+            images[name] = image
+        except Exception as e:
+            print(f"⚠️ Skipping {name}: {e}")
+
+    if images:
+        largest = max(images.values(), key=lambda im: im.size[0] * im.size[1])
+        images["12MP upscale"] = largest.resize((4000, 3000), Image.BICUBIC)
+    return images
+
+
+def pil_chain(image: Image.Image) -> np.ndarray:
+    return np.array(preprocess_image(image))
+
+
+def fused_kernel(image: Image.Image) -> np.ndarray:
+    return preprocess_array(image, PREPROCESS_CONTRAST, PREPROCESS_SHARPNESS)
+
+
+def time_call(fn, image, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    fn(image)  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(image)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print("🧪 Preprocessing benchmark (best of %d runs)" % args.repeat)
+    print(f"{'image':<32} {'size':>11} {'PIL ms':>9} {'fused ms':>9} {'speedup':>8} {'max diff':>9}")
+    for name, image in load_images().items():
+        pil_ms = time_call(pil_chain, image, args.repeat)
+        fused_ms = time_call(fused_kernel, image, args.repeat)
+        diff = np.abs(pil_chain(image).astype(np.int16) - fused_kernel(image).astype(np.int16)).max()
+        size = f"{image.size[0]}x{image.size[1]}"
+        print(f"{name:<32} {size:>11} {pil_ms:>9.2f} {fused_ms:>9.2f} {pil_ms / fused_ms:>7.1f}x {diff:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark OCR response encodings: serialization time and payload size of the
+current FastAPI JSON response against the columnar and packed binary forms,
+uncompressed and with gzip/brotli.
+
+Usage: python benchmark_response_formats.py [--boxes 50 300 1000] [--repeat 50]
+"""
+import argparse
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from response_formats import BROTLI_AVAILABLE, compress_body, encode_body
+
+WORDS = ["the", "photosynthesis", "x", "=", "2x+3", "equation", "Newton's", "energy", "cell", "answer:", "7"]
+
+
+def synthetic_page(box_count: int, seed: int = 0) -> dict:
+    """An /ocr response for a dense page of ``box_count`` text lines"""
+    rng = random.Random(seed)
+    boxes = []
+    for i in range(box_count):
+        x, y = rng.uniform(0, 2000), 20.0 + i * 28.5
+        w, h = rng.uniform(80, 900), rng.uniform(18, 30)
+        boxes.append({
+            "bbox": [[round(x, 2), round(y, 2)], [round(x + w, 2), round(y, 2)],
+                     [round(x + w, 2), round(y + h, 2)], [round(x, 2), round(y + h, 2)]],
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6))),
+            "confidence": rng.uniform(0.5, 1.0)
+        })
+    return {
+        "success": True,
+        "filename": "dense_page.png",
+        "text": " ".join(box["text"] for box in boxes),
+        "confidence": sum(box["confidence"] for box in boxes) / max(1, box_count),
+        "bounding_boxes": boxes,
+        "processing_time": 1.234,
+        "cached": False,
+        "scale_factor": 1.0,
+        "stage_timings": {"decode": 0.01, "detect": 0.5, "recognize": 0.7},
+        "message": "✅ Real OCR processing completed"
+    }
+
+
+def current_response(payload: dict) -> bytes:
+    """What /ocr did before: return a dict and let FastAPI encode it"""
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def time_call(fn, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--boxes", type=int, nargs="+", default=[50, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    encodings = [None, "gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    if not BROTLI_AVAILABLE:
+        print("⚠️ brotli not installed, skipping br")
+
+    print(f"🧪 Response encoding benchmark (best of {args.repeat} runs)")
+    print(f"{'boxes':>6} {'format':<10} {'encoding':<9} {'ms':>8} {'bytes':>9} {'vs current':>11}")
+    for box_count in args.boxes:
+        payload = synthetic_page(box_count)
+        baseline_bytes = len(current_response(payload))
+        baseline_ms = time_call(lambda: current_response(payload), args.repeat)
+        print(f"{box_count:>6} {'current':<10} {'-':<9} {baseline_ms:>8.3f} {baseline_bytes:>9} {'1.00x':>11}")
+
+        for fmt in ("json", "columnar", "binary"):
+            for encoding in encodings:
+                def encode():
+                    return compress_body(encode_body(payload, fmt), encoding)
+                ms = time_call(encode, args.repeat)
+                size = len(encode())
+                print(f"{box_count:>6} {fmt:<10} {encoding or '-':<9} {ms:>8.3f} {size:>9} "
+                      f"{baseline_bytes / size:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Benchmark every OCR pipeline stage on its own, with regression gates.
+
+Each fixture (the bundled sample images plus pages drawn by
+``create_test_image.py``) is run through decode, resize, the blank-margin
+crop, preprocessing, text detection, recognition, ``extract_equations`` and
+``detect_diagrams`` separately; every stage is timed over several runs on the same input. The
+character error rate of the recognized text against the text drawn on the
+fixture is recorded next to the latencies.
+
+``--save-baseline`` stores the results as JSON. Later runs are compared to
+the stored baseline and exit with status 1 when a stage's best time grows
+by more than ``--max-regression`` percent (and by more than
+``--min-delta-ms``, so sub-millisecond stages do not trip on noise), or when
+the error rate of a fixture rises by more than ``--max-cer-increase``.
+Baselines are only comparable on the same machine and OCR models, and with
+the same pipeline version: a baseline recorded before the pipeline changed
+(see ``ocr_settings``) fails the gate until it is refreshed.
+
+Usage:
+    python benchmark_stages.py --save-baseline
+    python benchmark_stages.py --max-regression 15
+    python benchmark_stages.py --stages detect recognize --repeat 10
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from create_test_image import STUDENT_WORK_TEXT, render_student_work
+from diagrams import detect_diagrams
+from equations import extract_equations
+from main import (DIAGRAM_MAX_SIDE, OCR_CROP_MARGINS, OCR_CROP_MIN_SAVING, OCR_CROP_PADDING, OCR_MAX_SIDE,
+                  OCR_MIN_SIDE, OCR_TARGET_TEXT_HEIGHT, decode_image, ocr_settings, prepare_image_array)
+from ocr_engine import create_ocr_engine, crop_text_region, detect_text_boxes, recognize_crops
+from preprocessing import crop_to_content, resize_for_ocr
+
+SERVICE_DIR = Path(__file__).parent
+DEFAULT_BASELINE = SERVICE_DIR / "benchmark_baseline.json"
+
+STAGES = ["decode", "resize", "crop", "preprocess", "detect", "recognize", "equations", "diagrams"]
+
+# Text drawn on the bundled fixtures (see test_full_endpoints.py and test_enhanced_analysis.py)
+STUDENT_NOTE_TEXT = """Intersectionality isn't necessarily duality.
+It is an understanding of multiple perspectives,
+bereft of any binary characteristics.
+
+Key concepts:
+- Multiple identities
+- Overlapping systems
+- Non-binary thinking"""
+
+COMPREHENSIVE_WORK_TEXT = """Math Problem Set - Algebra
+Student: Alex Chen
+
+1. Solve for x: 2x + 5 = 15
+   2x = 15 - 5
+   2x = 10
+   x = 5
+
+2. Simplify: (x + 3)(x - 2)
+   = x² - 2x + 3x - 6
+   = x² + x - 6
+
+Notes:
+- Remember to distribute carefully
+- Check answers by substitution
+- Need to practice factoring more"""
+
+BUNDLED_FIXTURES = {
+    "test_student_note.png": STUDENT_NOTE_TEXT,
+    "test_handwritten.jpg": None,
+    "comprehensive_student_work.png": COMPREHENSIVE_WORK_TEXT,
+}
+
+
+def encode(image: Image.Image, fmt: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def load_fixtures() -> Dict[str, Tuple[bytes, Optional[str]]]:
+    """Encoded image bytes and the reference text (None when unknown) per fixture"""
+    fixtures = {}
+    for name, reference in BUNDLED_FIXTURES.items():
+        data = (SERVICE_DIR / name).read_bytes()
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+        except Exception:
+            # test_handwritten.jpg is a text placeholder until a real scan is added
+            print(f"⚠️ Skipping {name}: not a readable image")
+            continue
+        fixtures[name] = (data, reference)
+
+    page = render_student_work()
+    fixtures["generated page (PNG)"] = (encode(page, "PNG"), STUDENT_WORK_TEXT)
+    # A phone-photo sized JPEG of the same page exercises decode and resize
+    photo = page.resize((page.width * 4, page.height * 4), Image.BICUBIC)
+    fixtures["generated photo (JPEG)"] = (encode(photo, "JPEG", quality=90), STUDENT_WORK_TEXT)
+    return fixtures
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def character_error_rate(recognized: str, reference: str) -> float:
+    """Levenshtein distance over the reference length, whitespace runs collapsed"""
+    recognized, reference = normalize_text(recognized), normalize_text(reference)
+    if not reference:
+        return 0.0 if not recognized else 1.0
+    previous = list(range(len(recognized) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, rec_char in enumerate(recognized, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != rec_char)))
+        previous = current
+    return previous[-1] / len(reference)
+
+
+def reading_order_text(boxes: List[list], texts: List[tuple]) -> str:
+    """Recognized lines joined top to bottom, left to right, as the service orders them"""
+    lines = sorted(zip(boxes, texts), key=lambda line: (line[0][0][1], line[0][0][0]))
+    return " ".join(text for _, (text, _) in lines)
+
+
+def time_stage(fn: Callable[[], Any], repeat: int) -> Tuple[Dict[str, float], Any]:
+    """Best, median and worst wall time in milliseconds, plus the last result"""
+    result = fn()  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    # Regressions are judged on the best run, which is least disturbed by other load
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(float(np.median(samples)), 3),
+        "max_ms": round(max(samples), 3)
+    }, result
+
+
+def benchmark_fixture(engine, data: bytes, reference: Optional[str], stages: List[str],
+                      repeat: int) -> Dict[str, Any]:
+    """Time each selected stage on one fixture, feeding it the previous stage's real output"""
+    timings = {}
+
+    def run(stage: str, fn: Callable[[], Any]) -> Any:
+        if stage in stages:
+            timings[stage], result = time_stage(fn, repeat)
+            return result
+        return fn()
+
+    decoded = run("decode", lambda: decode_image(data))
+    image = decoded.image
+    resized, _ = run("resize", lambda: resize_for_ocr(image, OCR_MAX_SIDE, OCR_TARGET_TEXT_HEIGHT, OCR_MIN_SIDE))
+    # Mirrors the service: with OCR_CROP_MARGINS off the stage passes the page through
+    cropped, _, area_skipped = run("crop", lambda: crop_to_content(resized, OCR_CROP_PADDING, OCR_CROP_MIN_SAVING)
+                                   if OCR_CROP_MARGINS else (resized, None, 0.0))
+    img_array = run("preprocess", lambda: prepare_image_array(cropped))
+    boxes = run("detect", lambda: detect_text_boxes(engine, img_array))
+    crops = [crop_text_region(img_array, box) for box in boxes]
+    texts = run("recognize", lambda: recognize_crops(engine, crops))
+    text = reading_order_text(boxes, texts)
+    # Equations are timed on the reference text so their input does not change with OCR quality
+    run("equations", lambda: extract_equations(reference or text))
+    # A budget far above the service's keeps the measurement from being capped
+    found = run("diagrams", lambda: detect_diagrams(img_array, DIAGRAM_MAX_SIDE, budget=10.0))
+
+    return {
+        "size": list(decoded.original_size),
+        "decoded_size": list(image.size),
+        "bytes": len(data),
+        "area_skipped": round(area_skipped, 4),
+        "regions": len(boxes),
+        "cer": round(character_error_rate(text, reference), 4) if reference is not None else None,
+        "diagrams": found["diagrams"],
+        "stages": timings
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float, min_delta_ms: float,
+            max_cer_increase: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` as printable lines"""
+    failures = []
+    for name, fixture in results["fixtures"].items():
+        old = baseline["fixtures"].get(name)
+        if old is None:
+            continue
+        for stage, timing in fixture["stages"].items():
+            before = old["stages"].get(stage, {}).get("min_ms")
+            if not before:
+                continue
+            after = timing["min_ms"]
+            if after - before > min_delta_ms and after > before * (1 + max_regression / 100):
+                failures.append(f"{name} / {stage}: {before:.2f} ms -> {after:.2f} ms "
+                                f"({(after - before) / before:+.0%})")
+        if fixture["cer"] is not None and old.get("cer") is not None:
+            if fixture["cer"] - old["cer"] > max_cer_increase:
+                failures.append(f"{name} / CER: {old['cer']:.3f} -> {fixture['cer']:.3f}")
+    return failures
+
+
+def baseline_is_stale(results: Dict[str, Any], baseline: Dict[str, Any]) -> bool:
+    """Whether the baseline was recorded by an older pipeline, whose stages saw different inputs"""
+    return baseline.get("config", {}).get("pipeline") != results["config"]["pipeline"]
+
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    stages = [stage for stage in STAGES if stage in results["config"]["stages"]]
+    print(f"\n{'fixture':<32} {'size':>11} " + " ".join(f"{stage:>10}" for stage in stages) + f" {'CER':>7}")
+    for name, fixture in results["fixtures"].items():
+        size = f"{fixture['size'][0]}x{fixture['size'][1]}"
+        cells = " ".join(f"{fixture['stages'][stage]['min_ms']:>10.2f}" for stage in stages)
+        cer = f"{fixture['cer']:>7.3f}" if fixture["cer"] is not None else f"{'-':>7}"
+        print(f"{name:<32} {size:>11} {cells} {cer}")
+        old = (baseline or {}).get("fixtures", {}).get(name)
+        if old:
+            changes = []
+            for stage in stages:
+                before = old["stages"].get(stage, {}).get("min_ms")
+                after = fixture["stages"][stage]["min_ms"]
+                changes.append(f"{(after - before) / before:>+10.0%}" if before else f"{'-':>10}")
+            print(f"{'  vs baseline':<32} {'':>11} " + " ".join(changes))
+    print("(best ms per stage)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage after one warm-up")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="allowed slowdown in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--max-cer-increase", type=float, default=0.02)
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    print("🧪 OCR stage benchmark (best of %d runs)" % args.repeat)
+    print("🔄 Loading OCR engine...")
+    engine = create_ocr_engine()
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {"repeat": args.repeat, "stages": args.stages, "ocr_max_side": OCR_MAX_SIDE,
+                   "crop_margins": OCR_CROP_MARGINS, "pipeline": ocr_settings()["pipeline"]},
+        "fixtures": {}
+    }
+    for name, (data, reference) in load_fixtures().items():
+        results["fixtures"][name] = benchmark_fixture(engine, data, reference, args.stages, args.repeat)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    print_results(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"💾 Baseline saved to {baseline_path}")
+        return
+    if baseline is None:
+        print(f"⚠️ No baseline at {baseline_path}; run with --save-baseline to create one")
+        return
+    if baseline.get("host") != results["host"]:
+        print("⚠️ Baseline was recorded on a different host; timings may not be comparable")
+    if baseline_is_stale(results, baseline):
+        print(f"\n❌ {baseline_path} predates pipeline version {results['config']['pipeline']}; "
+              f"refresh it with --save-baseline")
+        sys.exit(1)
+
+    failures = compare(results, baseline, args.max_regression, args.min_delta_ms, args.max_cer_increase)
+    if failures:
+        print(f"\n❌ {len(failures)} regression(s) against {baseline_path}:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\n✅ No stage slower than {args.max_regression:.0f}% over the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,8 @@ Create a test image for teacher dashboard testing
 from PIL import Image, ImageDraw, ImageFont
 import os
 
-def create_test_student_work():
-    """Create a realistic student work sample"""
-    
-    # Create image
-    width, height = 700, 500
-    image = Image.new('RGB', (width, height), 'white')
-    draw = ImageDraw.Draw(image)
-    
-    # Student work content
-    content = """Math Assignment - Quadratic Equations
+# Text drawn by render_student_work; the reference for OCR accuracy checks
+STUDENT_WORK_TEXT = """Math Assignment - Quadratic Equations
 Student: Sarah Johnson        Date: June 25, 2025
 
 Problem 1: Solve x² - 5x + 6 = 0
@@ -42,18 +34,27 @@ Notes:
 - Factoring is faster when possible
 - Always check solutions
 - Need to practice more with quadratic formula"""
+
+def render_student_work(content=STUDENT_WORK_TEXT, width=700, height=500):
+    """Draw student work text onto a white page"""
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
     
     try:
         # Try to use a nice font
         font = ImageFont.truetype("arial.ttf", 11)
-        title_font = ImageFont.truetype("arial.ttf", 14)
     except:
         # Fallback to default font
         font = ImageFont.load_default()
-        title_font = ImageFont.load_default()
     
     # Draw the content
     draw.multiline_text((30, 30), content, fill='#1a365d', font=font, spacing=4)
+    return image
+
+def create_test_student_work():
+    """Create a realistic student work sample"""
+    
+    image = render_student_work()
     
     # Save to downloads folder so it's easy to find
     downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
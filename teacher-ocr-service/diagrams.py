@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Budgeted diagram detection on a low-resolution image pyramid.
+
+The legacy ``detect_diagrams`` ran Canny, ``HoughLinesP`` and
+``HoughCircles`` on the full-resolution page after OCR had finished and then
+compared line pairs in a Python double loop. Lines and circles of a diagram
+survive heavy downscaling, so here the page is reduced to a small pyramid
+and searched coarse to fine:
+
+* handwriting is erased first: ink components smaller than a few text-line
+  heights in both directions are glyphs, and left alone their strokes, left
+  margins and baselines line up into segments, right angles and circles;
+* each class (figure, coordinate system, circle) is only checked until it is
+  confirmed - a finer level is visited only for classes still unconfirmed;
+* the perpendicular-axes test compares all long segments at once with NumPy;
+* a wall-clock budget is checked before every OpenCV call, so a slow page
+  returns what was found so far instead of delaying the response.
+
+The caller runs this in a thread next to text recognition.
+"""
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+GEOMETRIC_FIGURE = "geometric_figure"
+COORDINATE_SYSTEM = "coordinate_system"
+CIRCULAR_DIAGRAM = "circular_diagram"
+DIAGRAM_CLASSES = (GEOMETRIC_FIGURE, COORDINATE_SYSTEM, CIRCULAR_DIAGRAM)
+
+# More line segments than this make a page a figure rather than text
+MIN_FIGURE_LINES = 10
+# Radians off 90 degrees still accepted as a pair of axes
+PERPENDICULAR_TOLERANCE = 0.3
+# Ink components must span this many text-line heights both ways to count as drawing
+MIN_DRAWING_TEXT_HEIGHTS = 3.0
+
+
+def erase_text(gray: np.ndarray, min_text_heights: float = MIN_DRAWING_TEXT_HEIGHTS) -> np.ndarray:
+    """Copy of ``gray`` keeping only ink components large enough to be drawings.
+
+    The text-line height is the median height of glyph-sized components of
+    the Otsu-binarized page. A component survives when both its width and
+    height reach ``min_text_heights`` text heights (and 5% of the longest
+    side), so words and lines of text are erased while axes, figures and
+    circles are kept.
+    """
+    import cv2
+
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    widths, heights = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    side = max(gray.shape)
+    glyphs = (heights >= 2) & (heights < side / 8)
+    text_height = float(np.median(heights[glyphs])) if glyphs.any() else 0.0
+    min_extent = max(0.05 * side, min_text_heights * text_height)
+    drawings = np.flatnonzero((widths >= min_extent) & (heights >= min_extent)) + 1
+    return np.where(np.isin(labels, drawings), gray, 255).astype(np.uint8)
+
+
+def build_pyramid(rgb: np.ndarray, max_side: int = 512, levels: int = 2,
+                  without_text: bool = False) -> List[np.ndarray]:
+    """Grayscale levels, coarsest first, the finest no larger than ``max_side``"""
+    import cv2
+
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY) if rgb.ndim == 3 else rgb
+    longest = max(gray.shape[:2])
+    if longest > max_side:
+        scale = max_side / longest
+        size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    if without_text:
+        gray = erase_text(gray)
+
+    pyramid = [gray]
+    for _ in range(levels - 1):
+        if min(pyramid[0].shape[:2]) < 64:
+            break
+        pyramid.insert(0, cv2.pyrDown(pyramid[0]))
+    return pyramid
+
+
+def line_segments(gray: np.ndarray) -> np.ndarray:
+    """Straight segments as an (N, 4) array, with lengths scaled to the level size"""
+    import cv2
+
+    min_length = max(8, int(0.05 * max(gray.shape)))
+    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=max(15, min_length),
+                            minLineLength=min_length, maxLineGap=max(2, min_length // 5))
+    return np.empty((0, 4), dtype=np.int32) if lines is None else lines.reshape(-1, 4)
+
+
+def has_perpendicular_pair(segments: np.ndarray, max_segments: int = 32,
+                           tolerance: float = PERPENDICULAR_TOLERANCE) -> bool:
+    """Whether any two of the longest segments meet at roughly a right angle"""
+    if len(segments) < 2:
+        return False
+    deltas = (segments[:, 2:] - segments[:, :2]).astype(np.float64)
+    longest = np.argsort(-np.hypot(deltas[:, 0], deltas[:, 1]))[:max_segments]
+    angles = np.arctan2(deltas[longest, 1], deltas[longest, 0]) % np.pi
+    difference = np.abs(angles[:, None] - angles[None, :])
+    return bool(np.any(np.abs(difference - np.pi / 2) < tolerance))
+
+
+def has_circles(gray: np.ndarray) -> bool:
+    import cv2
+
+    side = max(gray.shape)
+    circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, 1, max(10, side // 25), param1=50, param2=30,
+                               minRadius=max(4, side // 60), maxRadius=max(8, side // 5))
+    return circles is not None
+
+
+def detect_diagrams(rgb: np.ndarray, max_side: int = 512, budget: float = 0.15,
+                    levels: int = 2) -> Dict[str, Any]:
+    """Find diagram classes in an RGB page within ``budget`` seconds.
+
+    Returns the confirmed classes in ``DIAGRAM_CLASSES`` order, the level
+    sizes that were searched, the time spent and whether the budget ran out.
+    """
+    start = time.perf_counter()
+    deadline = start + budget
+    confirmed = set()
+    searched: List[List[int]] = []
+    timed_out = False
+
+    def over_budget() -> bool:
+        return time.perf_counter() >= deadline
+
+    pyramid = build_pyramid(rgb, max_side, levels, without_text=True)
+    for gray in pyramid:
+        if over_budget():
+            timed_out = True
+            break
+        searched.append([gray.shape[1], gray.shape[0]])
+
+        if not {GEOMETRIC_FIGURE, COORDINATE_SYSTEM} <= confirmed:
+            segments = line_segments(gray)
+            if len(segments) > MIN_FIGURE_LINES:
+                confirmed.add(GEOMETRIC_FIGURE)
+            if COORDINATE_SYSTEM not in confirmed and has_perpendicular_pair(segments):
+                confirmed.add(COORDINATE_SYSTEM)
+
+        if CIRCULAR_DIAGRAM not in confirmed:
+            if over_budget():
+                timed_out = True
+                break
+            if has_circles(gray):
+                confirmed.add(CIRCULAR_DIAGRAM)
+
+        if len(confirmed) == len(DIAGRAM_CLASSES):
+            break
+
+    return {
+        "diagrams": [name for name in DIAGRAM_CLASSES if name in confirmed],
+        "levels": searched,
+        "elapsed": round(time.perf_counter() - start, 4),
+        "timed_out": timed_out
+    }
+
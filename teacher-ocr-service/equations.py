@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Single-pass extraction of math expressions from OCR text.
+
+The legacy ``extract_equations`` ran nine ``re.findall`` passes over the
+text, deduplicated with list membership checks, then through a ``set``, and
+sorted the survivors. Here one precompiled tokenizer walks the text once:
+runs of prose words are swallowed in a single match, and runs of math tokens
+(numbers, short variables, parenthesized groups, function calls, operators,
+relations) are grouped into candidate expressions as they stream past.
+Parenthesized groups may nest - ``(-b ± √(b² - 4ac))`` - so they are closed
+by a bounded depth-counting scan rather than by the regex.
+Candidates keep the order of their first appearance and are deduplicated
+through a dict.
+"""
+import re
+from typing import List, Optional
+
+SUPERSCRIPTS = "⁰¹²³⁴⁵⁶⁷⁸⁹"
+SUBSCRIPTS = "₀₁₂₃₄₅₆₇₈₉"
+
+# Exponents, subscripts and primes that may trail any factor: x², v₀, x^2, f'
+_POSTFIX = rf"(?:\^\s*-?\d+|[{SUPERSCRIPTS}{SUBSCRIPTS}'])*"
+
+_WORD = r"[a-zα-ω]{3,}(?:'[a-z]+)?"
+
+# Longest parenthesized group, brackets included, that the scan looks for
+MAX_GROUP_LENGTH = 80
+
+_TOKENS = (
+    # f(x), sin(2x), f'(x): the name and opening bracket; the scan finds the close
+    r"(?P<function>[a-zα-ω]{1,4}'?\()",
+    # Words of three or more letters are prose, never variables; a whole run of
+    # them (with the punctuation between) is one token, stopping before f(
+    rf"(?P<prose>{_WORD}(?:[\s,.;:!?\"]+{_WORD}(?![(']))*)",
+    rf"(?P<variable>[a-zα-ω]{{1,2}}{_POSTFIX})",
+    rf"(?P<number>\d+(?:\.\d+)?{_POSTFIX})",
+    r"(?P<group>\()",
+    r"(?P<operator>[+\-−*/×÷·])",
+    r"(?P<relation>[=≠≤≥<>→⇒])",
+    r"(?P<space>[ \t]+)",
+    # Self-contained candidates: √(x+1), ∫f(x)dx, ∆y, [1, 2, 3]; a group right
+    # after the sign is closed by the scan, so √(b² - 4ac) stays whole
+    r"(?P<symbol>[∫∑√±∞∂∆∇]\s*[^\s.,;:!?]+)",
+    r"(?P<matrix>\[\s*[0-9+\-*/\s,]+\s*\])",
+    r"(?P<other>.)",
+)
+
+TOKEN_PATTERN = re.compile("|".join(_TOKENS), re.IGNORECASE | re.DOTALL)
+# Fallback when a bracket never closes: the name is a word or variable and "(" is other
+_UNGROUPED_PATTERN = re.compile("|".join(_TOKENS[1:]).replace(r"(?P<group>\()|", ""), re.IGNORECASE | re.DOTALL)
+_POSTFIX_PATTERN = re.compile(_POSTFIX)
+_SYMBOL_HEAD = re.compile(r"[∫∑√±∞∂∆∇]\s*(?=\()")
+_SYMBOL_TAIL = re.compile(r"[^\s.,;:!?]*")
+
+EXPONENT_PATTERN = re.compile(rf"\^|[{SUPERSCRIPTS}]")
+
+FACTORS = frozenset(("function", "variable", "number", "group"))
+JOINERS = frozenset(("operator", "relation"))
+
+
+def closing_bracket(text: str, opening: int, max_length: int = MAX_GROUP_LENGTH) -> int:
+    """Index just past the ")" matching the "(" at ``opening``, or -1.
+
+    Counts depth over at most ``max_length`` characters of one line, so an
+    unbalanced bracket costs a bounded scan. Empty groups do not count.
+    """
+    depth = 0
+    for index in range(opening, min(len(text), opening + max_length)):
+        char = text[index]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return index + 1 if index > opening + 1 else -1
+        elif char == "\n":
+            return -1
+    return -1
+
+
+def tokenize(text: str):
+    """Yield ``(kind, start, end)`` for each token of ``text``"""
+    position = 0
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        kind, start, end = match.lastgroup, match.start(), match.end()
+
+        if kind in ("function", "group"):
+            close = closing_bracket(text, end - 1)
+            if close < 0:
+                match = _UNGROUPED_PATTERN.match(text, position)
+                kind, end = match.lastgroup, match.end()
+            else:
+                end = _POSTFIX_PATTERN.match(text, close).end()
+
+        elif kind == "symbol":
+            head = _SYMBOL_HEAD.match(text, start)
+            close = closing_bracket(text, head.end()) if head else -1
+            if close >= 0:
+                end = _SYMBOL_TAIL.match(text, close).end()
+
+        yield kind, start, end
+        position = end
+
+
+def extract_equations(text: str, limit: Optional[int] = 10) -> List[str]:
+    """Math expressions in ``text`` in order of first appearance, at most ``limit`` (None for all)"""
+    if not text:
+        return []
+
+    found = {}
+    # The expression being built: its span, whether it contains an operator
+    # or relation, whether it stands on its own anyway (f(x), x², (a)(b)),
+    # and the kind of the last token ("gap" for a factor followed by space)
+    start = end = -1
+    joined = notable = False
+    last = None
+
+    def flush():
+        if start >= 0 and (joined or notable):
+            candidate = text[start:end].strip()
+            if len(candidate) > 2:
+                found.setdefault(candidate, None)
+
+    for kind, token_start, token_end in tokenize(text):
+        if kind == "space":
+            if last in FACTORS:
+                last = "gap"
+
+        elif kind in FACTORS:
+            if last in JOINERS and start >= 0:
+                end = token_end
+            elif last in FACTORS and token_start == end:
+                # Juxtaposition is multiplication: 3x, 2H₂O, (x + 4)(x - 1)
+                end = token_end
+                notable = notable or "group" in (kind, last)
+            else:
+                flush()
+                start, end = token_start, token_end
+                joined = False
+                notable = kind == "function" or (
+                    kind == "variable" and bool(EXPONENT_PATTERN.search(text, token_start, token_end)))
+            last = kind
+
+        elif kind in JOINERS:
+            if last in FACTORS or last == "gap":
+                joined = True
+                last = kind
+            elif last not in JOINERS and text[token_start] == "-":
+                # A leading minus opens an expression: -4, -x
+                flush()
+                start = end = token_start
+                joined = notable = False
+                last = kind
+            # Repeated joiners (= -4, + -x) stay part of the current expression
+
+        else:
+            flush()
+            start, last = -1, None
+            if kind in ("symbol", "matrix"):
+                found.setdefault(text[token_start:token_end].strip(), None)
+
+        if limit is not None and len(found) >= limit:
+            break
+    else:
+        flush()
+
+    return list(found)[:limit]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Reduced-resolution image decoding for OCR.
+
+``decode_image`` used to decode every upload at full resolution, and the
+resize stage then threw most of those pixels away again: a 24 MP phone
+photo is decoded at 6000x4000 only to be shrunk to 2048 on its longest side.
+JPEG can decode at 1/2, 1/4 or 1/8 scale straight from the DCT
+coefficients, which is several times cheaper than a full decode. Here the
+decoder's draft mode is asked for the smallest such scale that still leaves
+at least as many pixels as the resize stage keeps, so OCR input is unchanged
+in size while far fewer pixels are decoded.
+
+The same step bakes the EXIF orientation into the pixels (phone photos are
+usually stored sideways) and flattens transparency onto white, so the rest
+of the pipeline always gets an upright RGB or greyscale image.
+"""
+import io
+import math
+from typing import Any, Dict, Tuple
+
+from PIL import Image, ImageOps
+
+from preprocessing import choose_scale, image_to_rgb_array
+
+EXIF_ORIENTATION = 0x0112
+
+# Orientations 5-8 are rotated by 90 degrees and swap width and height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Modes the pipeline takes as they are; anything else is flattened to RGB
+DIRECT_MODES = {"RGB", "L"}
+
+
+class DecodedImage:
+    """An upright, opaque image plus what decoding it took"""
+
+    def __init__(self, image: Image.Image, source_format: str, source_bytes: int,
+                 original_size: Tuple[int, int], decoded_size: Tuple[int, int], orientation: int):
+        self.image = image
+        self.source_format = source_format
+        self.source_bytes = source_bytes
+        self.original_size = original_size
+        self.decoded_size = decoded_size
+        self.orientation = orientation
+
+    @property
+    def scale(self) -> float:
+        """Decoded size over full size; boxes found on ``image`` divide by this"""
+        return self.image.size[0] / self.original_size[0] if self.original_size[0] else 1.0
+
+    @property
+    def original_pixels(self) -> int:
+        return self.original_size[0] * self.original_size[1]
+
+    @property
+    def decoded_pixels(self) -> int:
+        return self.decoded_size[0] * self.decoded_size[1]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "format": self.source_format,
+            "bytes": self.source_bytes,
+            "original_size": list(self.original_size),
+            "decoded_size": list(self.image.size),
+            "decoded_pixels": self.decoded_pixels,
+            "pixels_skipped": self.original_pixels - self.decoded_pixels,
+            "scale": round(self.scale, 4),
+            "orientation": self.orientation
+        }
+
+
+def load_image(data: bytes, max_side: int = 0, min_side: int = 0) -> DecodedImage:
+    """Decode ``data`` at the smallest JPEG draft scale the OCR resize still fits into.
+
+    ``max_side`` and ``min_side`` are the resize stage's limits; with
+    ``max_side`` 0 the image is decoded at full size. Other formats are
+    always decoded in full.
+    """
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format or "unknown"
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    width, height = image.size
+    original_size = (height, width) if orientation in TRANSPOSED_ORIENTATIONS else (width, height)
+
+    if source_format == "JPEG" and max_side:
+        # The resize stage never goes below this, so the draft may not either
+        scale = choose_scale(width, height, max_side, min_side=min_side)
+        if scale < 1.0:
+            image.draft(image.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+    image.load()
+    decoded_size = image.size
+
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in DIRECT_MODES:
+        image = Image.fromarray(image_to_rgb_array(image))
+
+    return DecodedImage(image, source_format, len(data), original_size, decoded_size, orientation)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Streaming upload ingestion with early size enforcement.
+
+Two layers keep per-request memory bounded:
+
+* ``RequestSizeLimitMiddleware`` counts request body bytes as they arrive and
+  answers 413 as soon as the limit is crossed - before the multipart parser
+  has buffered the whole upload. A declared Content-Length over the limit is
+  rejected without reading the body at all.
+* ``ingest_upload`` validates the parsed upload where it already is. The
+  multipart parser spools every file part into a ``SpooledTemporaryFile``
+  that rolls over to disk past 1 MB, so the upload is size-checked by
+  seeking to its end and sniffed from its first bytes, without a copy.
+"""
+import logging
+import os
+from typing import Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Enough of the file to recognize every signature below
+SNIFF_BYTES = 16
+
+# Multipart framing (boundaries, part headers) on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Magic byte signatures -> image kind
+MAGIC_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"%PDF-", "pdf"),
+)
+
+# Extensions each sniffed kind may legitimately arrive with
+KIND_EXTENSIONS = {
+    "jpeg": {".jpg", ".jpeg"},
+    "png": {".png"},
+    "bmp": {".bmp"},
+    "tiff": {".tiff"},
+    "webp": {".webp"},
+    "pdf": {".pdf"},
+}
+
+
+def sniff_image_kind(head: bytes) -> Optional[str]:
+    """Identify a file from its first bytes, or return None if unrecognized"""
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, kind in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+class IngestedUpload:
+    """A validated upload, still in the parser's spooled file (memory, or disk past 1 MB)"""
+
+    def __init__(self, filename: str, kind: str, size: int, spooled):
+        self.filename = filename
+        self.kind = kind
+        self.size = size
+        self._spooled = spooled
+
+    @property
+    def spilled(self) -> bool:
+        return bool(getattr(self._spooled, "_rolled", False))
+
+    def read_bytes(self) -> bytes:
+        self._spooled.seek(0)
+        return self._spooled.read()
+
+    def close(self):
+        self._spooled.close()
+
+
+async def ingest_upload(file: UploadFile, max_size: int,
+                        allowed_kinds: Optional[set] = None) -> IngestedUpload:
+    """Check an upload's size and magic bytes in place.
+
+    Raises HTTPException 413 if the upload is larger than ``max_size`` and
+    400 if it is empty, not a supported type or does not match the file
+    extension.
+    """
+    spooled = file.file
+    spooled.seek(0, os.SEEK_END)
+    size = spooled.tell()
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    spooled.seek(0)
+    kind = sniff_image_kind(spooled.read(SNIFF_BYTES))
+    if kind is None or (allowed_kinds is not None and kind not in allowed_kinds):
+        raise HTTPException(status_code=400, detail="File content is not a supported image type")
+    extension = "." + file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
+    if extension not in KIND_EXTENSIONS.get(kind, set()):
+        raise HTTPException(
+            status_code=400,
+            detail=f"File content ({kind}) does not match extension {extension or '(none)'}"
+        )
+    if size > max_size:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    upload = IngestedUpload(file.filename, kind, size, spooled)
+    if upload.spilled:
+        logger.info(f"Upload {file.filename} ({size} bytes) is spooled on disk")
+    return upload
+
+
+class RequestSizeLimitMiddleware:
+    """ASGI middleware that stops reading a request body once it exceeds a per-path limit"""
+
+    def __init__(self, app, default_limit: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.path_limits = path_limits or {}
+
+    def limit_for(self, path: str) -> int:
+        return self.path_limits.get(path, self.default_limit)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope.get("path", ""))
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPException from body parsing unchanged
+                    raise HTTPException(status_code=413, detail="File too large")
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(status_code=413, content={"detail": "File too large"},
+                                headers={"Connection": "close"})
+        await response(scope, receive, send)
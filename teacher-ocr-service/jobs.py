@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Background OCR job scheduler with per-stage progress events.
+
+``POST /jobs`` hands the upload to ``JobScheduler.submit`` and returns at
+once. The job runs on the event loop behind a concurrency limit, records a
+progress event as it enters each pipeline stage, and keeps its result for
+``ttl_seconds`` after it finishes so clients can poll or stream it.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+ProgressCallback = Callable[[str], None]
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are waiting or running"""
+
+
+class Job:
+    def __init__(self, filename: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.stage: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def emit(self, event: str, **data):
+        """Record an event and push it to every live SSE subscriber"""
+        record = {
+            "event": event,
+            "job_id": self.id,
+            "elapsed": round(time.time() - self.created_at, 3),
+            **data
+        }
+        self.events.append(record)
+        for queue in self._subscribers:
+            queue.put_nowait(record)
+
+    def report_stage(self, stage: str):
+        """Progress callback handed to the OCR pipeline"""
+        self.stage = stage
+        self.emit("stage", stage=stage)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        for record in self.events:
+            queue.put_nowait(record)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "processing_time": (self.finished_at - self.started_at) if self.finished_at and self.started_at else None
+        }
+
+
+class JobScheduler:
+    """Runs OCR jobs in the background and expires finished ones after a TTL"""
+
+    def __init__(self, concurrency: int = 4, max_jobs: int = 100, ttl_seconds: float = 3600):
+        self.concurrency = max(1, concurrency)
+        self.max_jobs = max(1, max_jobs)
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.expire()
+        return self._jobs.get(job_id)
+
+    @property
+    def active_jobs(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def submit(self, filename: str, run: Callable[[Job], Awaitable[Dict[str, Any]]]) -> Job:
+        """Create a job and schedule ``run(job)`` in the background"""
+        self.expire()
+        if self.active_jobs >= self.max_jobs:
+            raise JobQueueFull(f"{self.active_jobs} OCR jobs already pending")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        job = Job(filename)
+        self._jobs[job.id] = job
+        job.emit("queued")
+
+        task = asyncio.ensure_future(self._execute(job, run))
+        # Keep a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _execute(self, job: Job, run: Callable[[Job], Awaitable[Dict[str, Any]]]):
+        async with self._semaphore:
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            job.emit("started")
+            try:
+                job.result = await run(job)
+                job.status = JOB_COMPLETED
+            except Exception as e:
+                logger.error(f"OCR job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = JOB_FAILED
+            finally:
+                job.finished_at = time.time()
+                job.emit(job.status, stage=job.stage)
+
+    def expire(self):
+        """Drop finished jobs whose results have outlived the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+
+def format_sse(record: Dict[str, Any]) -> str:
+    """Encode one event record as a server-sent event frame"""
+    return f"event: {record['event']}\ndata: {json.dumps(record)}\n\n"
+
+
+async def stream_job_events(job: Job, heartbeat_seconds: float = 15.0):
+    """Yield SSE frames for a job: past events first, then live ones until it finishes"""
+    queue = job.subscribe()
+    try:
+        while True:
+            try:
+                record = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # SSE comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(record)
+            if record["event"] in (JOB_COMPLETED, JOB_FAILED):
+                break
+    finally:
+        job.unsubscribe(queue)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Pooled async HTTP client for the K.A.N.A. backend.
+
+One ``httpx.AsyncClient`` is shared by every request so connections are kept
+alive and reused, instead of ``requests.post`` opening a fresh connection and
+blocking the event loop for the whole round trip. Each call has an overall
+deadline that also bounds its retries, retries back off with jitter, and a
+circuit breaker makes callers fall back to local analysis immediately while
+K.A.N.A. keeps failing.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling K.A.N.A. while the circuit breaker is open"""
+
+
+class KanaStatusError(Exception):
+    """K.A.N.A. answered with a non-success status"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"K.A.N.A. returned status {status_code}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures, probes again after ``reset_timeout``"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.times_closed = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == BREAKER_CLOSED:
+            return True
+        if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = BREAKER_HALF_OPEN
+        if self.state == BREAKER_HALF_OPEN and not self._probe_in_flight:
+            # Let exactly one trial call through
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != BREAKER_CLOSED:
+            self.times_closed += 1
+            logger.info("✅ K.A.N.A. circuit breaker closed after a successful probe")
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self, failed: bool):
+        """Settle a half-open probe that ended without a recorded outcome (cancelled or an unexpected error)"""
+        if self.state != BREAKER_HALF_OPEN or not self._probe_in_flight:
+            return
+        if failed:
+            self.record_failure()
+        else:
+            # Cancelled: nothing was learned, so the next call probes again
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                self.times_opened += 1
+                logger.warning(f"⚠️ K.A.N.A. circuit breaker opened after {self.consecutive_failures} failures")
+            self.state = BREAKER_OPEN
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "times_closed": self.times_closed
+        }
+
+
+# Called after every attempt with (path, status code or "transport_error", seconds)
+AttemptObserver = Callable[[str, Union[int, str], float], None]
+
+
+class KanaClient:
+    """Shared keep-alive client for K.A.N.A.'s analysis endpoints"""
+
+    def __init__(self, base_url: str, max_connections: int = 20, max_keepalive: int = 10,
+                 retries: int = 2, backoff: float = 0.25, breaker: Optional[CircuitBreaker] = None,
+                 observer: Optional[AttemptObserver] = None):
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.stats = Counter()
+        self.status_codes = Counter()
+        self.observer = observer
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _retryable(self, response: httpx.Response) -> bool:
+        return response.status_code in (429, 502, 503, 504)
+
+    async def post(self, path: str, deadline: float, **kwargs) -> httpx.Response:
+        """POST with retries, all within ``deadline`` seconds.
+
+        Raises CircuitOpen when the breaker is open, or the last httpx error
+        once retries or the deadline are exhausted. HTTP error statuses are
+        returned to the caller, not raised.
+        """
+        if not self.breaker.allow():
+            self.stats["circuit_rejections"] += 1
+            raise CircuitOpen("K.A.N.A. circuit breaker is open")
+        probe = self.breaker.state == BREAKER_HALF_OPEN
+
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+        self.stats["requests"] += 1
+        self.in_flight += 1
+        try:
+            attempt = 0
+            while True:
+                remaining = give_up_at - loop.time()
+                sent_at = time.perf_counter()
+                try:
+                    response = await self.client.post(path, timeout=max(remaining, 0.001), **kwargs)
+                    self.status_codes[response.status_code] += 1
+                    self._observe(path, response.status_code, sent_at)
+                    if not self._retryable(response) or attempt >= self.retries:
+                        if response.status_code >= 500:
+                            self.breaker.record_failure()
+                            self.stats["failures"] += 1
+                        else:
+                            self.breaker.record_success()
+                            self.stats["successes"] += 1
+                        return response
+                    error: Exception = httpx.HTTPStatusError(
+                        f"retryable status {response.status_code}", request=response.request, response=response
+                    )
+                except httpx.TransportError as e:
+                    self.status_codes["transport_error"] += 1
+                    self._observe(path, "transport_error", sent_at)
+                    error = e
+                    if attempt >= self.retries:
+                        self.breaker.record_failure()
+                        self.stats["failures"] += 1
+                        raise
+
+                # Exponential backoff with full jitter, never past the deadline
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                if loop.time() + delay >= give_up_at:
+                    self.breaker.record_failure()
+                    self.stats["failures"] += 1
+                    self.stats["deadline_exceeded"] += 1
+                    if isinstance(error, httpx.HTTPStatusError):
+                        return error.response
+                    raise error
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+                attempt += 1
+        except BaseException as e:
+            # A probe must always be settled, or the breaker would reject every later call
+            if probe:
+                self.breaker.release_probe(failed=isinstance(e, Exception))
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def _observe(self, path: str, status: Union[int, str], sent_at: float):
+        if self.observer is not None:
+            try:
+                self.observer(path, status, time.perf_counter() - sent_at)
+            except Exception as e:
+                logger.debug(f"K.A.N.A. attempt observer failed: {e}")
+
+    async def analyze(self, payload: Dict[str, Any], deadline: float) -> httpx.Response:
+        return await self.post("/api/kana/analyze", deadline, json=payload)
+
+    async def analyze_image(self, image: bytes, content_type: str, filename: str, fields: Dict[str, str],
+                            deadline: float, path: str = "/api/analyze-image") -> httpx.Response:
+        """Upload an image as a multipart file part rather than base64 inside JSON"""
+        files = {"imageFile": (filename or "image.jpg", image, content_type)}
+        return await self.post(path, deadline, data=fields, files=files)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Pool, retry and breaker counters for health/metrics endpoints"""
+        open_connections = None
+        try:
+            # httpcore keeps its pool on the transport; not public API, so best effort only
+            open_connections = len(self._client._transport._pool.connections) if self._client else 0
+        except AttributeError:
+            pass
+        return {
+            "base_url": self.base_url,
+            "in_flight": self.in_flight,
+            "open_connections": open_connections,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "stats": dict(self.stats),
+            "status_codes": {str(code): count for code, count in self.status_codes.items()},
+            "breaker": self.breaker.snapshot()
+        }
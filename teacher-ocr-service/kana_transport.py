@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compact image transport for direct K.A.N.A. image analysis.
+
+Phone photos of student work are several megabytes at resolutions the vision
+model never uses. Before an image goes to K.A.N.A. it is oriented from its
+EXIF tag, flattened onto white, optionally cropped to the inked area,
+downscaled to ``max_side`` and re-encoded as JPEG. Only the re-encoded bytes
+are kept, and they are sent as a multipart file part instead of a base64
+string inside a JSON body, so nothing is inflated by a third on the wire.
+"""
+import io
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from preprocessing import find_content_box, image_to_rgb_array
+
+EXIF_ORIENTATION = 0x0112
+
+# Encodings K.A.N.A. accepts as-is when re-encoding would not make them smaller
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+class PreparedImage:
+    """Bytes ready to send to K.A.N.A. plus what it took to produce them"""
+
+    def __init__(self, data: bytes, content_type: str, original_bytes: int, original_size: Tuple[int, int],
+                 size: Tuple[int, int], crop_box: Optional[Tuple[int, int, int, int]], encode_time: float):
+        self.data = data
+        self.content_type = content_type
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.size = size
+        self.crop_box = crop_box
+        self.encode_time = encode_time
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "original_bytes": self.original_bytes,
+            "sent_bytes": len(self.data),
+            "bytes_saved": self.bytes_saved,
+            "compression_ratio": round(self.original_bytes / max(1, len(self.data)), 2),
+            "original_size": list(self.original_size),
+            "sent_size": list(self.size),
+            "crop_box": list(self.crop_box) if self.crop_box else None,
+            "content_type": self.content_type,
+            "encode_time": round(self.encode_time, 4)
+        }
+
+
+def prepare_image(image_bytes: bytes, max_side: int = 1600, quality: int = 80,
+                  crop_to_content: bool = True) -> PreparedImage:
+    """Orient, crop, downscale and re-encode an upload for K.A.N.A.
+
+    Falls back to the original bytes when they are already smaller than the
+    re-encoded image and need no rotation, crop or resize.
+    """
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(image_bytes))
+    source_format = image.format
+    original_size = image.size
+
+    # Re-encoding drops EXIF, so the orientation has to be baked into the pixels
+    rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    if rotated:
+        image = ImageOps.exif_transpose(image)
+    image = Image.fromarray(image_to_rgb_array(image))
+
+    crop_box = find_content_box(image) if crop_to_content else None
+    if crop_box is not None and crop_box != (0, 0) + image.size:
+        image = image.crop(crop_box)
+    else:
+        crop_box = None
+
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR, reducing_gap=2.0)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    data, content_type = buffer.getvalue(), "image/jpeg"
+
+    unchanged = not rotated and crop_box is None and image.size == original_size
+    if unchanged and source_format in PASSTHROUGH_FORMATS and len(image_bytes) <= len(data):
+        data, content_type = image_bytes, PASSTHROUGH_FORMATS[source_format]
+
+    return PreparedImage(data, content_type, len(image_bytes), original_size, image.size, crop_box,
+                         time.perf_counter() - start)
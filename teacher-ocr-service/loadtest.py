@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Reproducible load test for the OCR service against a local K.A.N.A. stand-in.
+
+Starts a fake K.A.N.A. server with configurable latency, jitter and error
+rate, starts the OCR service pointed at it (``main.py`` under uvicorn, or the
+pre-fork launcher), then drives ``/ocr``, ``/ocr-analyze`` and
+``/kana-direct`` either open-loop at a target request rate or closed-loop at
+a fixed concurrency, with generated pages and the bundled sample images.
+
+The report gives throughput, p50/p95/p99 latency and error rate per endpoint
+and overall, the mean time per pipeline stage taken from the service's
+``/metrics``, and the git commit it ran on. It is printed and saved as JSON
+so runs can be compared across commits with ``--compare``.
+
+Usage:
+    python loadtest.py --rps 4 --duration 30
+    python loadtest.py --concurrency 8 --endpoints ocr --launcher prefork --workers 2
+    python loadtest.py --concurrency 8 --compare loadtest-results/<previous>.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+SERVICE_DIR = Path(__file__).resolve().parent
+BUNDLED_IMAGES = ["test_student_note.png", "comprehensive_student_work.png", "debug_test.png", "test_handwritten.jpg"]
+ENDPOINTS = {"ocr": "/ocr", "ocr-analyze": "/ocr-analyze", "kana-direct": "/kana-direct"}
+
+PAGE_LINES = [
+    "Problem 1: Solve x² - 5x + 6 = 0",
+    "(x - 2)(x - 3) = 0 so x = 2 or x = 3",
+    "Photosynthesis turns light energy into chemical energy",
+    "Newton's second law: F = ma",
+    "The mitochondria is the powerhouse of the cell",
+    "Area of a circle A = πr²",
+    "Check: 2² - 5(2) + 6 = 0",
+    "Velocity v = d / t = 20 m/s"
+]
+
+
+class FakeKana(ThreadingHTTPServer):
+    """K.A.N.A. stand-in answering the analysis routes after ``latency`` ± ``jitter`` seconds"""
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.05, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), FakeKanaHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0, "bytes_received": 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeKana":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def next_response(self, body_size: int) -> Tuple[float, int]:
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes_received"] += body_size
+            delay = max(0.0, self.rng.uniform(self.latency - self.jitter, self.latency + self.jitter))
+            failed = self.rng.random() < self.error_rate
+            if failed:
+                self.stats["errors_injected"] += 1
+        return delay, 503 if failed else 200
+
+
+class FakeKanaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path not in ("/api/kana/analyze", "/api/analyze-image"):
+            self._reply(404, {"error": "not found"})
+            return
+        delay, status = self.server.next_response(length)
+        time.sleep(delay)
+        if status != 200:
+            self._reply(status, {"error": "injected failure"})
+            return
+        self._reply(200, {
+            "analysis": "The student solves the quadratic by factoring and checks both roots.",
+            "explanation": "The student solves the quadratic by factoring and checks both roots.",
+            "knowledge_gaps": ["quadratic formula"],
+            "recommendations": ["Practice completing the square"],
+            "student_level": "intermediate",
+            "confidence": 0.9,
+            "extracted_text": "x² - 5x + 6 = 0"
+        })
+
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def generate_page(seed: int, width: int = 1200, height: int = 900) -> bytes:
+    """A synthetic page of student work; every seed gives different pixels, so caches cannot help"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    y = 40
+    for line in rng.sample(PAGE_LINES, k=rng.randint(4, len(PAGE_LINES))):
+        draw.text((rng.randint(30, 90), y), line, fill=(20, 30, 60), font=font)
+        y += rng.randint(40, 80)
+    # Light paper noise
+    pixels = np.asarray(image, dtype=np.int16)
+    noise = np.random.default_rng(seed).integers(-6, 7, size=pixels.shape[:2], dtype=np.int16)[..., None]
+    image = Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def load_images(generated: int, bundled: bool = True) -> List[Tuple[str, bytes, str]]:
+    """(filename, bytes, content type) for every image the load test cycles through"""
+    images = [(f"generated_{i}.jpg", generate_page(i), "image/jpeg") for i in range(generated)]
+    if bundled:
+        for name in BUNDLED_IMAGES:
+            path = SERVICE_DIR / name
+            try:
+                with Image.open(path) as image:
+                    image.verify()
+            except Exception:
+                # test_handwritten.jpg is a text placeholder, not an image
+                print(f"⚠️ Skipping {name}: not a readable image")
+                continue
+            content_type = "image/png" if path.suffix == ".png" else "image/jpeg"
+            images.append((name, path.read_bytes(), content_type))
+    if not images:
+        raise SystemExit("❌ No images to send")
+    return images
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=SERVICE_DIR, capture_output=True, text=True,
+                                  timeout=10).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no", "--", ".")
+    return {"commit": git("rev-parse", "HEAD"), "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(status)}
+
+
+class ServiceProcess:
+    """The OCR service under test, run as a subprocess on a free port"""
+
+    def __init__(self, kana_url: str, launcher: str = "uvicorn", workers: int = 2, cache: bool = False,
+                 env: Optional[Dict[str, str]] = None, log_path: Optional[str] = None):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.upload_dir = tempfile.mkdtemp(prefix="ocr-loadtest-")
+        self.log_path = log_path or os.path.join(self.upload_dir, "service.log")
+        self.env = {
+            **os.environ,
+            "KANA_API_URL": kana_url,
+            "UPLOAD_DIR": self.upload_dir,
+            "OCR_CACHE_ENABLED": str(cache).lower(),
+            "ANALYSIS_CACHE_ENABLED": str(cache).lower(),
+            "LOG_LEVEL": "WARNING",
+            "PORT": str(self.port),
+            "PREFORK_WORKERS": str(workers),
+            **(env or {})
+        }
+        if launcher == "prefork":
+            self.command = [sys.executable, "prefork.py"]
+        else:
+            self.command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                            "--port", str(self.port), "--log-level", "warning"]
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self, ready_timeout: float = 180.0):
+        self._log = open(self.log_path, "w")
+        self.process = subprocess.Popen(self.command, cwd=SERVICE_DIR, env=self.env,
+                                        stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.time() + ready_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit(f"❌ OCR service exited with {self.process.returncode}, see {self.log_path}")
+            try:
+                # /readyz turns 200 once the OCR self-test has passed
+                if httpx.get(f"{self.url}/readyz", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        raise SystemExit(f"❌ OCR service not ready after {ready_timeout}s, see {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if getattr(self, "_log", None):
+            self._log.close()
+
+
+_SAMPLE_PATTERN = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """Prometheus text samples keyed by (name, sorted labels)"""
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE_PATTERN.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        pairs = tuple(sorted(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', labels or "")))
+        samples[(name, pairs)] = float(value)
+    return samples
+
+
+def scrape_metrics(url: str) -> Dict:
+    try:
+        return parse_metrics(httpx.get(f"{url}/metrics", timeout=10).text)
+    except httpx.HTTPError:
+        return {}
+
+
+def stage_means(before: Dict, after: Dict) -> Dict[str, Dict[str, float]]:
+    """Mean seconds per OCR stage and K.A.N.A. call over the run, from /metrics deltas"""
+    families = {"ocr_stage_duration_seconds": "stage", "kana_request_duration_seconds": "path"}
+    means = {}
+    for (name, labels), total in after.items():
+        for family, label in families.items():
+            if name != f"{family}_sum":
+                continue
+            count = after.get((f"{family}_count", labels), 0) - before.get((f"{family}_count", labels), 0)
+            if count > 0:
+                key = f"{'kana ' if label == 'path' else ''}{dict(labels)[label]}"
+                means[key] = {"count": int(count),
+                              "mean_ms": round((total - before.get((name, labels), 0)) / count * 1000, 2)}
+    return dict(sorted(means.items()))
+
+
+def kana_statuses(before: Dict, after: Dict) -> Dict[str, int]:
+    statuses = {}
+    for (name, labels), value in after.items():
+        if name == "kana_responses_total":
+            delta = int(value - before.get((name, labels), 0))
+            if delta:
+                statuses[dict(labels)["status"]] = statuses.get(dict(labels)["status"], 0) + delta
+    return statuses
+
+
+async def send_one(client: httpx.AsyncClient, endpoint: str, image: Tuple[str, bytes, str]) -> Dict[str, Any]:
+    filename, data, content_type = image
+    started = time.perf_counter()
+    try:
+        response = await client.post(ENDPOINTS[endpoint], files={"file": (filename, data, content_type)})
+        status: Any = response.status_code
+        ok = status == 200
+    except httpx.HTTPError as e:
+        status, ok = type(e).__name__, False
+    return {"endpoint": endpoint, "status": status, "ok": ok, "latency": time.perf_counter() - started,
+            "finished": time.perf_counter()}
+
+
+async def run_load(url: str, endpoints: Sequence[str], images: Sequence[Tuple[str, bytes, str]],
+                   duration: float, rps: Optional[float] = None, concurrency: int = 4,
+                   max_in_flight: int = 256, timeout: float = 120.0) -> Tuple[List[Dict[str, Any]], float, int]:
+    """Drive the service and return (per-request results, elapsed seconds, arrivals skipped).
+
+    With ``rps`` requests are started on a fixed schedule whether or not
+    earlier ones finished (open loop); arrivals that would exceed
+    ``max_in_flight`` are skipped and counted. Without it ``concurrency``
+    clients each send their next request as soon as the last one returns.
+    """
+    plan = [(endpoint, image) for image in images for endpoint in endpoints]
+    random.Random(0).shuffle(plan)
+    results: List[Dict[str, Any]] = []
+    skipped = 0
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        stop_at = started + duration
+
+        if rps:
+            in_flight = set()
+            sent = 0
+            while True:
+                due = started + sent / rps
+                if due >= stop_at:
+                    break
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                if len(in_flight) >= max_in_flight:
+                    skipped += 1
+                else:
+                    endpoint, image = plan[sent % len(plan)]
+                    task = asyncio.ensure_future(send_one(client, endpoint, image))
+                    in_flight.add(task)
+                    task.add_done_callback(lambda t: (in_flight.discard(t), results.append(t.result())))
+                sent += 1
+            if in_flight:
+                await asyncio.wait(in_flight)
+        else:
+            counter = iter(range(10 ** 9))
+
+            async def user():
+                while time.perf_counter() < stop_at:
+                    endpoint, image = plan[next(counter) % len(plan)]
+                    results.append(await send_one(client, endpoint, image))
+
+            await asyncio.gather(*(user() for _ in range(max(1, concurrency))))
+
+        elapsed = time.perf_counter() - started
+    return results, elapsed, skipped
+
+
+def summarize(results: Sequence[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles and error rate of a set of request results"""
+    if not results:
+        return {"requests": 0, "throughput_rps": 0.0, "error_rate": 0.0, "latency_ms": {}, "statuses": {}}
+    latencies = np.array([r["latency"] for r in results]) * 1000
+    errors = sum(1 for r in results if not r["ok"])
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(results),
+        "throughput_rps": round(len(results) / elapsed, 3) if elapsed > 0 else 0.0,
+        "error_rate": round(errors / len(results), 4),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 2),
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "max": round(float(latencies.max()), 2)
+        },
+        "statuses": dict(sorted(statuses.items()))
+    }
+
+
+def build_report(results: Sequence[Dict[str, Any]], elapsed: float, skipped: int, config: Dict[str, Any],
+                 kana: Optional[FakeKana], before: Dict, after: Dict) -> Dict[str, Any]:
+    by_endpoint = {}
+    for endpoint in config["endpoints"]:
+        by_endpoint[endpoint] = summarize([r for r in results if r["endpoint"] == endpoint], elapsed)
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": config,
+        "elapsed": round(elapsed, 3),
+        "skipped_arrivals": skipped,
+        "overall": summarize(results, elapsed),
+        "endpoints": by_endpoint,
+        "service_stages": stage_means(before, after),
+        "service_kana_statuses": kana_statuses(before, after),
+        "fake_kana": dict(kana.stats) if kana else None
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    config = report["config"]
+    mode = f"{config['rps']} req/s open loop" if config["rps"] else f"{config['concurrency']} concurrent clients"
+    git = report["git"]
+    print(f"\n📊 Load test: {mode} for {config['duration']}s on {(git['commit'] or 'unknown')[:10]}"
+          f"{' (dirty)' if git['dirty'] else ''}")
+    print(f"{'endpoint':<14} {'requests':>8} {'req/s':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, summary in [*report["endpoints"].items(), ("overall", report["overall"])]:
+        latency = summary["latency_ms"] or {"p50": 0, "p95": 0, "p99": 0}
+        print(f"{name:<14} {summary['requests']:>8} {summary['throughput_rps']:>8.2f} "
+              f"{summary['error_rate']:>7.1%} {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}")
+    if report["skipped_arrivals"]:
+        print(f"⚠️ {report['skipped_arrivals']} arrivals skipped: more than {config['max_in_flight']} in flight")
+    if report["service_stages"]:
+        print("\n⏱️ Mean time per stage (from /metrics)")
+        for stage, values in report["service_stages"].items():
+            print(f"  {stage:<28} {values['mean_ms']:>9.1f} ms  ({values['count']} samples)")
+    if report["service_kana_statuses"]:
+        print(f"\n🔗 K.A.N.A. attempts by status: {report['service_kana_statuses']}")
+
+
+def print_comparison(report: Dict[str, Any], previous: Dict[str, Any]):
+    """Side-by-side overall and per-endpoint numbers against an earlier run"""
+    print(f"\n🔍 Compared with {(previous['git']['commit'] or 'unknown')[:10]} ({previous['timestamp']})")
+    print(f"{'endpoint':<14} {'metric':<8} {'before':>10} {'after':>10} {'change':>8}")
+    rows = [("overall", previous["overall"], report["overall"])]
+    rows += [(name, previous["endpoints"].get(name), summary) for name, summary in report["endpoints"].items()]
+    for name, old, new in rows:
+        if not old or not old["requests"] or not new["requests"]:
+            continue
+        pairs = [("req/s", old["throughput_rps"], new["throughput_rps"])]
+        pairs += [(p, old["latency_ms"][p], new["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        pairs += [("errors", old["error_rate"], new["error_rate"])]
+        for metric, before, after in pairs:
+            change = f"{(after - before) / before:+.1%}" if before else "n/a"
+            print(f"{name:<14} {metric:<8} {before:>10.2f} {after:>10.2f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load after warm-up")
+    parser.add_argument("--rps", type=float, help="open-loop arrival rate; omit for closed-loop --concurrency")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unrecorded load first")
+    parser.add_argument("--generated-images", type=int, default=8)
+    parser.add_argument("--no-bundled-images", action="store_true")
+    parser.add_argument("--kana-latency", type=float, default=0.2)
+    parser.add_argument("--kana-jitter", type=float, default=0.05)
+    parser.add_argument("--kana-error-rate", type=float, default=0.0)
+    parser.add_argument("--launcher", choices=["uvicorn", "prefork"], default="uvicorn")
+    parser.add_argument("--workers", type=int, default=2, help="pre-fork HTTP workers")
+    parser.add_argument("--cache", action="store_true", help="keep the OCR and analysis caches on")
+    parser.add_argument("--service-url", help="drive an already running service instead of starting one")
+    parser.add_argument("--output", help="JSON report path (default loadtest-results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    images = load_images(args.generated_images, bundled=not args.no_bundled_images)
+    kana = None
+    service = None
+    if args.service_url:
+        url = args.service_url.rstrip("/")
+    else:
+        kana = FakeKana(args.kana_latency, args.kana_jitter, args.kana_error_rate).start()
+        service = ServiceProcess(kana.url, args.launcher, args.workers, args.cache)
+        print(f"🚀 Starting OCR service ({args.launcher}) against fake K.A.N.A. at {kana.url}...")
+        service.start()
+        url = service.url
+
+    config = {
+        "endpoints": args.endpoints, "duration": args.duration, "rps": args.rps, "concurrency": args.concurrency,
+        "max_in_flight": args.max_in_flight, "warmup": args.warmup, "images": [name for name, _, _ in images],
+        "kana_latency": args.kana_latency, "kana_jitter": args.kana_jitter,
+        "kana_error_rate": args.kana_error_rate, "launcher": None if args.service_url else args.launcher,
+        "workers": args.workers, "cache": args.cache, "service_url": args.service_url
+    }
+    try:
+        if args.warmup > 0:
+            print(f"🔥 Warming up for {args.warmup}s...")
+            asyncio.run(run_load(url, args.endpoints, images, args.warmup, args.rps, args.concurrency,
+                                 args.max_in_flight))
+        if kana:
+            kana.stats = {name: 0 for name in kana.stats}
+        before = scrape_metrics(url)
+        print(f"🧪 Running load for {args.duration}s...")
+        results, elapsed, skipped = asyncio.run(run_load(url, args.endpoints, images, args.duration, args.rps,
+                                                         args.concurrency, args.max_in_flight))
+        after = scrape_metrics(url)
+    finally:
+        if service:
+            service.stop()
+        if kana:
+            kana.shutdown()
+
+    report = build_report(results, elapsed, skipped, config, kana, before, after)
+    print_report(report)
+
+    output = Path(args.output) if args.output else SERVICE_DIR / "loadtest-results" / (
+        f"{datetime.now():%Y%m%d-%H%M%S}-{(report['git']['commit'] or 'nogit')[:10]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Saved {output}")
+
+    if args.compare:
+        print_comparison(report, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,14 @@
 BrainInk Teacher OCR Service - Working Version with K.A.N.A. Integration
 Replaces the main.py with a working implementation that doesn't use lazy loading
 """
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
 import os
 import io
 import base64
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import json
 from datetime import datetime
 import asyncio
@@ -22,29 +22,58 @@ import time
 from dotenv import load_dotenv
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging - records go through a bounded queue to a writer thread, never straight to stdout
+from structured_logging import (RequestContextMiddleware, configure_logging, dropped_records, get_logger,
+                                log_payload)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "console").lower()  # "console" or "json"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Fraction of requests whose full payloads (OCR text, K.A.N.A. replies) are logged
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_SLOW_REQUEST_SECONDS = float(os.getenv("LOG_SLOW_REQUEST_SECONDS", "5"))
+
+configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_PAYLOAD_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
+payload_logger = get_logger("payload")
+
+from PIL import Image, ImageEnhance, ImageFilter
+import numpy as np
+import httpx
 
-# Initialize PaddleOCR at startup - NO LAZY LOADING
-print("🔧 Initializing PaddleOCR...")
+from ocr_cache import OCRResultCache
+from preprocessing import (crop_to_content, enhance_contrast_sharpness, image_to_rgb_array, offset_boxes,
+                           preprocess_array, resize_for_ocr, scale_boxes)
+from image_loading import DecodedImage, load_image
+from tiling import merge_tile_boxes, plan_tiles, reading_order
+from regions import Region, clip_quad, parse_regions
+from ocr_engine import OCR_ENGINE_SETTINGS, crop_text_region
+from ocr_pool import OCRQueueFull, create_pool_from_config, preload_info
+from rec_batcher import RecognitionBatcher
+from ingest import MULTIPART_OVERHEAD, IngestedUpload, RequestSizeLimitMiddleware, ingest_upload
+from pdf_ocr import InvalidPDF, iter_pdf_pages, open_pdf
+from batch_pipeline import iter_batch_results
+from equations import extract_equations
+from diagrams import detect_diagrams
+from response_formats import negotiate_encoding, negotiate_format, render_ocr_response
+from readiness import ReadinessProbe
+from prefork import read_process_memory
+from kana_client import (BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, CircuitOpen, KanaClient,
+                         KanaStatusError)
+from analysis_cache import AnalysisCache
+from kana_transport import prepare_image
+from metrics import (BYTE_BUCKETS, CONTENT_TYPE as METRICS_CONTENT_TYPE, PIXEL_BUCKETS, MetricsMiddleware,
+                     MetricsRegistry, MultiProcessMetrics)
+from jobs import JobQueueFull, JobScheduler, ProgressCallback, stream_job_events
+
+# Check PaddleOCR at startup - the predictors themselves live in the OCR worker pool
+logger.info("🔧 Initializing PaddleOCR...")
 try:
     import paddleocr
-    from PIL import Image, ImageEnhance, ImageFilter
-    import numpy as np
-    import requests
-    
-    # Initialize OCR with standard settings
-    ocr_instance = paddleocr.PaddleOCR(
-        lang='en', 
-        use_gpu=False,
-        use_space_char=True
-    )
-    print("✅ PaddleOCR initialized successfully!")
+    logger.info("✅ PaddleOCR initialized successfully!")
     PADDLEOCR_AVAILABLE = True
 except Exception as e:
-    print(f"❌ PaddleOCR initialization failed: {e}")
-    ocr_instance = None
+    logger.error(f"❌ PaddleOCR initialization failed: {e}")
     PADDLEOCR_AVAILABLE = False
 
 # Configuration
@@ -52,19 +81,290 @@ KANA_API_URL = os.getenv("KANA_API_URL", "http://localhost:10000")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
+# K.A.N.A. client - deadlines cover all retries of a call
+KANA_TIMEOUT = float(os.getenv("KANA_TIMEOUT", "30"))
+KANA_DIRECT_TIMEOUT = float(os.getenv("KANA_DIRECT_TIMEOUT", "45"))
+KANA_RETRIES = int(os.getenv("KANA_RETRIES", "2"))
+KANA_MAX_CONNECTIONS = int(os.getenv("KANA_MAX_CONNECTIONS", "20"))
+KANA_BREAKER_THRESHOLD = int(os.getenv("KANA_BREAKER_THRESHOLD", "5"))
+KANA_BREAKER_RESET = float(os.getenv("KANA_BREAKER_RESET", "30"))
+# Analysis results cache, keyed by normalized OCR text + context
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "900"))  # 15 minutes
+ANALYSIS_CACHE_ITEMS = int(os.getenv("ANALYSIS_CACHE_ITEMS", "1024"))
+
+analysis_cache = AnalysisCache(ttl_seconds=ANALYSIS_CACHE_TTL, max_items=ANALYSIS_CACHE_ITEMS) if ANALYSIS_CACHE_ENABLED else None
+
+# /kana-direct image transport: images are downscaled and re-encoded before upload.
+# "json" keeps the base64 image_data field on /api/kana/analyze, "multipart" sends raw bytes
+KANA_DIRECT_TRANSPORT = os.getenv("KANA_DIRECT_TRANSPORT", "json").lower()
+KANA_DIRECT_UPLOAD_PATH = os.getenv("KANA_DIRECT_UPLOAD_PATH", "/api/analyze-image")
+KANA_DIRECT_CONVERSATION_ID = os.getenv("KANA_DIRECT_CONVERSATION_ID", "teacher-ocr-direct")
+KANA_DIRECT_MAX_SIDE = int(os.getenv("KANA_DIRECT_MAX_SIDE", "1600"))
+KANA_DIRECT_QUALITY = int(os.getenv("KANA_DIRECT_QUALITY", "80"))
+KANA_DIRECT_CROP = os.getenv("KANA_DIRECT_CROP", "true").lower() == "true"
+
+# Prometheus metrics on /metrics. PROMETHEUS_MULTIPROC_DIR (set by prefork.py) merges the samples of all workers
+METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_WRITE_INTERVAL = float(os.getenv("METRICS_WRITE_INTERVAL", "5"))
+
+metrics_registry = MetricsRegistry()
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["route", "method", "status"])
+OCR_STAGE_SECONDS = metrics_registry.histogram(
+    "ocr_stage_duration_seconds", "Time spent in each OCR pipeline stage", ["stage"])
+KANA_REQUEST_SECONDS = metrics_registry.histogram(
+    "kana_request_duration_seconds", "K.A.N.A. round trip per attempt, retries included", ["path"])
+KANA_RESPONSES = metrics_registry.counter(
+    "kana_responses_total", "K.A.N.A. attempts by HTTP status code or transport error", ["path", "status"])
+INPUT_BYTES = metrics_registry.histogram(
+    "ocr_input_bytes", "Size of uploaded files by detected type", ["kind"], buckets=BYTE_BUCKETS)
+INPUT_PIXELS = metrics_registry.histogram(
+    "ocr_input_pixels", "Full-size pixels of each uploaded image or PDF page", buckets=PIXEL_BUCKETS)
+DECODED_PIXELS = metrics_registry.histogram(
+    "ocr_decoded_pixels", "Pixels actually decoded per uploaded image", buckets=PIXEL_BUCKETS)
+SCALE_FACTOR = metrics_registry.histogram(
+    "ocr_scale_factor", "Overall downscale applied before detection (decode and resize, 1.0 = full size)",
+    buckets=(0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875, 0.95, 1.0))
+AREA_SKIPPED = metrics_registry.histogram(
+    "ocr_area_skipped_ratio", "Fraction of each page cropped away as blank margin before detection",
+    buckets=(0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9))
+metrics_exporter = MultiProcessMetrics(metrics_registry, METRICS_DIR, METRICS_WRITE_INTERVAL) if METRICS_DIR else None
+
+def observe_kana_attempt(path: str, status, seconds: float):
+    KANA_REQUEST_SECONDS.labels(path=path).observe(seconds)
+    KANA_RESPONSES.labels(path=path, status=status).inc()
+
+kana_client = KanaClient(
+    KANA_API_URL,
+    max_connections=KANA_MAX_CONNECTIONS,
+    max_keepalive=KANA_MAX_CONNECTIONS,
+    retries=KANA_RETRIES,
+    breaker=CircuitBreaker(failure_threshold=KANA_BREAKER_THRESHOLD, reset_timeout=KANA_BREAKER_RESET),
+    observer=observe_kana_attempt
+)
+
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 # Supported file types
 SUPPORTED_IMAGE_TYPES = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp"}
 SUPPORTED_EXTENSIONS = SUPPORTED_IMAGE_TYPES | {".pdf"}
+# Content types recognized from magic bytes (see ingest.sniff_image_kind)
+SUPPORTED_IMAGE_KINDS = {"jpeg", "png", "bmp", "tiff", "webp"}
+
+# PDF OCR - text-layer pages skip OCR, scanned pages are rasterized at PDF_DPI. A page whose
+# images cover PDF_SCAN_COVERAGE of its area is a scan, whatever text is stamped over it
+MAX_PDF_SIZE = int(os.getenv("MAX_PDF_SIZE", "52428800"))  # 50MB
+PDF_DPI = int(os.getenv("PDF_DPI", "200"))
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "20"))
+PDF_SCAN_COVERAGE = float(os.getenv("PDF_SCAN_COVERAGE", "0.5"))
+
+# OCR worker pool - OCR_WORKERS=0 runs PaddleOCR on a single in-process thread
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "16"))
+OCR_START_METHOD = os.getenv("OCR_START_METHOD", "forkserver")
+
+# Cross-request recognition batching: wait up to REC_BATCH_WAIT_MS for up to REC_BATCH_MAX crops
+REC_BATCH_MAX = int(os.getenv("REC_BATCH_MAX", "64"))
+REC_BATCH_WAIT_MS = float(os.getenv("REC_BATCH_WAIT_MS", "8"))
+OCR_DROP_SCORE = float(os.getenv("OCR_DROP_SCORE", "0.5"))
+
+# Readiness self-test - /readyz serves the cached outcome instead of running inference per probe
+READINESS_INTERVAL = float(os.getenv("READINESS_INTERVAL", "30"))
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "20"))
+READINESS_MAX_QUEUE_RATIO = float(os.getenv("READINESS_MAX_QUEUE_RATIO", "0.9"))
+
+# Pages in flight at once; keeps every OCR worker busy without holding the whole document
+PDF_PAGE_CONCURRENCY = int(os.getenv("PDF_PAGE_CONCURRENCY", str(max(2, OCR_WORKERS))))
+
+# Batch analysis: OCR and K.A.N.A. stages run side by side, each with its own bound
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+BATCH_OCR_CONCURRENCY = int(os.getenv("BATCH_OCR_CONCURRENCY", str(max(2, OCR_WORKERS))))
+BATCH_ANALYZE_CONCURRENCY = int(os.getenv("BATCH_ANALYZE_CONCURRENCY", "4"))
+
+ocr_pool = create_pool_from_config(
+    OCR_WORKERS, OCR_QUEUE_SIZE, OCR_START_METHOD,
+    engine_options={"rec_batch_num": REC_BATCH_MAX}
+)
+rec_batcher = RecognitionBatcher(ocr_pool.recognize, max_batch=REC_BATCH_MAX, max_wait_ms=REC_BATCH_WAIT_MS)
+
+def ocr_pool_saturated() -> bool:
+    return ocr_pool.queue_depth >= READINESS_MAX_QUEUE_RATIO * ocr_pool.capacity
+
+async def ocr_self_test():
+    """Tiny end-to-end OCR run through the worker pool"""
+    test_image = np.ones((50, 100, 3), dtype=np.uint8) * 255
+    await ocr_pool.ocr(test_image)
+
+readiness_probe = ReadinessProbe(
+    ocr_self_test,
+    interval=READINESS_INTERVAL,
+    timeout=READINESS_TIMEOUT,
+    skip_check=ocr_pool_saturated
+)
+
+# Preprocessing factors - changing these invalidates cached OCR results
+PREPROCESS_CONTRAST = float(os.getenv("PREPROCESS_CONTRAST", "1.2"))
+PREPROCESS_SHARPNESS = float(os.getenv("PREPROCESS_SHARPNESS", "1.1"))
+# "fused" = single-buffer NumPy/OpenCV kernel, "pil" = original ImageEnhance chain
+PREPROCESS_KERNEL = os.getenv("PREPROCESS_KERNEL", "fused").lower()
+
+# Downscale before detection: cap the longest side and (optionally) the estimated text height
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2048"))
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "0"))  # 0 disables text-height scaling
+OCR_MIN_SIDE = int(os.getenv("OCR_MIN_SIDE", "960"))
+# Decode large JPEGs at 1/2, 1/4 or 1/8 scale when the resize stage would discard the pixels anyway
+OCR_REDUCED_DECODE = os.getenv("OCR_REDUCED_DECODE", "true").lower() == "true"
+
+# Blank margins are cropped away before detection; padding is a fraction of each side
+OCR_CROP_MARGINS = os.getenv("OCR_CROP_MARGINS", "true").lower() == "true"
+OCR_CROP_PADDING = float(os.getenv("OCR_CROP_PADDING", "0.02"))
+OCR_CROP_MIN_SAVING = float(os.getenv("OCR_CROP_MIN_SAVING", "0.05"))
+
+# Scans longer than OCR_TILE_THRESHOLD keep up to OCR_TILE_MAX_SIDE pixels and are OCR'd in
+# overlapping tiles spread across the worker pool instead of being shrunk to OCR_MAX_SIDE
+OCR_TILING = os.getenv("OCR_TILING", "false").lower() == "true"
+OCR_TILE_THRESHOLD = int(os.getenv("OCR_TILE_THRESHOLD", "3000"))
+OCR_TILE_MAX_SIDE = int(os.getenv("OCR_TILE_MAX_SIDE", "6144"))
+OCR_TILE_SIZE = int(os.getenv("OCR_TILE_SIZE", "1536"))
+OCR_TILE_OVERLAP = int(os.getenv("OCR_TILE_OVERLAP", "192"))
+
+# Recognition-only /ocr requests: answer regions the client already knows, no detection
+OCR_MAX_REGIONS = int(os.getenv("OCR_MAX_REGIONS", "200"))
+
+# Diagram detection on a low-resolution pyramid, concurrent with text recognition
+DIAGRAM_DETECTION = os.getenv("DIAGRAM_DETECTION", "true").lower() == "true"
+DIAGRAM_MAX_SIDE = int(os.getenv("DIAGRAM_MAX_SIDE", "512"))
+DIAGRAM_BUDGET_MS = float(os.getenv("DIAGRAM_BUDGET_MS", "150"))
+
+# OCR result cache (memory LRU + size-bounded disk tier under UPLOAD_DIR)
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_MEMORY_ITEMS = int(os.getenv("OCR_CACHE_MEMORY_ITEMS", "256"))
+OCR_CACHE_DISK_BYTES = int(os.getenv("OCR_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+# Background OCR jobs (POST /jobs) - results are kept for JOB_RESULT_TTL seconds
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+job_scheduler = JobScheduler(concurrency=JOB_CONCURRENCY, max_jobs=JOB_MAX_PENDING, ttl_seconds=JOB_RESULT_TTL)
+
+ocr_cache = OCRResultCache(
+    UPLOAD_DIR / "ocr_cache",
+    memory_items=OCR_CACHE_MEMORY_ITEMS,
+    disk_bytes=OCR_CACHE_DISK_BYTES
+) if OCR_CACHE_ENABLED else None
+
+def collect_queue_gauges():
+    yield {"queue": "ocr_pool"}, ocr_pool.queue_depth
+    yield {"queue": "recognition_batch"}, rec_batcher.pending
+    yield {"queue": "jobs"}, job_scheduler.active_jobs
+    yield {"queue": "kana_in_flight"}, kana_client.in_flight
+
+def collect_cache_lookups():
+    if ocr_cache is not None:
+        stats = ocr_cache.snapshot()
+        for result in ("memory_hits", "disk_hits", "misses"):
+            yield {"cache": "ocr", "result": result}, stats[result]
+    if analysis_cache is not None:
+        stats = analysis_cache.snapshot()
+        for result in ("hit", "miss", "coalesced"):
+            yield {"cache": "analysis", "result": result}, stats[result]
+
+def collect_breaker_state():
+    for state in (BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN):
+        yield {"state": state}, 1 if kana_client.breaker.state == state else 0
+
+def collect_breaker_transitions():
+    yield {"to": BREAKER_OPEN}, kana_client.breaker.times_opened
+    yield {"to": BREAKER_CLOSED}, kana_client.breaker.times_closed
+
+metrics_registry.callback("ocr_queue_depth", "Work submitted and not yet finished, per queue", "gauge",
+                          collect_queue_gauges, ["queue"])
+metrics_registry.callback("ocr_queue_capacity", "Jobs the OCR pool accepts before shedding load", "gauge",
+                          lambda: [({}, ocr_pool.capacity)])
+metrics_registry.callback("ocr_pool_workers", "OCR worker processes (0 runs OCR on one in-process thread)", "gauge",
+                          lambda: [({}, ocr_pool.workers)])
+metrics_registry.callback("ocr_pool_restarts_total", "OCR worker pools replaced after a worker died", "counter",
+                          lambda: [({}, ocr_pool.restarts)])
+metrics_registry.callback("kana_circuit_breaker_state", "K.A.N.A. circuit breaker state, 1 for the current one",
+                          "gauge", collect_breaker_state, ["state"])
+metrics_registry.callback("kana_circuit_breaker_transitions_total",
+                          "K.A.N.A. circuit breaker transitions by the state entered", "counter",
+                          collect_breaker_transitions, ["to"])
+metrics_registry.callback("kana_circuit_breaker_consecutive_failures",
+                          "K.A.N.A. failures since the last success", "gauge",
+                          lambda: [({}, kana_client.breaker.consecutive_failures)])
+metrics_registry.callback("log_records_dropped_total", "Log records dropped because the log queue was full",
+                          "counter", lambda: [({}, dropped_records())])
+metrics_registry.callback("cache_lookups_total", "OCR result and K.A.N.A. analysis cache lookups by outcome",
+                          "counter", collect_cache_lookups, ["cache", "result"])
+
+def ocr_settings() -> Dict[str, Any]:
+    """Everything besides the image bytes that determines the OCR output"""
+    return {
+        "pipeline": 8,
+        "preprocess": {
+            "kernel": PREPROCESS_KERNEL,
+            "contrast": PREPROCESS_CONTRAST,
+            "sharpness": PREPROCESS_SHARPNESS
+        },
+        "engine": OCR_ENGINE_SETTINGS,
+        "cls": False,
+        "drop_score": OCR_DROP_SCORE,
+        "resize": {"max_side": OCR_MAX_SIDE, "text_height": OCR_TARGET_TEXT_HEIGHT, "min_side": OCR_MIN_SIDE},
+        "reduced_decode": OCR_REDUCED_DECODE,
+        "crop": {"enabled": OCR_CROP_MARGINS, "padding": OCR_CROP_PADDING, "min_saving": OCR_CROP_MIN_SAVING},
+        "tiling": {"enabled": OCR_TILING, "threshold": OCR_TILE_THRESHOLD, "max_side": OCR_TILE_MAX_SIDE,
+                   "size": OCR_TILE_SIZE, "overlap": OCR_TILE_OVERLAP},
+        "diagrams": {"enabled": DIAGRAM_DETECTION, "max_side": DIAGRAM_MAX_SIDE, "budget_ms": DIAGRAM_BUDGET_MS}
+    }
 
 class OCRResult:
-    def __init__(self, text: str, confidence: float, bounding_boxes: List = None, processing_time: float = 0):
+    def __init__(self, text: str, confidence: float, bounding_boxes: List = None, processing_time: float = 0,
+                 cached: bool = False, error: Optional[str] = None, scale_factor: float = 1.0,
+                 stage_timings: Dict[str, float] = None, equations: Optional[List[str]] = None,
+                 diagrams: Optional[List[str]] = None, decode: Optional[Dict[str, Any]] = None,
+                 crop: Optional[Dict[str, Any]] = None, tiling: Optional[Dict[str, Any]] = None):
         self.text = text
         self.confidence = confidence
         self.bounding_boxes = bounding_boxes or []
         self.processing_time = processing_time
+        self.cached = cached
+        self.error = error
+        self.scale_factor = scale_factor
+        self.stage_timings = stage_timings or {}
+        # Derived from the text, so cached results get them too
+        self.equations = equations if equations is not None else (extract_equations(text) if error is None else [])
+        self.diagrams = diagrams or []
+        # Bytes and pixels decoded for this request; None for cached results and PDF pages
+        self.decode = decode
+        # Content box in original coordinates and the share of the page skipped
+        self.crop = crop
+        # Tile count and duplicates merged when the page was OCR'd in tiles
+        self.tiling = tiling
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields shared by every endpoint that returns OCR output"""
+        return {
+            "text": self.text,
+            "confidence": self.confidence,
+            "bounding_boxes": self.bounding_boxes,
+            "equations": self.equations,
+            "diagrams": self.diagrams,
+            "processing_time": self.processing_time,
+            "cached": self.cached,
+            "scale_factor": self.scale_factor,
+            "stage_timings": self.stage_timings,
+            "decode": self.decode,
+            "crop": self.crop,
+            "tiling": self.tiling
+        }
 
 app = FastAPI(
     title="BrainInk Teacher OCR Service",
@@ -81,6 +381,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized request bodies while they stream in, not after they are buffered
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    default_limit=MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    path_limits={
+        "/ocr-pdf": MAX_PDF_SIZE + MULTIPART_OVERHEAD,
+        "/batch-analyze": BATCH_MAX_FILES * (MAX_FILE_SIZE + MULTIPART_OVERHEAD)
+    }
+)
+
+# Starlette runs the middleware added last first. Metrics wrap the size limit and the app,
+# so rejected and failed requests are timed too
+app.add_middleware(MetricsMiddleware, histogram=HTTP_REQUEST_SECONDS)
+# Outermost: request ids for every log line of a request, the metrics layer included,
+# echoed back as X-Request-ID
+app.add_middleware(RequestContextMiddleware, slow_seconds=LOG_SLOW_REQUEST_SECONDS)
+
+@app.on_event("startup")
+async def start_ocr_pool():
+    """Start the OCR worker pool once the server is up"""
+    if PADDLEOCR_AVAILABLE:
+        ocr_pool.start()
+        readiness_probe.start()
+    if metrics_exporter is not None:
+        metrics_exporter.start()
+
+@app.on_event("shutdown")
+async def stop_ocr_pool():
+    readiness_probe.stop()
+    if metrics_exporter is not None:
+        metrics_exporter.stop()
+    job_scheduler.shutdown()
+    ocr_pool.shutdown()
+    await kana_client.aclose()
+
+@app.exception_handler(OCRQueueFull)
+async def ocr_queue_full_handler(request, exc: OCRQueueFull):
+    """Shed load instead of queueing without bound when all OCR workers are busy"""
+    logger.warning(f"OCR queue full, rejecting request: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "OCR service is busy, please retry shortly"},
+        headers={"Retry-After": "2"}
+    )
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request, exc: JobQueueFull):
+    logger.warning(f"OCR job queue full, rejecting job: {exc}")
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many OCR jobs pending, please retry shortly"},
+        headers={"Retry-After": "5"}
+    )
+
+async def ingest_image_upload(file: UploadFile, allowed_extensions: set = SUPPORTED_IMAGE_TYPES,
+                              allowed_kinds: set = SUPPORTED_IMAGE_KINDS, max_size: int = MAX_FILE_SIZE) -> IngestedUpload:
+    """Validate an uploaded file where the multipart parser spooled it"""
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+    
+    file_ext = Path(file.filename).suffix.lower()
+    if file_ext not in allowed_extensions:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Unsupported file type. Supported: {', '.join(allowed_extensions)}"
+        )
+    
+    upload = await ingest_upload(file, max_size, allowed_kinds=allowed_kinds)
+    INPUT_BYTES.labels(kind=upload.kind).observe(upload.size)
+    return upload
+
+async def read_upload(file: UploadFile, allowed_extensions: set = SUPPORTED_IMAGE_TYPES,
+                      allowed_kinds: set = SUPPORTED_IMAGE_KINDS, max_size: int = MAX_FILE_SIZE) -> bytes:
+    """Validate an uploaded file and read it with bounded memory"""
+    upload = await ingest_image_upload(file, allowed_extensions, allowed_kinds, max_size)
+    try:
+        return upload.read_bytes()
+    finally:
+        upload.close()
+
 def preprocess_image(image: Image.Image) -> Image.Image:
     """Simple preprocessing for better OCR recognition"""
     try:
@@ -94,9 +474,9 @@ def preprocess_image(image: Image.Image) -> Image.Image:
         
         # Simple contrast and sharpness enhancement
         enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(1.2)
+        image = enhancer.enhance(PREPROCESS_CONTRAST)
         enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(1.1)
+        image = enhancer.enhance(PREPROCESS_SHARPNESS)
         
         return image
         
@@ -104,11 +484,270 @@ def preprocess_image(image: Image.Image) -> Image.Image:
         logger.warning(f"Preprocessing failed: {e}, using original image")
         return image
 
-async def process_image_ocr(image_bytes: bytes, filename: str = "") -> OCRResult:
+def ocr_tiled(size: Tuple[int, int]) -> bool:
+    """Whether a page of this full size is OCR'd in tiles"""
+    return OCR_TILING and max(size) > OCR_TILE_THRESHOLD
+
+def ocr_max_side(size: Tuple[int, int]) -> int:
+    """Longest side kept for OCR; tiled scans keep more of their resolution"""
+    return OCR_TILE_MAX_SIDE if ocr_tiled(size) else OCR_MAX_SIDE
+
+def decode_image(image_bytes: bytes, filename: str = "") -> DecodedImage:
+    """Decode an upload upright and opaque, at reduced resolution when OCR would shrink it anyway"""
+    max_side = OCR_MAX_SIDE if OCR_REDUCED_DECODE else 0
+    if OCR_REDUCED_DECODE and OCR_TILING:
+        # Only the header is read here; scans that will be tiled keep more pixels
+        with Image.open(io.BytesIO(image_bytes)) as probe:
+            max_side = ocr_max_side(probe.size)
+    decoded = load_image(image_bytes, max_side, OCR_MIN_SIDE)
+    logger.info(f"Processing image: {filename}, size: {decoded.original_size}, "
+                f"decoded: {decoded.image.size}, mode: {decoded.image.mode}")
+    return decoded
+
+def prepare_image_array(image: Image.Image) -> np.ndarray:
+    """Preprocess a decoded image into the RGB array PaddleOCR expects"""
+    if PREPROCESS_KERNEL == "fused":
+        try:
+            return preprocess_array(image, PREPROCESS_CONTRAST, PREPROCESS_SHARPNESS)
+        except Exception as e:
+            logger.warning(f"Fused preprocessing failed: {e}, falling back to PIL chain")
+    
+    # Apply simple preprocessing
+    processed_image = preprocess_image(image)
+    
+    # Convert to numpy array for PaddleOCR
+    return np.array(processed_image)
+
+def report_stage(progress: Optional[ProgressCallback], stage: str):
+    """Tell an async job which pipeline stage is starting"""
+    if progress is not None:
+        progress(stage)
+
+class StageTimer:
+    """Times each OCR pipeline stage and forwards stage changes to an async job"""
+    def __init__(self, progress: Optional[ProgressCallback] = None):
+        self.progress = progress
+        self.timings: Dict[str, float] = {}
+        self._stage = None
+        self._started = 0.0
+    
+    def start(self, stage: str):
+        self.stop()
+        self._stage = stage
+        self._started = time.perf_counter()
+        report_stage(self.progress, stage)
+    
+    def stop(self):
+        if self._stage is not None:
+            elapsed = time.perf_counter() - self._started
+            self.timings[self._stage] = round(self.timings.get(self._stage, 0.0) + elapsed, 4)
+            OCR_STAGE_SECONDS.labels(stage=self._stage).observe(elapsed)
+            self._stage = None
+
+def crop_text_regions(img_array: np.ndarray, boxes: List[list]) -> List[np.ndarray]:
+    """Cut every detected text box out of the page for the recognizer"""
+    return [crop_text_region(img_array, box) for box in boxes]
+
+def start_diagram_detection(img_array: np.ndarray) -> Optional[asyncio.Future]:
+    """Kick off budgeted diagram detection in a worker thread"""
+    if not DIAGRAM_DETECTION:
+        return None
+    return asyncio.ensure_future(
+        asyncio.to_thread(detect_diagrams, img_array, DIAGRAM_MAX_SIDE, DIAGRAM_BUDGET_MS / 1000)
+    )
+
+async def collect_diagrams(task: Optional[asyncio.Future], timer: StageTimer) -> List[str]:
+    """Wait for diagram detection (normally already done) and record its time"""
+    if task is None:
+        return []
+    try:
+        found = await task
+    except Exception as e:
+        logger.warning(f"Diagram detection failed: {e}")
+        return []
+    timer.timings["diagrams"] = found["elapsed"]
+    OCR_STAGE_SECONDS.labels(stage="diagrams").observe(found["elapsed"])
+    if found["timed_out"]:
+        logger.info(f"⏱️ Diagram detection hit its {DIAGRAM_BUDGET_MS}ms budget, partial result {found['diagrams']}")
+    return found["diagrams"]
+
+async def detect_and_recognize(img_array: np.ndarray, timer: Optional[StageTimer] = None) -> List[list]:
+    """Detection + batched recognition, returning ``[bbox, (text, confidence)]`` lines"""
+    timer = timer or StageTimer()
+    timer.start("detect")
+    boxes = await ocr_pool.detect(img_array)
+    if not boxes:
+        timer.stop()
+        return []
+    
+    timer.start("recognize")
+    crops = await asyncio.to_thread(crop_text_regions, img_array, boxes)
+    recognized = await rec_batcher.recognize(crops)
+    timer.stop()
+    
+    return [
+        [box, (text, confidence)]
+        for box, (text, confidence) in zip(boxes, recognized)
+        if confidence >= OCR_DROP_SCORE
+    ]
+
+async def tiled_detect_and_recognize(img_array: np.ndarray,
+                                     timer: Optional[StageTimer] = None) -> Tuple[List[list], Dict[str, Any]]:
+    """Detection on overlapping tiles in parallel, merged into one reading-ordered list of lines"""
+    timer = timer or StageTimer()
+    height, width = img_array.shape[:2]
+    tiles = plan_tiles(width, height, OCR_TILE_SIZE, OCR_TILE_OVERLAP)
+    # One tile per worker at a time, so a single scan cannot fill the queue other requests need
+    slots = asyncio.Semaphore(max(1, ocr_pool.workers))
+    
+    async def detect_tile(tile):
+        left, top, right, bottom = tile
+        async with slots:
+            return await ocr_pool.detect(img_array[top:bottom, left:right])
+    
+    timer.start("detect")
+    tile_boxes = await asyncio.gather(*(detect_tile(tile) for tile in tiles))
+    timer.start("merge")
+    boxes, removed = merge_tile_boxes(tile_boxes, tiles)
+    report = {"tiles": len(tiles), "tile_size": OCR_TILE_SIZE, "overlap": OCR_TILE_OVERLAP,
+              "duplicates_removed": removed}
+    if not boxes:
+        timer.stop()
+        return [], report
+    
+    # Split so the batcher can spread the crops over several workers
+    timer.start("recognize")
+    crops = await asyncio.to_thread(crop_text_regions, img_array, boxes)
+    chunks = await asyncio.gather(*(
+        rec_batcher.recognize(crops[i:i + REC_BATCH_MAX]) for i in range(0, len(crops), REC_BATCH_MAX)
+    ))
+    recognized = [line for chunk in chunks for line in chunk]
+    timer.stop()
+    
+    lines = [
+        [box, (text, confidence)]
+        for box, (text, confidence) in zip(boxes, recognized)
+        if confidence >= OCR_DROP_SCORE
+    ]
+    return [lines[i] for i in reading_order([line[0] for line in lines])], report
+
+def crop_regions(page: np.ndarray, quads: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+    """Straightened, enhanced crops of the client's regions; None for regions outside the page"""
+    height, width = page.shape[:2]
+    crops = []
+    for quad in quads:
+        inside = clip_quad(quad, width, height)
+        if np.ptp(inside[:, 0]) < 1 or np.ptp(inside[:, 1]) < 1:
+            crops.append(None)
+            continue
+        crop = crop_text_region(page, inside)
+        # Enhanced per crop; only these pixels are ever preprocessed
+        crops.append(enhance_contrast_sharpness(crop, PREPROCESS_CONTRAST, PREPROCESS_SHARPNESS))
+    return crops
+
+async def recognize_regions(image_bytes: bytes, regions: List[Region], filename: str = "") -> OCRResult:
+    """Recognition-only OCR of client-supplied regions, all crops in one recognizer batch"""
+    start_time = time.time()
+    if not PADDLEOCR_AVAILABLE:
+        return OCRResult(
+            text="🚨 MOCK DATA: PaddleOCR not available - this is fallback text",
+            confidence=0.0,
+            processing_time=time.time() - start_time
+        )
+    
+    timer = StageTimer()
+    decoded = None
+    try:
+        timer.start("decode")
+        decoded = await asyncio.to_thread(decode_image, image_bytes, filename)
+        INPUT_PIXELS.observe(decoded.original_pixels)
+        DECODED_PIXELS.observe(decoded.decoded_pixels)
+        
+        # Regions come in full-size coordinates; the page may have been decoded smaller
+        timer.start("preprocess")
+        page = await asyncio.to_thread(image_to_rgb_array, decoded.image)
+        crops = await asyncio.to_thread(crop_regions, page, [quad * decoded.scale for _, quad in regions])
+        
+        timer.start("recognize")
+        recognized = iter(await rec_batcher.recognize([crop for crop in crops if crop is not None]))
+        timer.stop()
+    except OCRQueueFull:
+        raise
+    except Exception as e:
+        logger.error(f"Region OCR error: {e}")
+        timer.stop()
+        return OCRResult(
+            text=f"OCR processing failed: {str(e)}",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            error=str(e),
+            stage_timings=timer.timings,
+            decode=decoded.report() if decoded is not None else None
+        )
+    
+    bounding_boxes = []
+    for (region_id, quad), crop in zip(regions, crops):
+        text, confidence = next(recognized) if crop is not None else ("", 0.0)
+        bounding_boxes.append({
+            "region": region_id,
+            "bbox": quad.round(2).tolist(),
+            "text": text,
+            "confidence": confidence
+        })
+    
+    read = [box for box in bounding_boxes if box["text"]]
+    logger.info(f"✅ Region OCR: read {len(read)} of {len(regions)} regions")
+    return OCRResult(
+        text=" ".join(box["text"] for box in read),
+        confidence=sum(box["confidence"] for box in read) / len(read) if read else 0.0,
+        bounding_boxes=bounding_boxes,
+        processing_time=time.time() - start_time,
+        scale_factor=decoded.scale,
+        stage_timings=timer.timings,
+        decode=decoded.report()
+    )
+
+async def process_image_ocr(image_bytes: bytes, filename: str = "",
+                            progress: Optional[ProgressCallback] = None) -> OCRResult:
+    """OCR processing with a content-addressed result cache in front"""
+    if ocr_cache is None or not PADDLEOCR_AVAILABLE:
+        return await run_image_ocr(image_bytes, filename, progress)
+    
+    start_time = time.time()
+    cache_key = ocr_cache.make_key(image_bytes, ocr_settings())
+    cached = await asyncio.to_thread(ocr_cache.get, cache_key)
+    if cached is not None:
+        logger.info(f"⚡ OCR cache hit for {filename}")
+        return OCRResult(
+            text=cached["text"],
+            confidence=cached["confidence"],
+            bounding_boxes=cached["bounding_boxes"],
+            processing_time=time.time() - start_time,
+            cached=True,
+            scale_factor=cached.get("scale_factor", 1.0),
+            stage_timings={"cache_lookup": round(time.time() - start_time, 4)},
+            diagrams=cached.get("diagrams", []),
+            crop=cached.get("crop")
+        )
+    
+    ocr_result = await run_image_ocr(image_bytes, filename, progress)
+    if ocr_result.succeeded:
+        await asyncio.to_thread(ocr_cache.put, cache_key, {
+            "text": ocr_result.text,
+            "confidence": ocr_result.confidence,
+            "bounding_boxes": ocr_result.bounding_boxes,
+            "scale_factor": ocr_result.scale_factor,
+            "diagrams": ocr_result.diagrams,
+            "crop": ocr_result.crop
+        })
+    return ocr_result
+
+async def run_image_ocr(image_bytes: bytes, filename: str = "",
+                        progress: Optional[ProgressCallback] = None) -> OCRResult:
     """Simple and reliable OCR processing"""
     start_time = time.time()
     
-    if not PADDLEOCR_AVAILABLE or ocr_instance is None:
+    if not PADDLEOCR_AVAILABLE:
         logger.warning("PaddleOCR not available, using mock analysis")
         return OCRResult(
             text="🚨 MOCK DATA: PaddleOCR not available - this is fallback text",
@@ -116,31 +755,106 @@ async def process_image_ocr(image_bytes: bytes, filename: str = "") -> OCRResult
             processing_time=time.time() - start_time
         )
     
+    timer = StageTimer(progress)
+    try:
+        # Decode off the event loop
+        timer.start("decode")
+        decoded = await asyncio.to_thread(decode_image, image_bytes, filename)
+    except Exception as e:
+        logger.error(f"OCR processing error: {e}")
+        timer.stop()
+        return OCRResult(
+            text=f"OCR processing failed: {str(e)}",
+            confidence=0.0,
+            processing_time=time.time() - start_time,
+            error=str(e),
+            stage_timings=timer.timings
+        )
+    
+    INPUT_PIXELS.observe(decoded.original_pixels)
+    DECODED_PIXELS.observe(decoded.decoded_pixels)
+    return await ocr_decoded_image(decoded.image, filename, timer, start_time, decoded)
+
+async def ocr_decoded_image(image: Image.Image, filename: str = "", timer: Optional[StageTimer] = None,
+                            start_time: Optional[float] = None, decoded: Optional[DecodedImage] = None) -> OCRResult:
+    """Resize, preprocess, detect and recognize an already decoded image.
+
+    ``decoded`` describes how an upload was decoded; when it was decoded at
+    reduced resolution, boxes are mapped back to its full size.
+    """
+    timer = timer or StageTimer()
+    start_time = start_time or time.time()
+    scale = decoded.scale if decoded is not None else 1.0
+    decode_report = decoded.report() if decoded is not None else None
+    crop_report = None
+    tiling_report = None
+    if decoded is None:
+        INPUT_PIXELS.observe(image.width * image.height)
+    full_size = decoded.original_size if decoded is not None else image.size
     try:
-        # Convert bytes to PIL Image
-        image = Image.open(io.BytesIO(image_bytes))
-        logger.info(f"Processing image: {filename}, size: {image.size}, mode: {image.mode}")
+        # Shrink oversized photos before detection; boxes are mapped back below
+        timer.start("resize")
+        image, resize_scale = await asyncio.to_thread(
+            resize_for_ocr, image, ocr_max_side(full_size), OCR_TARGET_TEXT_HEIGHT, OCR_MIN_SIDE
+        )
+        scale *= resize_scale
+        SCALE_FACTOR.observe(scale)
+        if scale != 1.0:
+            logger.info(f"Downscaled {filename} by {scale:.3f} to {image.size} before detection")
+        
+        # Detection only sees the inked region; boxes are shifted back below
+        crop_box = None
+        if OCR_CROP_MARGINS:
+            timer.start("crop")
+            image, crop_box, skipped = await asyncio.to_thread(
+                crop_to_content, image, OCR_CROP_PADDING, OCR_CROP_MIN_SAVING
+            )
+            AREA_SKIPPED.observe(skipped)
+            crop_report = {
+                "box": [round(edge / scale, 2) for edge in crop_box] if crop_box else None,
+                "area_skipped": round(skipped, 4)
+            }
         
-        # Apply simple preprocessing
-        processed_image = preprocess_image(image)
+        timer.start("preprocess")
+        img_array = await asyncio.to_thread(prepare_image_array, image)
         
-        # Convert to numpy array for PaddleOCR
-        img_array = np.array(processed_image)
+        # Diagram detection runs on a small pyramid in a thread while text is detected and recognized
+        diagram_task = start_diagram_detection(img_array)
         
-        # Single OCR pass with reliable settings
+        # Detection runs per image in the worker pool; recognition is batched across requests
         logger.info("Running OCR...")
-        result = ocr_instance.ocr(img_array, cls=False)
+        try:
+            if ocr_tiled(full_size) and max(img_array.shape[:2]) > OCR_TILE_SIZE:
+                lines, tiling_report = await tiled_detect_and_recognize(img_array, timer)
+                result = [lines]
+            else:
+                result = [await detect_and_recognize(img_array, timer)]
+        finally:
+            diagrams = await collect_diagrams(diagram_task, timer)
         
         if not result or not result[0]:
             logger.info("No text detected in image")
             return OCRResult(
                 text="No text detected in image",
                 confidence=0.0,
-                processing_time=time.time() - start_time
+                processing_time=time.time() - start_time,
+                scale_factor=scale,
+                stage_timings=timer.timings,
+                diagrams=diagrams,
+                decode=decode_report,
+                crop=crop_report,
+                tiling=tiling_report
             )
         
-        # Sort results by vertical position (top to bottom, left to right)
-        result[0].sort(key=lambda x: (x[0][0][1], x[0][0][0]))
+        # Report boxes in original-image coordinates regardless of the crop and resize
+        for line in result[0]:
+            if crop_box:
+                line[0] = offset_boxes([line[0]], crop_box[0], crop_box[1])[0]
+            line[0] = scale_boxes([line[0]], scale)[0]
+        
+        # Sort results by vertical position (top to bottom, left to right); tiled results already are
+        if tiling_report is None:
+            result[0].sort(key=lambda x: (x[0][0][1], x[0][0][0]))
         
         # Extract and combine text with simple line-based formatting
         extracted_text = ""
@@ -166,31 +880,52 @@ async def process_image_ocr(image_bytes: bytes, filename: str = "") -> OCRResult
         
         if extracted_text:
             logger.info(f"✅ OCR successful: extracted {len(extracted_text)} characters from {text_count} regions")
-            logger.info(f"📝 Extracted text: {extracted_text}")
+            log_payload(payload_logger, "ocr_text", filename=filename, text=extracted_text)
             return OCRResult(
                 text=extracted_text,
                 confidence=avg_confidence,
                 bounding_boxes=bounding_boxes,
-                processing_time=processing_time
+                processing_time=processing_time,
+                scale_factor=scale,
+                stage_timings=timer.timings,
+                diagrams=diagrams,
+                decode=decode_report,
+                crop=crop_report,
+                tiling=tiling_report
             )
         else:
             logger.info("OCR completed but no text detected")
             return OCRResult(
                 text="No text detected in image",
                 confidence=0.0,
-                processing_time=processing_time
+                processing_time=processing_time,
+                scale_factor=scale,
+                stage_timings=timer.timings,
+                diagrams=diagrams,
+                decode=decode_report,
+                crop=crop_report,
+                tiling=tiling_report
             )
             
+    except OCRQueueFull:
+        raise
     except Exception as e:
         logger.error(f"OCR processing error: {e}")
+        timer.stop()
         return OCRResult(
             text=f"OCR processing failed: {str(e)}",
             confidence=0.0,
-            processing_time=time.time() - start_time
+            processing_time=time.time() - start_time,
+            error=str(e),
+            scale_factor=scale,
+            stage_timings=timer.timings,
+            decode=decode_report,
+            crop=crop_report,
+            tiling=tiling_report
         )
 
-async def analyze_with_kana(text: str, image_filename: str = "") -> Dict[str, Any]:
-    """Send extracted text to K.A.N.A. for AI analysis"""
+async def analyze_with_kana(text: str, image_filename: str = "", context: str = "teacher_dashboard_ocr") -> Dict[str, Any]:
+    """Send extracted text to K.A.N.A. for AI analysis (cached by normalized text + context)"""
     
     if not text or len(text.strip()) < 3:
         return {
@@ -200,37 +935,42 @@ async def analyze_with_kana(text: str, image_filename: str = "") -> Dict[str, An
             "confidence": 0.0
         }
     
-    try:
+    async def request_analysis() -> Dict[str, Any]:
         logger.info(f"Sending text to K.A.N.A. API: {KANA_API_URL}")
         
         # Prepare request for K.A.N.A.
         kana_payload = {
             "message": f"Analyze this student content for educational insights: {text}",
-            "context": "teacher_dashboard_ocr",
+            "context": context,
             "image_filename": image_filename
         }
         
-        # Send to K.A.N.A. backend
-        response = requests.post(
-            f"{KANA_API_URL}/api/kana/analyze", 
-            json=kana_payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            analysis_result = response.json()
-            logger.info("✅ K.A.N.A. analysis successful")
-            return analysis_result
-        else:
-            logger.warning(f"K.A.N.A. API error: {response.status_code}")
-            return {
-                "analysis": f"K.A.N.A. API returned status {response.status_code}",
-                "knowledge_gaps": ["API communication issue"],
-                "recommendations": ["Check K.A.N.A. backend service"],
-                "confidence": 0.0
-            }
-            
-    except requests.exceptions.RequestException as e:
+        # Send to K.A.N.A. backend over the shared keep-alive client
+        response = await kana_client.analyze(kana_payload, deadline=KANA_TIMEOUT)
+        if response.status_code != 200:
+            raise KanaStatusError(response.status_code)
+        logger.info("✅ K.A.N.A. analysis successful")
+        analysis = response.json()
+        log_payload(payload_logger, "kana_analysis", image_filename=image_filename, analysis=analysis)
+        return analysis
+    
+    try:
+        if analysis_cache is None:
+            return await request_analysis()
+        analysis_result, status = await analysis_cache.get_or_compute(text, context, request_analysis)
+        if status != "miss":
+            logger.info(f"♻️ K.A.N.A. analysis served from cache ({status})")
+        return analysis_result
+    
+    except KanaStatusError as e:
+        logger.warning(f"K.A.N.A. API error: {e.status_code}")
+        return {
+            "analysis": f"K.A.N.A. API returned status {e.status_code}",
+            "knowledge_gaps": ["API communication issue"],
+            "recommendations": ["Check K.A.N.A. backend service"],
+            "confidence": 0.0
+        }
+    except (httpx.HTTPError, CircuitOpen) as e:
         logger.error(f"K.A.N.A. API request failed: {e}")
         # Provide intelligent mock analysis when K.A.N.A. is unavailable
         return {
@@ -252,35 +992,67 @@ async def analyze_with_kana(text: str, image_filename: str = "") -> Dict[str, An
             "confidence": 0.0
         }
 
-async def analyze_image_directly_with_kana(image_bytes: bytes, filename: str = "") -> Dict[str, Any]:
-    """Send image directly to K.A.N.A. for direct image analysis (like in townsquare)"""
+async def analyze_image_directly_with_kana(image_bytes: bytes, filename: str = "") -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Send image directly to K.A.N.A. for direct image analysis (like in townsquare)
+
+    Returns the analysis and a transport report (bytes saved, latencies).
+    """
+    transport: Dict[str, Any] = {"mode": KANA_DIRECT_TRANSPORT}
     
     try:
         logger.info(f"Sending image directly to K.A.N.A. API: {KANA_API_URL}")
         
-        # Convert image to base64 for sending to K.A.N.A.
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-        
-        # Prepare request for K.A.N.A. direct image analysis
-        kana_payload = {
-            "message": "Please analyze this student work image for educational insights. Extract any text, identify key concepts, and provide teaching recommendations.",
-            "context": "teacher_dashboard_direct_image",
-            "image_filename": filename,
-            "image_data": image_base64,
-            "image_analysis": True  # Flag to indicate this is direct image analysis
-        }
+        # Downscale, crop and re-encode off the event loop; the original upload is sent if that fails
+        try:
+            prepared = await asyncio.to_thread(
+                prepare_image, image_bytes, KANA_DIRECT_MAX_SIDE, KANA_DIRECT_QUALITY, KANA_DIRECT_CROP
+            )
+            image_data, content_type = prepared.data, prepared.content_type
+            transport.update(prepared.report())
+        except Exception as e:
+            logger.warning(f"⚠️ Could not compact image for K.A.N.A., sending original: {e}")
+            image_data, content_type = image_bytes, "application/octet-stream"
+            transport.update({"original_bytes": len(image_bytes), "sent_bytes": len(image_bytes), "bytes_saved": 0})
+        kana_client.stats["direct_image_bytes_sent"] += transport["sent_bytes"]
+        kana_client.stats["direct_image_bytes_saved"] += transport["bytes_saved"]
         
-        # Send to K.A.N.A. backend for direct image processing
-        response = requests.post(
-            f"{KANA_API_URL}/api/kana/analyze", 
-            json=kana_payload,
-            timeout=45  # Longer timeout for image processing
+        message = "Please analyze this student work image for educational insights. Extract any text, identify key concepts, and provide teaching recommendations."
+        request_start = time.perf_counter()
+        if KANA_DIRECT_TRANSPORT == "multipart":
+            # Raw bytes as a file part on K.A.N.A.'s image upload route
+            response = await kana_client.analyze_image(
+                image_data, content_type, filename,
+                fields={"conversationId": KANA_DIRECT_CONVERSATION_ID, "message": message},
+                deadline=KANA_DIRECT_TIMEOUT, path=KANA_DIRECT_UPLOAD_PATH
+            )
+        else:
+            kana_payload = {
+                "message": message,
+                "context": "teacher_dashboard_direct_image",
+                "image_filename": filename,
+                "image_data": base64.b64encode(image_data).decode('ascii'),
+                "image_analysis": True  # Flag to indicate this is direct image analysis
+            }
+            response = await kana_client.analyze(kana_payload, deadline=KANA_DIRECT_TIMEOUT)
+        transport["kana_latency"] = round(time.perf_counter() - request_start, 4)
+        logger.info(
+            f"📦 K.A.N.A. image transport: {transport['original_bytes']} -> {transport['sent_bytes']} bytes "
+            f"({transport['bytes_saved']} saved), K.A.N.A. latency {transport['kana_latency']}s"
         )
         
         if response.status_code == 200:
             analysis_result = response.json()
+            if KANA_DIRECT_TRANSPORT == "multipart":
+                # The upload route answers in chat form; map it onto the analysis shape
+                explanation = analysis_result.get("explanation") or analysis_result.get("kanaResponse", "")
+                analysis_result = {
+                    "analysis": explanation,
+                    "knowledge_gaps": analysis_result.get("knowledge_gaps", []),
+                    "recommendations": analysis_result.get("recommendations", []),
+                    "extracted_text": analysis_result.get("extracted_text", "")
+                }
             logger.info("✅ K.A.N.A. direct image analysis successful")
-            return analysis_result
+            return analysis_result, transport
         else:
             logger.warning(f"K.A.N.A. direct image API error: {response.status_code}")
             return {
@@ -289,9 +1061,9 @@ async def analyze_image_directly_with_kana(image_bytes: bytes, filename: str = "
                 "recommendations": ["Check K.A.N.A. backend service"],
                 "confidence": 0.0,
                 "extracted_text": "API Error"
-            }
+            }, transport
             
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, CircuitOpen) as e:
         logger.error(f"K.A.N.A. direct image API request failed: {e}")
         return {
             "analysis": "Direct image analysis unavailable - K.A.N.A. backend not reachable",
@@ -303,7 +1075,7 @@ async def analyze_image_directly_with_kana(image_bytes: bytes, filename: str = "
             ],
             "confidence": 0.0,
             "extracted_text": "Service Unavailable"
-        }
+        }, transport
     except Exception as e:
         logger.error(f"K.A.N.A. direct image analysis error: {e}")
         return {
@@ -312,140 +1084,279 @@ async def analyze_image_directly_with_kana(image_bytes: bytes, filename: str = "
             "recommendations": ["Try again or use OCR+Analysis option"],
             "confidence": 0.0,
             "extracted_text": "Error"
-        }
+        }, transport
+
+def readiness_status() -> Dict[str, Any]:
+    """Readiness from the last background self-test plus current queue pressure"""
+    status = readiness_probe.snapshot()
+    stale = status["self_test_age"] is not None and status["self_test_age"] > 3 * READINESS_INTERVAL
+    saturated = ocr_pool_saturated()
+    
+    reasons = []
+    if not PADDLEOCR_AVAILABLE:
+        reasons.append("PaddleOCR not available")
+    elif not readiness_probe.ok:
+        reasons.append(readiness_probe.error or "self-test failed")
+    if stale:
+        reasons.append("self-test result is stale")
+    if saturated:
+        reasons.append("OCR queue saturated")
+    
+    return {
+        "ready": not reasons,
+        "reasons": reasons,
+        "queue_depth": ocr_pool.queue_depth,
+        "queue_capacity": ocr_pool.capacity,
+        "ocr_workers": ocr_pool.workers,
+        "active_jobs": job_scheduler.active_jobs,
+        **status
+    }
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness probe - the process is up and the event loop is responsive"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe - cached self-test result and queue depth, never runs inference"""
+    status = readiness_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint with detailed status"""
-    
-    # Test OCR with a simple operation
-    ocr_working = False
-    if PADDLEOCR_AVAILABLE and ocr_instance:
-        try:
-            import numpy as np
-            test_image = np.ones((50, 100, 3), dtype=np.uint8) * 255
-            test_result = ocr_instance.ocr(test_image)
-            ocr_working = True
-            print(f"🔧 HEALTH CHECK: OCR test passed - result: {test_result}")
-        except Exception as e:
-            print(f"🔧 HEALTH CHECK: OCR test failed - {e}")
-            ocr_working = False
-    else:
-        print("🔧 HEALTH CHECK: ocr_instance is None")
+    """Health check endpoint with detailed status (served from the cached self-test)"""
+    readiness = readiness_status()
     
     return {
         "status": "healthy",
-        "ocr_available": PADDLEOCR_AVAILABLE and ocr_instance is not None,
-        "ocr_working": ocr_working,
+        "ocr_available": PADDLEOCR_AVAILABLE and ocr_pool.running,
+        "ocr_working": readiness["self_test_ok"],
+        "ocr_workers": ocr_pool.workers,
+        "ocr_queue_depth": ocr_pool.queue_depth,
+        "ocr_pool_restarts": ocr_pool.restarts,
+        "ocr_engine": preload_info(),
+        "process": {"pid": os.getpid(), **read_process_memory(os.getpid())},
+        "ready": readiness["ready"],
+        "self_test_checked_at": readiness["self_test_checked_at"],
+        "ocr_cache": ocr_cache.snapshot() if ocr_cache else None,
+        "recognition_batching": rec_batcher.snapshot(),
         "kana_api": KANA_API_URL,
+        "kana_client": kana_client.snapshot(),
+        "analysis_cache": analysis_cache.snapshot() if analysis_cache else None,
         "google_api_configured": bool(GOOGLE_API_KEY),
         "timestamp": datetime.now().isoformat()
     }
 
 @app.post("/ocr")
-async def process_ocr(file: UploadFile = File(...)):
-    """Process OCR on uploaded image"""
-    
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
-    
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in SUPPORTED_IMAGE_TYPES:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file type. Supported: {', '.join(SUPPORTED_IMAGE_TYPES)}"
-        )
+async def process_ocr(request: Request, file: UploadFile = File(...),
+                      regions: Optional[str] = Form(None),
+                      response_format: Optional[str] = Query(None, alias="format"),
+                      compress: Optional[str] = None):
+    """Process OCR on uploaded image
+
+    With a ``regions`` form field (a JSON list of rectangles or polygons, see
+    regions.py) detection is skipped and only those regions are recognized,
+    each returning its own text and confidence in ``bounding_boxes``.
+
+    The response layout (json, columnar, binary) and compression (gzip, br)
+    follow the Accept / Accept-Encoding headers or the format / compress flags.
+    """
+    fmt = negotiate_format(request.headers.get("accept"), response_format)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), compress)
+    parsed_regions = parse_regions(regions, OCR_MAX_REGIONS) if regions is not None else None
     
-    # Check file size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="File too large")
+    # Validate and read the upload in chunks, rejecting oversized files early
+    content = await read_upload(file)
     
     # Process with OCR
-    ocr_result = await process_image_ocr(content, file.filename)
+    if parsed_regions is not None:
+        ocr_result = await recognize_regions(content, parsed_regions, file.filename)
+    else:
+        ocr_result = await process_image_ocr(content, file.filename)
     
-    return {
+    return render_ocr_response({
         "success": True,
         "filename": file.filename,
-        "text": ocr_result.text,
-        "confidence": ocr_result.confidence,
-        "bounding_boxes": ocr_result.bounding_boxes,
-        "processing_time": ocr_result.processing_time,
+        "mode": "regions" if parsed_regions is not None else "page",
+        **ocr_result.to_dict(),
         "message": "✅ Real OCR processing completed" if PADDLEOCR_AVAILABLE else "Mock OCR response"
-    }
+    }, fmt, encoding)
+
+@app.post("/ocr-pdf")
+async def process_pdf_ocr(file: UploadFile = File(...), dpi: Optional[int] = None):
+    """OCR a multi-page PDF, streaming one NDJSON record per page as pages finish"""
+    
+    content = await read_upload(file, allowed_extensions={".pdf"}, allowed_kinds={"pdf"}, max_size=MAX_PDF_SIZE)
+    filename = file.filename
+    render_dpi = min(max(dpi or PDF_DPI, 72), 600)
+    
+    # Open before streaming: once the 200 has gone out a corrupt file can only truncate the stream
+    try:
+        document = await asyncio.to_thread(open_pdf, content)
+    except InvalidPDF as e:
+        raise HTTPException(status_code=400, detail=f"Invalid PDF: {e}")
+    
+    async def ocr_page(image: Image.Image, label: str) -> Dict[str, Any]:
+        ocr_result = await ocr_decoded_image(image, label)
+        if not ocr_result.succeeded:
+            raise RuntimeError(ocr_result.error)
+        return ocr_result.to_dict()
+    
+    async def stream_pages():
+        async for record in iter_pdf_pages(
+            document, filename, ocr_page,
+            dpi=render_dpi,
+            concurrency=PDF_PAGE_CONCURRENCY,
+            min_text_chars=PDF_TEXT_MIN_CHARS,
+            scan_coverage=PDF_SCAN_COVERAGE
+        ):
+            yield json.dumps(record) + "\n"
+    
+    return StreamingResponse(stream_pages(), media_type="application/x-ndjson")
 
 @app.post("/ocr-analyze")
 async def process_ocr_and_analyze(file: UploadFile = File(...)):
     """Process OCR and perform K.A.N.A. AI analysis"""
     
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
-    
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in SUPPORTED_IMAGE_TYPES:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file type. Supported: {', '.join(SUPPORTED_IMAGE_TYPES)}"
-        )
+    # Validate and read the upload in chunks, rejecting oversized files early
+    content = await read_upload(file)
     
-    # Check file size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="File too large")
+    return await ocr_and_analyze(content, file.filename)
+
+async def analyze_extracted_text(text: str, filename: str) -> Dict[str, Any]:
+    """K.A.N.A. analysis of OCR text, or a placeholder when nothing was read"""
+    if text and text != "No text detected in image":
+        return await analyze_with_kana(text, filename)
+    return {
+        "analysis": "No text detected for analysis",
+        "knowledge_gaps": [],
+        "recommendations": ["Upload an image with clearer text"],
+        "confidence": 0.0
+    }
+
+async def ocr_and_analyze(content: bytes, filename: str,
+                          progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """OCR an image and analyze the extracted text with K.A.N.A."""
     
     # Process with OCR
-    ocr_result = await process_image_ocr(content, file.filename)
+    ocr_result = await process_image_ocr(content, filename, progress)
     
     # Analyze with K.A.N.A. if text was extracted
-    if ocr_result.text and ocr_result.text != "No text detected in image":
-        kana_analysis = await analyze_with_kana(ocr_result.text, file.filename)
-    else:
-        kana_analysis = {
-            "analysis": "No text detected for analysis",
-            "knowledge_gaps": [],
-            "recommendations": ["Upload an image with clearer text"],
-            "confidence": 0.0
-        }
+    report_stage(progress, "analyze")
+    kana_analysis = await analyze_extracted_text(ocr_result.text, filename)
     
     return {
         "success": True,
-        "filename": file.filename,
-        "ocr": {
-            "text": ocr_result.text,
-            "confidence": ocr_result.confidence,
-            "bounding_boxes": ocr_result.bounding_boxes,
-            "processing_time": ocr_result.processing_time
-        },
+        "filename": filename,
+        "ocr": ocr_result.to_dict(),
         "analysis": kana_analysis,
         "message": "✅ OCR and AI analysis completed" if PADDLEOCR_AVAILABLE else "Mock response"
     }
 
+@app.post("/batch-analyze")
+async def batch_analyze(files: List[UploadFile] = File(...)):
+    """OCR + K.A.N.A. analysis for many files, streaming one NDJSON record per file as each completes"""
+    
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many files (max {BATCH_MAX_FILES})")
+    
+    # Validate everything up front (large files stay spooled on disk); rejected files become error records
+    uploads = []
+    for file in files:
+        try:
+            uploads.append((file.filename, await ingest_image_upload(file)))
+        except HTTPException as e:
+            uploads.append((file.filename, e))
+    
+    async def ocr_file(filename: str, upload: IngestedUpload) -> Dict[str, Any]:
+        try:
+            content = upload.read_bytes()
+        finally:
+            upload.close()
+        ocr_result = await process_image_ocr(content, filename)
+        if not ocr_result.succeeded:
+            raise RuntimeError(ocr_result.error)
+        return ocr_result.to_dict()
+    
+    async def analyze(filename: str, ocr: Dict[str, Any]) -> Dict[str, Any]:
+        return await analyze_extracted_text(ocr["text"], filename)
+    
+    async def stream_results():
+        try:
+            async for record in iter_batch_results(
+                uploads, ocr_file, analyze,
+                ocr_concurrency=BATCH_OCR_CONCURRENCY,
+                analyze_concurrency=BATCH_ANALYZE_CONCURRENCY
+            ):
+                yield json.dumps(record) + "\n"
+        finally:
+            for _, upload in uploads:
+                if isinstance(upload, IngestedUpload):
+                    upload.close()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/jobs", status_code=202)
+async def create_ocr_job(file: UploadFile = File(...), analyze: bool = True):
+    """Queue OCR (+ K.A.N.A. analysis) in the background and return a job id immediately"""
+    
+    # Validate and read the upload in chunks, rejecting oversized files early
+    content = await read_upload(file)
+    
+    filename = file.filename
+    
+    async def run(job) -> Dict[str, Any]:
+        if analyze:
+            return await ocr_and_analyze(content, filename, job.report_stage)
+        ocr_result = await process_image_ocr(content, filename, job.report_stage)
+        if not ocr_result.succeeded:
+            raise RuntimeError(ocr_result.error)
+        return {
+            "success": True,
+            "filename": filename,
+            **ocr_result.to_dict()
+        }
+    
+    job = job_scheduler.submit(filename, run)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_ocr_job(job_id: str):
+    """Poll a background OCR job for its status and result"""
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_ocr_job_events(job_id: str):
+    """Server-sent events: queued, started, one per pipeline stage, then completed/failed"""
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return StreamingResponse(
+        stream_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/kana-direct")
 async def process_kana_direct_analysis(file: UploadFile = File(...)):
     """Send image directly to K.A.N.A. for direct image analysis (like townsquare)"""
     
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
-    
-    file_ext = Path(file.filename).suffix.lower()
-    if file_ext not in SUPPORTED_IMAGE_TYPES:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Unsupported file type. Supported: {', '.join(SUPPORTED_IMAGE_TYPES)}"
-        )
-    
-    # Check file size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=413, detail="File too large")
+    # Validate and read the upload in chunks, rejecting oversized files early
+    content = await read_upload(file)
     
     start_time = time.time()
     
     # Send directly to K.A.N.A. for image analysis
-    kana_analysis = await analyze_image_directly_with_kana(content, file.filename)
+    kana_analysis, transport = await analyze_image_directly_with_kana(content, file.filename)
     
     processing_time = time.time() - start_time
     
@@ -454,10 +1365,32 @@ async def process_kana_direct_analysis(file: UploadFile = File(...)):
         "filename": file.filename,
         "method": "kana_direct_image_analysis",
         "analysis": kana_analysis,
+        "transport": transport,
         "processing_time": processing_time,
         "message": "✅ K.A.N.A. direct image analysis completed"
     }
 
+@app.delete("/analysis-cache")
+async def invalidate_analysis_cache(context: Optional[str] = None):
+    """Drop cached K.A.N.A. analyses for one context, or all of them when no context is given"""
+    if analysis_cache is None:
+        raise HTTPException(status_code=404, detail="Analysis cache is disabled")
+    
+    removed = analysis_cache.invalidate(context)
+    return {
+        "success": True,
+        "context": context,
+        "removed": removed,
+        "cache": analysis_cache.snapshot()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latencies, queue depths, cache and K.A.N.A. counters, input sizes"""
+    body = await asyncio.to_thread(metrics_exporter.render) if metrics_exporter else metrics_registry.render()
+    # Passed as a header: media_type would get a second charset appended
+    return Response(content=body, headers={"Content-Type": METRICS_CONTENT_TYPE})
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -465,12 +1398,21 @@ async def root():
         "service": "BrainInk Teacher OCR Service",
         "version": "2.1.0",
         "status": "ready",
-        "ocr_available": PADDLEOCR_AVAILABLE and ocr_instance is not None,
+        "ocr_available": PADDLEOCR_AVAILABLE and ocr_pool.running,
         "endpoints": {
             "/health - GET": "Health check",
-            "/ocr - POST": "OCR processing only",
+            "/livez - GET": "Liveness probe",
+            "/readyz - GET": "Readiness probe (cached self-test + queue depth)",
+            "/metrics - GET": "Prometheus metrics (per-stage latency, queue depth, cache and K.A.N.A. counters)",
+            "/ocr - POST": "OCR processing only (?format=json|columnar|binary, ?compress=gzip|br)",
             "/ocr-analyze - POST": "OCR + K.A.N.A. AI analysis",
+            "/batch-analyze - POST": "OCR + K.A.N.A. analysis for many files, streams one NDJSON record per file",
+            "/ocr-pdf - POST": "Multi-page PDF OCR, streams one NDJSON record per page",
             "/kana-direct - POST": "Direct K.A.N.A. image analysis (like townsquare)",
+            "/analysis-cache - DELETE": "Invalidate cached K.A.N.A. analyses (optionally ?context=...)",
+            "/jobs - POST": "Queue OCR + analysis in the background, returns a job id",
+            "/jobs/{job_id} - GET": "Job status and results",
+            "/jobs/{job_id}/events - GET": "Server-sent progress events for a job",
             "/ - GET": "This endpoint"
         }
     }
@@ -478,6 +1420,9 @@ async def root():
 if __name__ == "__main__":
     print("🚀 Starting BrainInk Teacher OCR Service...")
     print(f"🔧 OCR Available: {PADDLEOCR_AVAILABLE}")
+    print(f"🔧 OCR Workers: {OCR_WORKERS} (queue size {OCR_QUEUE_SIZE})")
+    print(f"🔧 Recognition batching: up to {REC_BATCH_MAX} crops / {REC_BATCH_WAIT_MS}ms")
     print(f"🔧 K.A.N.A. API: {KANA_API_URL}")
     print(f"🔧 Google API Key: {'✅ Configured' if GOOGLE_API_KEY else '❌ Not configured'}")
-    uvicorn.run(app, host="0.0.0.0", port=8003)
+    # log_config=None hands uvicorn's loggers to the queue-backed root logger
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8003")), log_config=None)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the OCR service, on top of ``prometheus_client``.
+
+Counters, gauges and histograms are regular ``prometheus_client`` metrics
+held in one ``CollectorRegistry`` and rendered for a ``/metrics`` endpoint.
+Values that other components already count (cache statistics, queue depth,
+breaker state) are read through callbacks instead of being counted twice:
+before every scrape, and every few seconds behind the pre-fork launcher,
+each callback's current values are copied into a real gauge or counter.
+
+Behind the pre-fork launcher a scrape is answered by whichever worker
+accepts it. The launcher sets ``PROMETHEUS_MULTIPROC_DIR`` before the app is
+imported, every worker then writes its samples to memory-mapped files there,
+and ``MultiProcessMetrics`` renders them summed per series with
+``prometheus_client``'s multiprocess collector. Counters and histograms of
+workers that have exited are kept so totals never go backwards; their gauges
+are dropped once the launcher calls ``mark_process_dead``.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST
+
+# Seconds, from a fast cache hit to a slow multi-page PDF
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Upload sizes, 16 KB to 64 MB
+BYTE_BUCKETS = tuple(float(16384 * 4 ** i) for i in range(8))
+# Decoded image sizes, 0.25 to 64 megapixels
+PIXEL_BUCKETS = tuple(250000.0 * 2 ** i for i in range(9))
+
+# The multiprocess collector has no _created series; leave them out everywhere
+prometheus_client.disable_created_metrics()
+
+CallbackSamples = Iterable[Tuple[Dict[str, object], float]]
+
+
+class CallbackMetric:
+    """Counter or gauge whose values are read from ``collect()`` when refreshed.
+
+    Gauges take the collected value as it is. Counters must only grow, so the
+    increase since the last refresh is added; a source that went backwards
+    (its owner was replaced) is taken as the new starting point.
+    """
+
+    def __init__(self, metric, kind: str, collect: Callable[[], CallbackSamples]):
+        self.metric = metric
+        self.kind = kind
+        self.collect = collect
+        self._last: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        # The scrape and the periodic refresh run on different threads
+        self._lock = threading.Lock()
+
+    def _child(self, labels: Dict[str, str]):
+        return self.metric.labels(**labels) if labels else self.metric
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        for labels, value in self.collect():
+            if value is None:
+                continue
+            labels = {name: str(v) for name, v in labels.items()}
+            if self.kind == "gauge":
+                self._child(labels).set(value)
+                continue
+            key = tuple(sorted(labels.items()))
+            increase = value - self._last.get(key, 0.0)
+            self._last[key] = value
+            if increase > 0:
+                self._child(labels).inc(increase)
+
+
+class MetricsRegistry:
+    """Holds the service's metrics and renders them for a scrape"""
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self._callbacks: Dict[str, CallbackMetric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return Counter(name, documentation, labelnames, registry=self.registry)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        # Behind the pre-fork launcher: summed over the workers that are alive
+        return Gauge(name, documentation, labelnames, registry=self.registry, multiprocess_mode="livesum")
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return Histogram(name, documentation, labelnames, registry=self.registry, buckets=buckets)
+
+    def callback(self, name: str, documentation: str, kind: str, collect: Callable[[], CallbackSamples],
+                 labelnames: Sequence[str] = ()) -> CallbackMetric:
+        if kind not in ("counter", "gauge"):
+            raise ValueError(f"{name}: callback metrics are counters or gauges, not {kind}")
+        metric = (self.counter if kind == "counter" else self.gauge)(name, documentation, labelnames)
+        callback = self._callbacks[name] = CallbackMetric(metric, kind, collect)
+        return callback
+
+    def refresh(self):
+        """Copy every callback's current values into its metric"""
+        for name, callback in self._callbacks.items():
+            try:
+                callback.refresh()
+            except Exception as e:
+                logger.warning(f"Could not read metric {name}: {e}")
+
+    def render(self) -> str:
+        self.refresh()
+        return generate_latest(self.registry).decode("utf-8")
+
+
+def mark_process_dead(pid: int):
+    """Drop the gauges of an exited worker from the shared directory, if there is one"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+class MultiProcessMetrics:
+    """Renders the samples of every process sharing ``directory`` (``PROMETHEUS_MULTIPROC_DIR``).
+
+    Regular metrics reach the shared files on every update. Callback metrics
+    are refreshed every ``interval`` seconds and right before rendering, so a
+    scrape sees its own values live and the other workers' values at most
+    ``interval`` seconds old.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def render(self) -> str:
+        self.registry.refresh()
+        merged = CollectorRegistry()
+        multiprocess.MultiProcessCollector(merged, path=self.directory)
+        return generate_latest(merged).decode("utf-8")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.registry.refresh)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.registry.refresh()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template, method and status"""
+
+    def __init__(self, app, histogram: Histogram, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.histogram = histogram
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def recording_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            # FastAPI stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            self.histogram.labels(
+                route=getattr(route, "path", "unmatched"),
+                method=scope.get("method", ""),
+                status=str(status)
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for OCR results.
+
+Keys are a SHA-256 of the image bytes plus a fingerprint of every setting
+that can change the OCR output (preprocessing factors, engine options), so a
+settings change never serves stale text. Lookups go through a small in-memory
+LRU first and then a size-bounded directory of JSON files on disk.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def settings_fingerprint(settings: Dict[str, Any]) -> str:
+    """Stable string form of the settings that influence OCR output"""
+    return json.dumps(settings, sort_keys=True, separators=(",", ":"))
+
+
+class OCRResultCache:
+    """Two-tier (memory LRU + disk) cache of OCR result dictionaries"""
+
+    def __init__(self, cache_dir: Path, memory_items: int = 256, disk_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.memory_items = max(0, memory_items)
+        self.disk_bytes = max(0, disk_bytes)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage: Optional[int] = None
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "disk_evictions": 0
+        }
+        if self.disk_bytes:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, image_bytes: bytes, settings: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(image_bytes)
+        digest.update(b"\0")
+        digest.update(settings_fingerprint(settings).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a key up in memory, then on disk (promoting disk hits to memory)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._remember(key, entry)
+            self.stats["stores"] += 1
+        self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        if not self.memory_items:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_bytes:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # Refresh mtime so disk eviction is least-recently-used as well
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable OCR cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        if not self.disk_bytes:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+            # Write then rename so readers never see a half-written entry
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            with self._lock:
+                if self._disk_usage is not None:
+                    self._disk_usage += len(data)
+            self._enforce_disk_limit()
+        except OSError as e:
+            logger.warning(f"Failed to write OCR cache entry: {e}")
+
+    def _enforce_disk_limit(self):
+        with self._lock:
+            if self._disk_usage is not None and self._disk_usage <= self.disk_bytes:
+                return
+
+        files = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        # Evict oldest entries until we are back under 90% of the budget
+        target = int(self.disk_bytes * 0.9)
+        evicted = 0
+        if total > self.disk_bytes:
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self._disk_usage = total
+            self.stats["disk_evictions"] += evicted
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters for health/metrics endpoints"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_usage
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+PaddleOCR engine helpers shared by the API process and the OCR worker processes
+"""
+import logging
+from typing import Any, List, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Constructor options for every predictor in the service; also part of the OCR cache key
+OCR_ENGINE_SETTINGS = {
+    "lang": "en",
+    "use_gpu": False,
+    "use_space_char": True
+}
+
+
+def create_ocr_engine(**overrides):
+    """Build a PaddleOCR predictor with the service's standard settings.
+
+    ``overrides`` carries options that affect throughput but not output,
+    such as ``rec_batch_num``.
+    """
+    import paddleocr
+
+    return paddleocr.PaddleOCR(**OCR_ENGINE_SETTINGS, **overrides)
+
+
+def detect_text_boxes(engine, img_array: np.ndarray) -> List[list]:
+    """Run only the text detector and return quadrilaterals as plain lists"""
+    dt_boxes, _ = engine.text_detector(img_array)
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return []
+    return np.asarray(dt_boxes, dtype=np.float32).tolist()
+
+
+def recognize_crops(engine, crops: Sequence[np.ndarray]) -> List[tuple]:
+    """Run only the text recognizer over pre-cropped text lines"""
+    if not crops:
+        return []
+    rec_res, _ = engine.text_recognizer(list(crops))
+    return [(str(text), float(confidence)) for text, confidence in rec_res]
+
+
+def crop_text_region(img_array: np.ndarray, box: Sequence[Sequence[float]]) -> np.ndarray:
+    """Perspective-crop one detected quadrilateral into an upright text line.
+
+    Mirrors PaddleOCR's own ``get_rotate_crop_image`` so recognition sees the
+    same crops it would inside ``PaddleOCR.ocr``.
+    """
+    import cv2
+
+    points = np.asarray(box, dtype=np.float32)
+    crop_width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    crop_height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    crop_width = max(crop_width, 1)
+    crop_height = max(crop_height, 1)
+    target = np.float32([[0, 0], [crop_width, 0], [crop_width, crop_height], [0, crop_height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(
+        img_array, matrix, (crop_width, crop_height),
+        borderMode=cv2.BORDER_REPLICATE,
+        flags=cv2.INTER_CUBIC
+    )
+    # Vertical text lines are rotated so the recognizer reads them left to right
+    if crop_height / crop_width >= 1.5:
+        crop = np.rot90(crop)
+    return np.ascontiguousarray(crop)
+
+
+def normalize_ocr_result(result: Any) -> List[list]:
+    """Convert a raw PaddleOCR page result into plain Python lists.
+
+    PaddleOCR returns numpy scalars for confidences, which are slow to pickle
+    across process boundaries and are not JSON serializable. Each line comes
+    back as ``[bbox, (text, confidence)]`` with ``bbox`` a list of four points.
+    """
+    if not result or not result[0]:
+        return []
+
+    lines = []
+    for line in result[0]:
+        bbox, (text, confidence) = line
+        lines.append([
+            [[float(x), float(y)] for x, y in bbox],
+            (str(text), float(confidence))
+        ])
+    return lines
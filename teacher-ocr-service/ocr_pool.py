@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+OCR worker pool - runs PaddleOCR in separate processes so inference never
+blocks the FastAPI event loop.
+
+Each worker process builds its own PaddleOCR predictor once, in the pool
+initializer. Image arrays are handed to workers through POSIX shared memory
+rather than pickled, so a 12 MP scan costs one memcpy instead of a pickle
+round trip. With ``workers=0`` the pool falls back to a single in-process
+thread, which keeps the event loop free without spawning any processes.
+
+``preload_engine`` loads the predictor before any worker exists. Processes
+forked afterwards (see prefork.py) inherit it and share its weights
+copy-on-write instead of loading their own.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ocr_engine import create_ocr_engine, detect_text_boxes, normalize_ocr_result, recognize_crops
+
+logger = logging.getLogger(__name__)
+
+# Predictor owned by the current worker process (or by the in-process thread)
+_worker_engine = None
+# Set by preload_engine in the parent; forked children inherit both
+_preloaded_by: Optional[int] = None
+_preload_time: Optional[float] = None
+
+
+class OCRQueueFull(Exception):
+    """Raised when the pool already holds its maximum number of pending jobs"""
+
+
+def preload_engine(engine_options: Optional[Dict[str, Any]] = None) -> float:
+    """Load the predictor in this process so forked children can share it.
+
+    Only loads: running inference here would start OpenMP threads, which do
+    not survive a fork. Returns the load time in seconds.
+    """
+    global _worker_engine, _preloaded_by, _preload_time
+    start = time.perf_counter()
+    _worker_engine = create_ocr_engine(**(engine_options or {}))
+    _preloaded_by = os.getpid()
+    _preload_time = round(time.perf_counter() - start, 3)
+    return _preload_time
+
+
+def preload_info() -> Dict[str, Any]:
+    """Whether this process runs on a predictor loaded before it was forked"""
+    return {
+        "preloaded": _preloaded_by is not None,
+        "loaded_by_pid": _preloaded_by,
+        "load_time": _preload_time,
+        "inherited": _preloaded_by is not None and _preloaded_by != os.getpid()
+    }
+
+
+def _init_worker(engine_options: Optional[Dict[str, Any]] = None):
+    """Process pool initializer - load one PaddleOCR predictor per worker"""
+    global _worker_engine
+    if _worker_engine is not None:
+        # Preloaded before the fork: keep sharing the parent's weights
+        logger.info(f"✅ OCR worker {multiprocessing.current_process().name} reusing preloaded predictor")
+        return
+    try:
+        _worker_engine = create_ocr_engine(**(engine_options or {}))
+        logger.info(f"✅ OCR worker {multiprocessing.current_process().name} ready")
+    except Exception as e:
+        logger.error(f"❌ OCR worker failed to initialize PaddleOCR: {e}")
+        _worker_engine = None
+
+
+def _get_engine():
+    if _worker_engine is None:
+        raise RuntimeError("PaddleOCR is not available in this worker")
+    return _worker_engine
+
+
+# Layout of arrays packed back to back into one shared memory block
+ArraySpec = Tuple[int, tuple, str]
+
+
+def _pack_arrays(arrays: Sequence[np.ndarray]) -> Tuple[shared_memory.SharedMemory, List[ArraySpec]]:
+    """Copy arrays into a fresh shared memory block and describe where each one lives"""
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sum(a.nbytes for a in arrays)))
+    specs = []
+    offset = 0
+    for a in arrays:
+        view = np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf, offset=offset)
+        view[...] = a
+        del view
+        specs.append((offset, a.shape, a.dtype.str))
+        offset += a.nbytes
+    return shm, specs
+
+
+def _with_shared_arrays(shm_name: str, specs: List[ArraySpec], fn):
+    """Worker side: attach to a packed block, call ``fn(arrays)`` and detach"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arrays = [
+            np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for offset, shape, dtype in specs
+        ]
+        try:
+            return fn(arrays)
+        finally:
+            # Drop the views before closing, otherwise close() raises BufferError
+            del arrays
+    finally:
+        shm.close()
+
+
+def _ocr_task(arrays: List[np.ndarray]) -> List[list]:
+    return normalize_ocr_result(_get_engine().ocr(arrays[0], cls=False))
+
+
+def _detect_task(arrays: List[np.ndarray]) -> List[list]:
+    return detect_text_boxes(_get_engine(), arrays[0])
+
+
+def _recognize_task(arrays: List[np.ndarray]) -> List[tuple]:
+    return recognize_crops(_get_engine(), arrays)
+
+
+def _run_shared(task, shm_name: str, specs: List[ArraySpec]):
+    """Worker entry point for every shared-memory task"""
+    return _with_shared_arrays(shm_name, specs, task)
+
+
+def _run_local(task, arrays: List[np.ndarray]):
+    """In-process entry point used when the pool runs without worker processes"""
+    return task(list(arrays))
+
+
+class OCRWorkerPool:
+    """Bounded pool of PaddleOCR workers driven from asyncio"""
+
+    def __init__(self, workers: int = 2, queue_size: int = 16, start_method: str = "forkserver",
+                 engine_options: Optional[Dict[str, Any]] = None):
+        self.workers = max(0, workers)
+        self.queue_size = max(0, queue_size)
+        self.start_method = start_method
+        self.engine_options = engine_options or {}
+        self._executor = None
+        # Bumped for every new executor, so concurrent failures of one executor restart it once
+        self._generation = 0
+        self.restarts = 0
+        # Released from executor threads when a job finishes, so updates take the lock
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Jobs that may be running or waiting at once before submissions are rejected"""
+        return max(1, self.workers) + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs currently submitted and not yet finished"""
+        return self._pending
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        """Create the executor; worker processes load their models on first use"""
+        if self._executor is not None:
+            return
+        self._generation += 1
+        if self.workers == 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                initializer=_init_worker,
+                initargs=(self.engine_options,)
+            )
+            logger.info("🔧 OCR pool running in-process (OCR_WORKERS=0)")
+        else:
+            context = multiprocessing.get_context(self.start_method)
+            if self.start_method == "forkserver":
+                # The fork server preloads only this module, but every worker forked from it
+                # still re-imports the parent's __main__ (as __mp_main__) before its first
+                # task, so entry scripts must keep their side effects under a __main__ guard
+                context.set_forkserver_preload(["ocr_pool"])
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.engine_options,)
+            )
+            logger.info(f"🔧 OCR pool started with {self.workers} worker processes ({self.start_method})")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart(self, generation: int):
+        """Replace the executor of ``generation``, unless another caller already did"""
+        if generation != self._generation or self._executor is None:
+            return
+        logger.warning("⚠️ OCR worker pool broke, restarting workers")
+        self.restarts += 1
+        self.shutdown()
+        self.start()
+
+    def _release(self, _future=None):
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def ocr(self, img_array: np.ndarray) -> List[list]:
+        """Run full-page OCR and return ``[bbox, (text, confidence)]`` lines"""
+        return await self._run(_ocr_task, [img_array])
+
+    async def detect(self, img_array: np.ndarray) -> List[list]:
+        """Run text detection only and return the detected quadrilaterals"""
+        return await self._run(_detect_task, [img_array])
+
+    async def recognize(self, crops: Sequence[np.ndarray]) -> List[tuple]:
+        """Recognize a batch of text-line crops in a single predictor call"""
+        if not crops:
+            return []
+        return await self._run(_recognize_task, crops)
+
+    async def _run(self, task, arrays: Sequence[np.ndarray]) -> Any:
+        if self.workers == 0:
+            return await self._submit(_run_local, task, arrays)
+
+        shm, specs = _pack_arrays(arrays)
+        try:
+            return await self._submit(_run_shared, task, shm.name, specs)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def _submit(self, fn, *args) -> Any:
+        if self._pending >= self.capacity:
+            raise OCRQueueFull(f"OCR queue is full ({self._pending} pending)")
+        if self._executor is None:
+            self.start()
+
+        generation = self._generation
+        try:
+            future = self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._restart(generation)
+            raise
+        with self._pending_lock:
+            self._pending += 1
+        # The slot is held until the work itself ends: a cancelled caller does not stop
+        # a job that is already running in a worker
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._restart(generation)
+            raise
+
+
+def create_pool_from_config(workers: int, queue_size: int, start_method: Optional[str] = None,
+                            engine_options: Optional[Dict[str, Any]] = None) -> OCRWorkerPool:
+    """Create a pool, falling back to the platform default start method if needed"""
+    method = start_method or "forkserver"
+    if method not in multiprocessing.get_all_start_methods():
+        method = multiprocessing.get_start_method()
+    return OCRWorkerPool(workers=workers, queue_size=queue_size, start_method=method,
+                         engine_options=engine_options)
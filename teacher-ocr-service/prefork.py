@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Pre-fork launcher - load the OCR models once, then fork the HTTP workers.
+
+``python main.py`` runs one uvicorn process, and every OCR worker process it
+starts loads its own copy of the PaddleOCR detection and recognition models.
+This launcher imports the app, binds the listening socket, and forks
+``PREFORK_WORKERS`` uvicorn workers.
+
+By default each HTTP worker keeps the OCR process pool (``OCR_WORKERS``), so
+OCR runs on several cores as it does under ``python main.py``. With
+``OCR_WORKERS=0`` the launcher instead builds the predictor once in the
+parent and every HTTP worker runs OCR on its own inference thread with the
+inherited weights, shared copy-on-write: a worker then costs its private
+memory only and starts in milliseconds, but each one runs a single OCR job
+at a time. The parent never runs inference itself: OpenMP thread pools
+created before a fork are not usable in the child.
+
+Workers are recycled gracefully: the parent forks the replacement first and
+only sends SIGTERM to the old worker once the new one accepts connections,
+so the old worker finishes its in-flight requests while traffic moves over.
+A worker is recycled after ``PREFORK_MAX_REQUESTS`` requests (with jitter),
+when its private memory passes ``PREFORK_MAX_PRIVATE_MB``, or for all workers
+in turn on SIGHUP. Startup time and per-worker RSS/PSS/private memory are
+logged at launch and every ``PREFORK_REPORT_INTERVAL`` seconds.
+
+The default is a single worker, which keeps graceful recycling.
+The container image still runs ``python main.py``. More workers only suit stateless OCR traffic: async jobs
+(``/jobs/{id}`` and its event stream), the K.A.N.A. analysis cache and its
+``DELETE /analysis-cache`` invalidation all live in one worker's memory, so
+a request landing on another worker sees a 404 or a stale cache. Metrics are
+the only state shared across workers (``PROMETHEUS_MULTIPROC_DIR``).
+
+Usage: python prefork.py
+"""
+import atexit
+import logging
+import os
+import random
+import select
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LAUNCH_STARTED = time.perf_counter()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("prefork")
+
+PREFORK_WORKERS = int(os.getenv("PREFORK_WORKERS", "1"))
+PREFORK_HOST = os.getenv("PREFORK_HOST", "0.0.0.0")
+PREFORK_PORT = int(os.getenv("PORT", "8001"))  # the port the container exposes
+PREFORK_MAX_REQUESTS = int(os.getenv("PREFORK_MAX_REQUESTS", "0"))  # 0 = never recycle by count
+PREFORK_MAX_PRIVATE_MB = float(os.getenv("PREFORK_MAX_PRIVATE_MB", "0"))  # 0 = never recycle by memory
+PREFORK_GRACEFUL_TIMEOUT = int(os.getenv("PREFORK_GRACEFUL_TIMEOUT", "30"))
+PREFORK_READY_TIMEOUT = float(os.getenv("PREFORK_READY_TIMEOUT", "120"))
+PREFORK_REPORT_INTERVAL = float(os.getenv("PREFORK_REPORT_INTERVAL", "60"))
+
+# /proc/<pid>/smaps_rollup fields, in kB
+_MEMORY_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_mb",
+    "Shared_Dirty": "shared_mb",
+    "Private_Clean": "private_mb",
+    "Private_Dirty": "private_mb"
+}
+
+
+def read_process_memory(pid: int) -> Dict[str, Optional[float]]:
+    """RSS, proportional (PSS), shared and private memory of a process in MB.
+
+    Weights shared copy-on-write count fully towards each worker's RSS, so
+    ``private_mb`` is what one more worker actually costs.
+    """
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0, "shared_mb": 0.0, "private_mb": 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                field, _, rest = line.partition(":")
+                if field in _MEMORY_FIELDS:
+                    totals[_MEMORY_FIELDS[field]] += int(rest.split()[0]) / 1024
+    except (OSError, ValueError, IndexError):
+        return {"rss_mb": None, "pss_mb": None, "shared_mb": None, "private_mb": None}
+    return {name: round(value, 1) for name, value in totals.items()}
+
+
+def load_service_app() -> Any:
+    """Import the OCR service; with OCR_WORKERS=0 also load its predictor before any worker exists"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Workers share their metric samples here so any of them can answer /metrics for all.
+        # prometheus_client reads it on import, so it must be set before main is imported
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="ocr-metrics-")
+        atexit.register(shutil.rmtree, os.environ["PROMETHEUS_MULTIPROC_DIR"], True)
+    import main
+    import ocr_pool
+
+    if main.OCR_WORKERS > 0:
+        # The pool's processes load their own models; a predictor loaded here would only cost memory
+        logger.info(f"🔧 Each HTTP worker runs an OCR pool of {main.OCR_WORKERS} processes")
+    elif main.PADDLEOCR_AVAILABLE:
+        load_time = ocr_pool.preload_engine(main.ocr_pool.engine_options)
+        logger.info(f"📦 OCR models preloaded in {load_time}s")
+    return main.app
+
+
+class Worker:
+    """Parent-side record of one forked HTTP worker"""
+
+    def __init__(self, pid: int, ready_fd: int):
+        self.pid = pid
+        self.ready_fd: Optional[int] = ready_fd
+        self.forked_at = time.perf_counter()
+        self.ready_at: Optional[float] = None
+        self.retiring_since: Optional[float] = None
+
+    @property
+    def startup_time(self) -> Optional[float]:
+        return round(self.ready_at - self.forked_at, 3) if self.ready_at else None
+
+
+def _make_server_class():
+    import uvicorn
+
+    class ReadySignallingServer(uvicorn.Server):
+        """uvicorn server that tells the parent once it accepts connections"""
+
+        def __init__(self, config, ready_fd: int):
+            super().__init__(config)
+            self.ready_fd = ready_fd
+
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if self.started:
+                os.write(self.ready_fd, b"1")
+                os.close(self.ready_fd)
+
+    return ReadySignallingServer
+
+
+class PreforkLauncher:
+    """Loads the app once, forks workers onto a shared socket and supervises them"""
+
+    def __init__(self, load_app: Callable[[], Any] = load_service_app, workers: int = PREFORK_WORKERS,
+                 host: str = PREFORK_HOST, port: int = PREFORK_PORT, max_requests: int = PREFORK_MAX_REQUESTS,
+                 max_private_mb: float = PREFORK_MAX_PRIVATE_MB, graceful_timeout: int = PREFORK_GRACEFUL_TIMEOUT,
+                 ready_timeout: float = PREFORK_READY_TIMEOUT, report_interval: float = PREFORK_REPORT_INTERVAL):
+        self.load_app = load_app
+        self.target = max(1, workers)
+        self.host = host
+        self.port = port
+        self.max_requests = max(0, max_requests)
+        self.max_private_mb = max_private_mb
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.report_interval = report_interval
+
+        self.app = None
+        self.load_time: Optional[float] = None
+        self.sock: Optional[socket.socket] = None
+        self.workers: Dict[int, Worker] = {}
+        self.recycle_queue: List[int] = []
+        # (old pid, replacement pid) while a rolling recycle waits for the replacement
+        self.replacing: Optional[Tuple[int, int]] = None
+        self.stopping = False
+        self.startup_reported = False
+        self.stats = {"spawned": 0, "recycled": 0, "exited": 0, "crashed": 0}
+
+    # Parent side
+
+    def run(self) -> int:
+        """Load, bind, fork and supervise until SIGTERM/SIGINT; returns the exit code"""
+        load_started = time.perf_counter()
+        self.app = self.load_app()
+        self.load_time = round(time.perf_counter() - load_started, 3)
+        self.sock = self._bind()
+        logger.info(f"🔧 App loaded in {self.load_time}s, listening on {self.host}:{self.port} "
+                    f"with {self.target} workers (parent pid {os.getpid()})")
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        next_report = time.monotonic() + self.report_interval
+        while not self.stopping:
+            self._reap()
+            self._fill()
+            self._wait_for_ready(timeout=1.0)
+            self._advance_recycle()
+            self._kill_overdue()
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + self.report_interval
+                self.log_report()
+                self._check_memory()
+
+        self._shutdown()
+        return 0
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_reload(self, signum, frame):
+        logger.info("🔄 SIGHUP: recycling all workers one at a time")
+        self.recycle_queue.extend(pid for pid, w in self.workers.items()
+                                  if w.retiring_since is None and pid not in self.recycle_queue)
+
+    def _active(self) -> List[Worker]:
+        return [w for w in self.workers.values() if w.retiring_since is None]
+
+    def _fill(self):
+        while len(self._active()) < self.target and not self.stopping:
+            self._spawn()
+
+    def _spawn(self) -> Worker:
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            self._run_worker(ready_w)
+        os.close(ready_w)
+        worker = Worker(pid, ready_r)
+        self.workers[pid] = worker
+        self.stats["spawned"] += 1
+        return worker
+
+    def _wait_for_ready(self, timeout: float):
+        fds = {w.ready_fd: w for w in self.workers.values() if w.ready_fd is not None}
+        if not fds:
+            time.sleep(timeout)
+            return
+        try:
+            readable, _, _ = select.select(list(fds), [], [], timeout)
+        except InterruptedError:
+            return
+        for fd in readable:
+            worker = fds[fd]
+            if os.read(fd, 1):
+                worker.ready_at = time.perf_counter()
+                logger.info(f"✅ Worker {worker.pid} ready {worker.startup_time}s after fork")
+            os.close(fd)
+            worker.ready_fd = None
+
+        if not self.startup_reported and len([w for w in self._active() if w.ready_at]) >= self.target:
+            self.startup_reported = True
+            logger.info(f"🚀 {self.target} workers ready {time.perf_counter() - LAUNCH_STARTED:.2f}s after launch "
+                        f"(app and models loaded once in {self.load_time}s)")
+            self.log_report()
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            self._forget_metrics(pid)
+            if worker.ready_fd is not None:
+                os.close(worker.ready_fd)
+            code = os.waitstatus_to_exitcode(status)
+            if worker.retiring_since is not None:
+                self.stats["recycled"] += 1
+                logger.info(f"♻️ Worker {pid} retired after {time.perf_counter() - worker.retiring_since:.2f}s drain")
+            elif code == 0:
+                # uvicorn exits cleanly after limit_max_requests
+                self.stats["exited"] += 1
+                logger.info(f"♻️ Worker {pid} exited after its request limit, forking a replacement")
+            else:
+                self.stats["crashed"] += 1
+                logger.warning(f"⚠️ Worker {pid} died with exit code {code}, forking a replacement")
+
+    @staticmethod
+    def _forget_metrics(pid: int):
+        """Drop a dead worker's gauges; imported late because the app sets up the metrics directory"""
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            from metrics import mark_process_dead
+            mark_process_dead(pid)
+
+    def _retire(self, pid: int):
+        worker = self.workers.get(pid)
+        if worker is None or worker.retiring_since is not None:
+            return
+        worker.retiring_since = time.perf_counter()
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def recycle(self, pid: int):
+        """Queue a worker for replacement; the new one is forked before the old one drains"""
+        if pid in self.workers and pid not in self.recycle_queue:
+            self.recycle_queue.append(pid)
+
+    def _advance_recycle(self):
+        if self.replacing is not None:
+            old, new = self.replacing
+            replacement = self.workers.get(new)
+            if replacement is None:
+                # The replacement died first; the old worker keeps serving and is tried again
+                self.replacing = None
+                self.recycle_queue.insert(0, old)
+            elif replacement.ready_at or time.perf_counter() - replacement.forked_at > self.ready_timeout:
+                self._retire(old)
+                self.replacing = None
+            return
+
+        while self.recycle_queue:
+            old = self.recycle_queue.pop(0)
+            worker = self.workers.get(old)
+            if worker is not None and worker.retiring_since is None:
+                # Fork first: the old worker retires only once the new one is serving
+                self.replacing = (old, self._spawn().pid)
+                return
+
+    def _kill_overdue(self):
+        now = time.perf_counter()
+        for pid, worker in list(self.workers.items()):
+            if worker.retiring_since is not None and now - worker.retiring_since > self.graceful_timeout + 5:
+                logger.warning(f"⚠️ Worker {pid} did not drain in time, killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _check_memory(self):
+        if self.max_private_mb <= 0:
+            return
+        for pid, worker in list(self.workers.items()):
+            if worker.retiring_since is not None:
+                continue
+            private = read_process_memory(pid)["private_mb"]
+            if private is not None and private > self.max_private_mb:
+                logger.info(f"♻️ Worker {pid} uses {private}MB private memory "
+                            f"(limit {self.max_private_mb}MB), recycling it")
+                self.recycle(pid)
+
+    def report(self) -> Dict[str, Any]:
+        """Startup times and memory of the parent and every worker"""
+        return {
+            "parent": {"pid": os.getpid(), "load_time": self.load_time, **read_process_memory(os.getpid())},
+            "workers": [
+                {
+                    "pid": pid,
+                    "startup_time": worker.startup_time,
+                    "retiring": worker.retiring_since is not None,
+                    **read_process_memory(pid)
+                }
+                for pid, worker in sorted(self.workers.items())
+            ],
+            **self.stats
+        }
+
+    def log_report(self):
+        report = self.report()
+        parent = report["parent"]
+        logger.info(f"📊 Parent {parent['pid']}: RSS {parent['rss_mb']}MB")
+        for w in report["workers"]:
+            logger.info(f"📊 Worker {w['pid']}: RSS {w['rss_mb']}MB, PSS {w['pss_mb']}MB, "
+                        f"shared {w['shared_mb']}MB, private {w['private_mb']}MB, "
+                        f"started in {w['startup_time']}s")
+
+    def _shutdown(self):
+        logger.info("🛑 Stopping workers")
+        for pid in list(self.workers):
+            self._retire(pid)
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.sock.close()
+
+    # Child side
+
+    def _run_worker(self, ready_fd: int):
+        """Serve the preloaded app on the inherited socket; never returns"""
+        code = 0
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+            for worker in self.workers.values():
+                if worker.ready_fd is not None:
+                    os.close(worker.ready_fd)
+            random.seed()
+
+            import uvicorn
+
+            limit = None
+            if self.max_requests:
+                # Jitter keeps the workers from all recycling at the same moment
+                limit = self.max_requests + random.randint(0, self.max_requests // 10)
+            # log_config=None keeps uvicorn's loggers on the root handlers the app configured
+            config = uvicorn.Config(self.app, limit_max_requests=limit, log_config=None,
+                                    timeout_graceful_shutdown=self.graceful_timeout)
+            _make_server_class()(config, ready_fd).run(sockets=[self.sock])
+        except BaseException as e:
+            logger.error(f"❌ Worker {os.getpid()} failed: {e}")
+            code = 1
+        finally:
+            # os._exit skips atexit, so flush queued log records first
+            from structured_logging import stop_logging
+            stop_logging()
+            os._exit(code)
+
+
+if __name__ == "__main__":
+    if PREFORK_WORKERS > 1:
+        logger.warning(f"⚠️ {PREFORK_WORKERS} workers: async jobs and the analysis cache are per worker, "
+                       f"so /jobs lookups and cache invalidation only reach the worker that gets the request")
+    raise SystemExit(PreforkLauncher().run())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Vectorized image preprocessing for OCR.
+
+Replaces the PIL chain in ``main.preprocess_image`` (RGB conversion, then
+``ImageEnhance.Contrast``, then ``ImageEnhance.Sharpness``, then
+``np.array``) with two saturating OpenCV passes over a single uint8 buffer:
+
+* contrast: ``out = mean + c * (img - mean)``, the same blend PIL performs
+  against a flat grey image of the mean luminance;
+* sharpness: PIL blends the image with its SMOOTH-filtered copy,
+  ``out = s * img - (s - 1) * smooth``, which is a single 3x3 convolution.
+
+Both passes write back into the same array, so preprocessing allocates one
+image-sized buffer instead of four.
+
+The module also holds the resolution-aware downscaling and the margin crop
+applied before detection, and the helpers that map boxes back to original
+coordinates.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# PIL's ImageFilter.SMOOTH kernel, which ImageEnhance.Sharpness blends against
+SMOOTH_KERNEL = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13.0
+
+# ITU-R 601-2 luma weights, as used by PIL's "L" conversion
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114])
+
+
+def image_to_rgb_array(image: Image.Image) -> np.ndarray:
+    """Convert any PIL image into a writable HxWx3 uint8 RGB array.
+
+    Transparent pixels are flattened onto white, matching the PIL path.
+    """
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+
+    if image.mode in ("RGBA", "LA"):
+        rgba = np.asarray(image.convert("RGBA"))
+        alpha = rgba[..., 3:4].astype(np.uint16)
+        # out = rgb * a/255 + 255 * (1 - a/255), in integer arithmetic
+        rgb = rgba[..., :3].astype(np.uint16)
+        rgb *= alpha
+        rgb += 255 * (255 - alpha)
+        rgb += 127
+        rgb //= 255
+        return rgb.astype(np.uint8)
+
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.array(image)
+
+
+def enhance_contrast_sharpness(rgb: np.ndarray, contrast: float, sharpness: float) -> np.ndarray:
+    """Apply PIL-equivalent contrast then sharpness enhancement in place"""
+    import cv2
+
+    if contrast != 1.0:
+        channel_means = np.array(cv2.mean(rgb)[:3])
+        mean = int(float(channel_means @ LUMA_WEIGHTS) + 0.5)
+        # Saturating affine transform: c * img + mean * (1 - c)
+        cv2.addWeighted(rgb, contrast, rgb, 0.0, mean * (1.0 - contrast), dst=rgb)
+
+    if sharpness != 1.0:
+        kernel = -(sharpness - 1.0) * SMOOTH_KERNEL
+        kernel[1, 1] += sharpness
+        # PIL's SMOOTH filter leaves the one-pixel border as it is, so sharpening never changes it
+        edges = (rgb[0].copy(), rgb[-1].copy(), rgb[:, 0].copy(), rgb[:, -1].copy())
+        cv2.filter2D(rgb, -1, kernel, dst=rgb, borderType=cv2.BORDER_REPLICATE)
+        rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1] = edges
+
+    return rgb
+
+
+def preprocess_array(image: Image.Image, contrast: float = 1.2, sharpness: float = 1.1) -> np.ndarray:
+    """Colour conversion, contrast stretch and sharpening into one RGB array"""
+    return enhance_contrast_sharpness(image_to_rgb_array(image), contrast, sharpness)
+
+
+def estimate_text_height(image: Image.Image, thumbnail_side: int = 1024) -> Optional[float]:
+    """Estimate the median text-line height in pixels of the original image.
+
+    Binarizes a thumbnail with Otsu's threshold and measures the runs of
+    consecutive rows that contain ink (the horizontal projection profile).
+    Returns None when no text-like rows are found.
+    """
+    import cv2
+
+    # Integer box reduction reads the page once and needs no full-size copy
+    factor = max(1, -(-max(image.size) // thumbnail_side))
+    source = image if image.mode in ("L", "RGB", "RGBA") else image.convert("RGB")
+    thumb = source.reduce(factor) if factor > 1 else source
+    gray = np.asarray(thumb.convert("L"))
+    if gray.size == 0:
+        return None
+
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    rows = ink.mean(axis=1) > 0.01
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+    run_lengths = edges[1::2] - edges[::2]
+    run_lengths = run_lengths[run_lengths >= 2]
+    if run_lengths.size == 0:
+        return None
+    return float(np.median(run_lengths)) * image.size[1] / gray.shape[0]
+
+
+def choose_scale(width: int, height: int, max_side: int = 0, target_text_height: int = 0,
+                 text_height: Optional[float] = None, min_side: int = 0) -> float:
+    """Pick a downscale factor (never above 1.0) for OCR input.
+
+    The image is shrunk until its longest side is at most ``max_side`` and
+    its estimated text height at most ``target_text_height``, but never
+    below ``min_side`` on the longest side. Factors above 0.95 are rounded
+    up to 1.0 because the resize would cost more than it saves.
+    """
+    longest = max(width, height)
+    if longest <= 0:
+        return 1.0
+
+    scale = 1.0
+    if max_side and longest > max_side:
+        scale = max_side / longest
+    if target_text_height and text_height and text_height > target_text_height:
+        scale = min(scale, target_text_height / text_height)
+    if min_side:
+        scale = max(scale, min(1.0, min_side / longest))
+    return 1.0 if scale > 0.95 else scale
+
+
+def resize_for_ocr(image: Image.Image, max_side: int, target_text_height: int = 0,
+                   min_side: int = 0) -> Tuple[Image.Image, float]:
+    """Downscale an image ahead of detection, returning it with the scale factor used"""
+    text_height = estimate_text_height(image) if target_text_height else None
+    scale = choose_scale(image.size[0], image.size[1], max_side, target_text_height, text_height, min_side)
+    if scale == 1.0:
+        return image, 1.0
+
+    size = (max(1, round(image.size[0] * scale)), max(1, round(image.size[1] * scale)))
+    # reducing_gap lets PIL do a cheap integer box reduction before the resample
+    return image.resize(size, Image.BILINEAR, reducing_gap=2.0), scale
+
+
+def scale_boxes(boxes: List[list], scale: float) -> List[list]:
+    """Map quadrilaterals found on a resized image back to original coordinates"""
+    if scale == 1.0 or not boxes:
+        return boxes
+    return (np.asarray(boxes, dtype=np.float64) / scale).round(2).tolist()
+
+
+def offset_boxes(boxes: List[list], dx: float, dy: float) -> List[list]:
+    """Shift quadrilaterals found on a crop back into the frame of the uncropped image"""
+    if (dx == 0 and dy == 0) or not boxes:
+        return boxes
+    return (np.asarray(boxes, dtype=np.float64) + (dx, dy)).tolist()
+
+
+def crop_to_content(image: Image.Image, padding: float = 0.02,
+                    min_saving: float = 0.05) -> Tuple[Image.Image, Optional[Tuple[int, int, int, int]], float]:
+    """Crop away blank margins ahead of detection.
+
+    Returns the cropped image, the crop box (None when nothing was cut) and
+    the fraction of the area skipped. Crops saving less than ``min_saving``
+    of the area are not worth the copy and are skipped.
+    """
+    box = find_content_box(image, margin=padding)
+    if box is None:
+        return image, None, 0.0
+    width, height = image.size
+    skipped = 1.0 - (box[2] - box[0]) * (box[3] - box[1]) / float(width * height)
+    if skipped < min_saving:
+        return image, None, 0.0
+    return image.crop(box), box, skipped
+
+
+def find_content_box(image: Image.Image, thumbnail_side: int = 512, margin: float = 0.02,
+                     min_ink: float = 0.005) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box ``(left, top, right, bottom)`` of the inked area, in original pixels.
+
+    Uses the row and column projection profiles of an Otsu-binarized
+    thumbnail and pads the result by ``margin`` of each side. Returns None
+    for blank images.
+    """
+    import cv2
+
+    # Integer box reduction reads the page once and needs no full-size copy
+    factor = max(1, -(-max(image.size) // thumbnail_side))
+    source = image if image.mode in ("L", "RGB", "RGBA") else image.convert("RGB")
+    thumb = source.reduce(factor) if factor > 1 else source
+    gray = np.asarray(thumb.convert("L"))
+    if gray.size == 0:
+        return None
+
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    rows = np.flatnonzero(ink.mean(axis=1) > min_ink)
+    cols = np.flatnonzero(ink.mean(axis=0) > min_ink)
+    if rows.size == 0 or cols.size == 0:
+        return None
+
+    width, height = image.size
+    sx, sy = width / gray.shape[1], height / gray.shape[0]
+    pad_x, pad_y = margin * width, margin * height
+    return (
+        max(0, int(cols[0] * sx - pad_x)),
+        max(0, int(rows[0] * sy - pad_y)),
+        min(width, int(np.ceil((cols[-1] + 1) * sx + pad_x))),
+        min(height, int(np.ceil((rows[-1] + 1) * sy + pad_y)))
+    )
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Background OCR self-test for readiness probes.
+
+Probes must be cheap: ``/readyz`` only reads the state recorded here, while a
+background task runs a tiny OCR job through the worker pool every
+``interval`` seconds. The self-test is skipped while the pool is saturated,
+since the queue depth alone already says the pod should not take traffic.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessProbe:
+    """Periodically runs ``check`` and remembers the outcome"""
+
+    def __init__(self, check: Callable[[], Awaitable[Any]], interval: float = 30.0, timeout: float = 10.0,
+                 skip_check: Optional[Callable[[], bool]] = None):
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.skip_check = skip_check
+        self.ok = False
+        self.error: Optional[str] = "self-test has not run yet"
+        self.latency: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self):
+        if self.skip_check is not None and self.skip_check():
+            logger.debug("Skipping OCR self-test while the pool is saturated")
+            return
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.check(), timeout=self.timeout)
+            self.ok = True
+            self.error = None
+        except asyncio.TimeoutError:
+            self.ok = False
+            self.error = f"self-test timed out after {self.timeout}s"
+        except Exception as e:
+            self.ok = False
+            self.error = str(e)
+        self.latency = round(time.perf_counter() - start, 4)
+        self.checked_at = time.time()
+        if not self.ok:
+            logger.warning(f"⚠️ OCR self-test failed: {self.error}")
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "self_test_ok": self.ok,
+            "self_test_error": self.error,
+            "self_test_latency": self.latency,
+            "self_test_checked_at": datetime.fromtimestamp(self.checked_at).isoformat() if self.checked_at else None,
+            "self_test_age": round(time.time() - self.checked_at, 1) if self.checked_at else None
+        }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Cross-request dynamic micro-batching for text recognition.
+
+Detection runs per image, but the recognizer is much cheaper per crop when it
+sees many crops at once. ``RecognitionBatcher`` parks the crops of every
+in-flight request for up to ``max_wait_ms`` (or until ``max_batch`` crops are
+waiting), sends them to the recognizer as one call and hands each request
+back its own slice of the results.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RecognizeFn = Callable[[Sequence[np.ndarray]], Awaitable[List[tuple]]]
+
+
+class RecognitionBatcher:
+    """Collects text-line crops across requests and recognizes them together"""
+
+    def __init__(self, recognize_fn: RecognizeFn, max_batch: int = 64, max_wait_ms: float = 8.0):
+        self.recognize_fn = recognize_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._waiting: List[Tuple[Sequence[np.ndarray], asyncio.Future]] = []
+        self._waiting_crops = 0
+        self._timer = None
+        self._tasks = set()
+        self.stats = {"batches": 0, "crops": 0, "requests": 0, "largest_batch": 0}
+
+    @property
+    def pending(self) -> int:
+        """Crops waiting for the next batch to be dispatched"""
+        return self._waiting_crops
+
+    async def recognize(self, crops: Sequence[np.ndarray]) -> List[tuple]:
+        """Queue this request's crops and wait for their ``(text, confidence)`` results"""
+        if not crops:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((crops, future))
+        self._waiting_crops += len(crops)
+
+        if self._waiting_crops >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Dispatch everything currently waiting, split into batches of at most ``max_batch`` crops"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, batch_crops = [], 0
+        for crops, future in self._waiting:
+            if batch and batch_crops + len(crops) > self.max_batch:
+                self._dispatch(batch)
+                batch, batch_crops = [], 0
+            batch.append((crops, future))
+            batch_crops += len(crops)
+        if batch:
+            self._dispatch(batch)
+
+        self._waiting = []
+        self._waiting_crops = 0
+
+    def _dispatch(self, batch: List[Tuple[Sequence[np.ndarray], asyncio.Future]]):
+        task = asyncio.ensure_future(self._run_batch(batch))
+        # The loop only keeps weak references; hold the task so its waiters are always answered
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Sequence[np.ndarray], asyncio.Future]]):
+        all_crops = [crop for crops, _ in batch for crop in crops]
+        self.stats["batches"] += 1
+        self.stats["crops"] += len(all_crops)
+        self.stats["requests"] += len(batch)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(all_crops))
+
+        try:
+            results = await self.recognize_fn(all_crops)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for crops, future in batch:
+            if not future.done():
+                future.set_result(results[offset:offset + len(crops)])
+            offset += len(crops)
+
+    def snapshot(self) -> dict:
+        stats = dict(self.stats)
+        stats["avg_batch_size"] = round(stats["crops"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["max_batch"] = self.max_batch
+        stats["max_wait_ms"] = self.max_wait * 1000.0
+        return stats
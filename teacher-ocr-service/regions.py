@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Client-supplied answer regions for recognition-only OCR.
+
+Structured worksheets put every answer in a known box, so full-page text
+detection is wasted work for them. ``/ocr`` accepts a ``regions`` form field
+holding a JSON list; each entry is one of
+
+* a rectangle ``[x0, y0, x1, y1]``;
+* a polygon ``[[x, y], [x, y], ...]`` with at least three points;
+* an object ``{"id": ..., "bbox": [x0, y0, x1, y1]}`` or
+  ``{"id": ..., "polygon": [[x, y], ...]}`` to name the region in the reply.
+
+Coordinates are pixels of the upright, full-size image. Every region is
+turned into a quadrilateral ordered like the detector's boxes (top-left,
+top-right, bottom-right, bottom-left); polygons with more than four points
+use their minimum-area rectangle, so rotated answer lines are straightened
+by the same perspective crop as detected ones.
+"""
+import json
+from typing import Any, List, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+Region = Tuple[Any, np.ndarray]
+
+
+def order_quad(points: np.ndarray) -> np.ndarray:
+    """Four points clockwise, starting with the one closest to the top-left"""
+    centre = points.mean(axis=0)
+    # With y pointing down, increasing angle runs clockwise on screen
+    ring = points[np.argsort(np.arctan2(points[:, 1] - centre[1], points[:, 0] - centre[0]))]
+    return np.roll(ring, -int(ring.sum(axis=1).argmin()), axis=0).astype(np.float32)
+
+
+def region_quad(shape: Any) -> np.ndarray:
+    """Quadrilateral for a rectangle or polygon, raising ValueError when it is malformed"""
+    points = np.asarray(shape, dtype=np.float64)
+    if not np.isfinite(points).all():
+        raise ValueError("coordinates must be finite numbers")
+    if points.shape == (4,):
+        x0, y0, x1, y1 = points
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("rectangle needs x0 < x1 and y0 < y1")
+        return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float32)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        raise ValueError("expected [x0, y0, x1, y1] or a list of at least three [x, y] points")
+
+    import cv2
+
+    (_, _), (width, height), _ = rect = cv2.minAreaRect(points.astype(np.float32))
+    if width < 1 or height < 1:
+        raise ValueError("polygon has no area")
+    quad = order_quad(points if len(points) == 4 else cv2.boxPoints(rect))
+    if not _is_convex(quad):
+        raise ValueError("quadrilateral must be convex")
+    return quad
+
+
+def _is_convex(points: np.ndarray) -> bool:
+    edges = np.roll(points, -1, axis=0) - points
+    following = np.roll(edges, -1, axis=0)
+    turns = edges[:, 0] * following[:, 1] - edges[:, 1] * following[:, 0]
+    return bool((turns > 0).all() or (turns < 0).all())
+
+
+def parse_regions(raw: str, max_regions: int = 200) -> List[Region]:
+    """``(id, quad)`` for every region in the ``regions`` JSON field; HTTP 400 when invalid"""
+    try:
+        entries = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="regions must be a JSON list")
+    if not isinstance(entries, list) or not entries:
+        raise HTTPException(status_code=400, detail="regions must be a non-empty JSON list")
+    if len(entries) > max_regions:
+        raise HTTPException(status_code=400, detail=f"At most {max_regions} regions per request")
+
+    regions = []
+    for index, entry in enumerate(entries):
+        region_id, shape = index, entry
+        if isinstance(entry, dict):
+            region_id = entry.get("id", index)
+            shape = entry.get("polygon", entry.get("bbox"))
+            if shape is None:
+                raise HTTPException(status_code=400, detail=f"Region {region_id}: needs a bbox or polygon")
+        try:
+            regions.append((region_id, region_quad(shape)))
+        except (TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Region {region_id}: {e}")
+    return regions
+
+
+def clip_quad(quad: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Keep a quadrilateral inside the image"""
+    return np.clip(quad, 0, [width - 1, height - 1]).astype(np.float32)
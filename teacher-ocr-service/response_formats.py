@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Compact encodings for OCR responses.
+
+A dense page produces hundreds of ``{"bbox": [[x, y] x4], "text", "confidence"}``
+dicts, and building and serializing that tree dominates response time for
+large results. Clients can ask for a smaller form, through the ``Accept``
+header or the ``format`` query flag:
+
+* ``json`` (``application/json``): the original layout;
+* ``columnar`` (``application/x-ocr-columnar+json``): ``bounding_boxes`` becomes
+  parallel arrays of flat 8-float coordinates, texts and confidences (plus
+  region ids for recognition-only ``regions`` requests);
+* ``binary`` (``application/x-ocr-boxes``): packed little-endian float32 arrays,
+  laid out as documented on ``pack_boxes``.
+
+Any of them can be compressed with gzip or brotli (when the ``brotli``
+package is installed), negotiated through ``Accept-Encoding`` or forced with
+the ``compress`` query flag. Bodies under ``MIN_COMPRESS_SIZE`` are sent
+uncompressed.
+"""
+import gzip
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from starlette.responses import Response
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+FORMAT_MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/x-ocr-columnar+json",
+    "binary": "application/x-ocr-boxes",
+}
+MEDIA_TYPE_FORMATS = {media_type: fmt for fmt, media_type in FORMAT_MEDIA_TYPES.items()}
+
+BINARY_MAGIC = b"OCRB"
+BINARY_VERSION = 1
+# magic, version, reserved, metadata length
+BINARY_HEADER = struct.Struct("<4sHHI")
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def negotiate_format(accept: Optional[str], format_param: Optional[str] = None) -> str:
+    """Pick a response format from the query flag, else the first known Accept media type"""
+    if format_param:
+        fmt = format_param.lower()
+        if fmt not in FORMAT_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown format. Supported: {', '.join(FORMAT_MEDIA_TYPES)}")
+        return fmt
+    for media_range in (accept or "").split(","):
+        fmt = MEDIA_TYPE_FORMATS.get(media_range.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    return "json"
+
+
+def negotiate_encoding(accept_encoding: Optional[str], compress_param: Optional[str] = None) -> Optional[str]:
+    """Pick ``br``, ``gzip`` or None; the query flag wins over Accept-Encoding"""
+    available = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    if compress_param:
+        encoding = compress_param.lower()
+        if encoding in ("none", "identity"):
+            return None
+        if encoding not in available:
+            raise HTTPException(status_code=400, detail=f"Unsupported compression. Supported: {', '.join(available)}")
+        return encoding
+
+    accepted = set()
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().lower().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name)
+    for encoding in available:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def region_ids(boxes: List[Dict[str, Any]]) -> Optional[list]:
+    """Per-box client region ids, or None when the boxes came from detection"""
+    if not any("region" in box for box in boxes):
+        return None
+    return [box.get("region") for box in boxes]
+
+
+def to_columnar(boxes: List[Dict[str, Any]]) -> Dict[str, list]:
+    """Parallel arrays: flat [x0, y0, ..., x3, y3] per box, texts, confidences and any region ids"""
+    columns = {
+        "bbox": [[coord for point in box["bbox"] for coord in point] for box in boxes],
+        "text": [box["text"] for box in boxes],
+        "confidence": [box["confidence"] for box in boxes]
+    }
+    regions = region_ids(boxes)
+    if regions is not None:
+        columns["region"] = regions
+    return columns
+
+
+def pack_boxes(payload: Dict[str, Any]) -> bytes:
+    """Serialize a response with packed float32 boxes.
+
+    Layout (little-endian): ``OCRB`` magic, u16 version, u16 reserved, u32
+    metadata length, metadata JSON (every field except ``bounding_boxes``,
+    plus ``regions``: the per-box region ids when the request named regions),
+    u32 box count N, float32[N*8] coordinates, float32[N] confidences,
+    u32[N] UTF-8 text lengths, then the concatenated text bytes.
+    """
+    boxes = payload.get("bounding_boxes") or []
+    fields = {k: v for k, v in payload.items() if k != "bounding_boxes"}
+    regions = region_ids(boxes)
+    if regions is not None:
+        fields["regions"] = regions
+    metadata = json.dumps(fields, separators=(",", ":")).encode("utf-8")
+    texts = [box["text"].encode("utf-8") for box in boxes]
+    coords = np.asarray([box["bbox"] for box in boxes], dtype="<f4").reshape(len(boxes), 8)
+    confidences = np.asarray([box["confidence"] for box in boxes], dtype="<f4")
+    lengths = np.asarray([len(text) for text in texts], dtype="<u4")
+    return b"".join((
+        BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(metadata)),
+        metadata,
+        struct.pack("<I", len(boxes)),
+        coords.tobytes(),
+        confidences.tobytes(),
+        lengths.tobytes(),
+        *texts
+    ))
+
+
+def unpack_boxes(data: bytes) -> Dict[str, Any]:
+    """Inverse of ``pack_boxes`` (coordinates come back as float32 precision)"""
+    magic, version, _, metadata_length = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a packed OCR response")
+    offset = BINARY_HEADER.size
+    payload = json.loads(data[offset:offset + metadata_length])
+    offset += metadata_length
+    (count,) = struct.unpack_from("<I", data, offset)
+    offset += 4
+    coords = np.frombuffer(data, dtype="<f4", count=count * 8, offset=offset).reshape(count, 4, 2)
+    offset += count * 32
+    confidences = np.frombuffer(data, dtype="<f4", count=count, offset=offset)
+    offset += count * 4
+    lengths = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+    offset += count * 4
+
+    boxes = []
+    for quad, confidence, length in zip(coords.tolist(), confidences.tolist(), lengths.tolist()):
+        boxes.append({"bbox": quad, "text": data[offset:offset + length].decode("utf-8"), "confidence": confidence})
+        offset += length
+    for box, region in zip(boxes, payload.pop("regions", None) or []):
+        box["region"] = region
+    payload["bounding_boxes"] = boxes
+    return payload
+
+
+def encode_body(payload: Dict[str, Any], fmt: str) -> bytes:
+    if fmt == "binary":
+        return pack_boxes(payload)
+    if fmt == "columnar":
+        payload = {**payload, "bounding_boxes": to_columnar(payload.get("bounding_boxes") or []), "layout": "columnar"}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress_body(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def render_ocr_response(payload: Dict[str, Any], fmt: str = "json", encoding: Optional[str] = None) -> Response:
+    """Encode an OCR response in the negotiated format and compression"""
+    body = encode_body(payload, fmt)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding and len(body) >= MIN_COMPRESS_SIZE:
+        body = compress_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
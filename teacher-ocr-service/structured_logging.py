@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Queue-backed structured logging for the OCR service.
+
+Request handlers only put log records on a bounded in-memory queue; a
+background ``QueueListener`` thread renders them with structlog (JSON or
+console lines) and writes them out, so slow stdout or a stalled log pipeline
+never blocks the event loop. When the queue is full, records are dropped and
+counted instead of waiting.
+
+Both plain ``logging.getLogger`` calls and structlog loggers go through the
+same queue. Context bound with ``bind_request`` (the request id, method and
+path) is captured on the calling side and added to every record of that
+request. Bulky payloads such as the full OCR text are logged through
+``log_payload`` for a sampled fraction of requests only; the sampling
+decision is made once per request so a sampled request logs all of its
+payloads.
+"""
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import structlog
+
+# Per request: whether its payloads are logged
+_payload_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("payload_sampled", default=False)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_settings: Dict[str, Any] = {}
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records that do not fit in the queue are dropped"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Rendering happens on the listener thread; only capture what is
+        # tied to the caller: the message arguments and the request context
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        record.context = structlog.contextvars.get_contextvars()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _add_record_context(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    record = event_dict.get("_record")
+    for key, value in getattr(record, "context", {}).items():
+        event_dict.setdefault(key, value)
+    return event_dict
+
+
+def _add_record_time(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # The record's creation time, not the moment the listener got to it
+    record = event_dict.get("_record")
+    created = record.created if record is not None else time.time()
+    event_dict.setdefault("timestamp", time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(created))
+                          + f".{int(created % 1 * 1000):03d}")
+    return event_dict
+
+
+def configure_logging(level: str = "INFO", fmt: str = "console", queue_size: int = 10000,
+                      payload_sample_rate: float = 0.01):
+    """Route stdlib and structlog logging through one bounded queue and a writer thread"""
+    global _listener, _queue_handler
+    stop_logging()
+    _settings.update(level=level, fmt=fmt, queue_size=queue_size, payload_sample_rate=payload_sample_rate)
+
+    renderer = (structlog.processors.JSONRenderer(ensure_ascii=False) if fmt == "json"
+                else structlog.dev.ConsoleRenderer(colors=False))
+    pre_chain = [
+        _add_record_context,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.add_logger_name,
+        _add_record_time
+    ]
+    formatter = structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=pre_chain,
+        processors=[
+            *pre_chain,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            *([structlog.processors.format_exc_info] if fmt == "json" else []),
+            renderer
+        ]
+    )
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level.upper())
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.StackInfoRenderer(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True
+    )
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+
+def _restart_after_fork():
+    # The writer thread does not survive a fork, and the inherited queue may be
+    # locked by it; forked workers start over with their own queue and thread
+    global _listener
+    if _settings and _listener is not None:
+        _listener = None
+        configure_logging(**_settings)
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def get_logger(name: str):
+    return structlog.get_logger(name)
+
+
+def bind_request(request_id: Optional[str] = None, **context) -> str:
+    """Start a request's logging context and decide whether its payloads are logged"""
+    request_id = request_id or uuid.uuid4().hex
+    structlog.contextvars.clear_contextvars()
+    structlog.contextvars.bind_contextvars(request_id=request_id, **context)
+    _payload_sampled.set(random.random() < _settings.get("payload_sample_rate", 0.0))
+    return request_id
+
+
+def payload_sampled() -> bool:
+    return _payload_sampled.get()
+
+
+def log_payload(logger, event: str, **payload):
+    """Log bulky request data (full OCR text, K.A.N.A. replies) for sampled requests only"""
+    if _payload_sampled.get():
+        logger.info(event, **payload)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving every request an id for its log lines and ``X-Request-ID`` header.
+
+    Requests slower than ``slow_seconds`` are logged with their duration and
+    status, so the id of a slow request can be looked up in the logs.
+    """
+
+    def __init__(self, app, slow_seconds: float = 5.0, header: str = "x-request-id"):
+        self.app = app
+        self.slow_seconds = slow_seconds
+        self.header = header.encode("latin-1")
+        self.logger = get_logger("request")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(self.header, b"").decode("latin-1")
+        # Accept caller ids only when they are short and printable
+        request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else None
+        request_id = bind_request(request_id, method=scope.get("method"), path=scope.get("path"))
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (self.header, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.slow_seconds:
+                self.logger.warning("slow_request", status=status, duration=round(elapsed, 3))
+            structlog.contextvars.clear_contextvars()
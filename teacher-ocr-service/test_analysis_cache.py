@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test the K.A.N.A. analysis cache: normalization, TTL, single-flight and invalidation
+"""
+import asyncio
+
+from analysis_cache import COALESCED, HIT, MISS, AnalysisCache, normalize_text
+
+
+def test_normalization_folds_trivial_differences():
+    assert normalize_text("  Solve: 2x + 3 = 7.\n") == normalize_text("solve 2x + 3 = 7")
+    assert normalize_text("\u201cWhy?\u201d she asked") == normalize_text('why she asked')
+    assert normalize_text("Chapter 1") != normalize_text("Chapter 2")
+    assert AnalysisCache.make_key("Hello, World", "a") == AnalysisCache.make_key("hello   world", "a")
+    assert AnalysisCache.make_key("hello world", "a") != AnalysisCache.make_key("hello world", "b")
+
+
+def test_math_is_not_folded_away():
+    # Signs, fractions, percentages, factorials and decimals change the answer
+    for a, b in [("x = -3", "x = 3"), ("1/2", "1 2"), ("50%", "50"), ("5!", "5"),
+                 ("3.5", "3 5"), ("1,000", "1 000"), ("2:3", "2 3"), ("x = -1/2", "x = 1 2")]:
+        assert AnalysisCache.make_key(a, "ctx") != AnalysisCache.make_key(b, "ctx"), (a, b)
+    assert normalize_text("Answer: x = -3.5.") == "answer x = -3.5"
+
+
+def test_hits_and_expiry():
+    async def scenario():
+        cache = AnalysisCache(ttl_seconds=0.05)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"analysis": "ok"}
+
+        first = await cache.get_or_compute("Some text", "ctx", compute)
+        second = await cache.get_or_compute("some  text.", "ctx", compute)
+        await asyncio.sleep(0.06)
+        third = await cache.get_or_compute("Some text", "ctx", compute)
+        return cache, calls, first, second, third
+
+    cache, calls, first, second, third = asyncio.run(scenario())
+    assert [first[1], second[1], third[1]] == [MISS, HIT, MISS]
+    assert second[0] == {"analysis": "ok"}
+    assert len(calls) == 2
+    assert cache.snapshot()["expired"] == 1
+
+
+def test_concurrent_requests_share_one_call():
+    async def scenario():
+        cache = AnalysisCache()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"analysis": "shared"}
+
+        results = await asyncio.gather(*(cache.get_or_compute("same text", "ctx", compute) for _ in range(5)))
+        return cache, calls, results
+
+    cache, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == [COALESCED] * 4 + [MISS]
+    assert all(result == {"analysis": "shared"} for result, _ in results)
+    assert cache.snapshot()["hit_ratio"] == 0.8
+
+
+def test_failures_are_shared_but_not_cached():
+    async def scenario():
+        cache = AnalysisCache()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        outcomes = await asyncio.gather(*(cache.get_or_compute("t", "ctx", failing) for _ in range(3)),
+                                        return_exceptions=True)
+        return cache, outcomes
+
+    cache, outcomes = asyncio.run(scenario())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_invalidate_by_context():
+    async def scenario():
+        cache = AnalysisCache()
+
+        async def compute():
+            return {"analysis": "ok"}
+
+        for text in ("one", "two"):
+            await cache.get_or_compute(text, "math", compute)
+        await cache.get_or_compute("one", "history", compute)
+
+        removed = cache.invalidate("math")
+        _, math_status = await cache.get_or_compute("one", "math", compute)
+        _, history_status = await cache.get_or_compute("one", "history", compute)
+        return removed, math_status, history_status
+
+    removed, math_status, history_status = asyncio.run(scenario())
+    assert removed == 2
+    assert math_status == MISS
+    assert history_status == HIT
+
+
+def test_invalidation_discards_in_flight_result():
+    async def scenario():
+        cache = AnalysisCache()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return {"analysis": "stale"}
+
+        pending = asyncio.ensure_future(cache.get_or_compute("t", "ctx", slow))
+        await asyncio.sleep(0.01)
+        cache.invalidate("ctx")
+        await pending
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.snapshot()["entries"] == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Testing K.A.N.A. analysis cache...")
+    test_normalization_folds_trivial_differences()
+    test_math_is_not_folded_away()
+    test_hits_and_expiry()
+    test_concurrent_requests_share_one_call()
+    test_failures_are_shared_but_not_cached()
+    test_invalidate_by_context()
+    test_invalidation_discards_in_flight_result()
+    print("✅ All analysis cache tests passed!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the pipelined OCR -> analysis batch runner
+"""
+import asyncio
+import time
+
+from batch_pipeline import iter_batch_results
+
+
+def collect(uploads, ocr_file, analyze, **kwargs):
+    async def scenario():
+        return [record async for record in iter_batch_results(uploads, ocr_file, analyze, **kwargs)]
+    return asyncio.run(scenario())
+
+
+def test_ocr_overlaps_analysis_within_bounds():
+    active = {"ocr": 0, "analyze": 0}
+    peak = {"ocr": 0, "analyze": 0}
+    timeline = []
+
+    def enter(stage):
+        active[stage] += 1
+        peak[stage] = max(peak[stage], active[stage])
+
+    async def ocr_file(filename, upload):
+        enter("ocr")
+        timeline.append(("ocr", filename, time.perf_counter()))
+        await asyncio.sleep(0.02)
+        active["ocr"] -= 1
+        return {"text": filename}
+
+    async def analyze(filename, ocr):
+        enter("analyze")
+        timeline.append(("analyze", filename, time.perf_counter()))
+        await asyncio.sleep(0.05)
+        active["analyze"] -= 1
+        return {"analysis": ocr["text"]}
+
+    uploads = [(f"f{i}.png", object()) for i in range(6)]
+    start = time.perf_counter()
+    records = collect(uploads, ocr_file, analyze, ocr_concurrency=1, analyze_concurrency=2)
+    elapsed = time.perf_counter() - start
+
+    assert peak == {"ocr": 1, "analyze": 2}
+    # Sequential OCR then analysis would take 6 * (0.02 + 0.05) = 0.42s
+    assert elapsed < 0.3
+    # The second file's OCR starts before the first file's analysis has finished
+    second_ocr = next(t for stage, name, t in timeline if stage == "ocr" and name == "f1.png")
+    first_analysis = next(t for stage, name, t in timeline if stage == "analyze" and name == "f0.png")
+    assert second_ocr < first_analysis + 0.05
+
+    results, summary = records[:-1], records[-1]
+    assert sorted(r["index"] for r in results) == list(range(6))
+    assert all(r["success"] and r["analysis"] == {"analysis": r["filename"]} for r in results)
+    assert summary["event"] == "done" and summary["succeeded"] == 6 and summary["failed"] == 0
+    assert summary["time_to_first_result"] < summary["processing_time"]
+
+
+def test_results_stream_in_completion_order_with_errors():
+    async def ocr_file(filename, upload):
+        await asyncio.sleep(upload)
+        if filename == "bad.png":
+            raise RuntimeError("unreadable")
+        return {"text": filename}
+
+    async def analyze(filename, ocr):
+        return {"analysis": ocr["text"]}
+
+    uploads = [("slow.png", 0.05), ("fast.png", 0.0), ("bad.png", 0.01), ("rejected.png", ValueError("too big"))]
+    records = collect(uploads, ocr_file, analyze, ocr_concurrency=4)
+
+    order = [r["filename"] for r in records[:-1]]
+    assert order.index("fast.png") < order.index("slow.png")
+    errors = {r["filename"]: r["error"] for r in records if r["event"] == "error"}
+    assert errors == {"bad.png": "unreadable", "rejected.png": "too big"}
+    assert records[-1]["succeeded"] == 2 and records[-1]["failed"] == 2
+
+
+if __name__ == "__main__":
+    print("🧪 Testing batch pipeline...")
+    test_ocr_overlaps_analysis_within_bounds()
+    test_results_stream_in_completion_order_with_errors()
+    print("✅ All batch pipeline tests passed!")
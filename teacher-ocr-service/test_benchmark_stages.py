@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the stage benchmark's accuracy metric and regression gates
+"""
+import copy
+
+from benchmark_stages import STAGES, baseline_is_stale, character_error_rate, compare, load_fixtures, reading_order_text
+
+
+def fixture_results(detect_ms: float, cer: float = 0.1, equations_ms: float = 0.2):
+    return {"fixtures": {"page": {
+        "cer": cer,
+        "stages": {"detect": {"min_ms": detect_ms}, "equations": {"min_ms": equations_ms}}
+    }}}
+
+
+def test_character_error_rate():
+    assert character_error_rate("x = 5", "x = 5") == 0.0
+    assert character_error_rate("x  =\n5", "x = 5") == 0.0
+    assert character_error_rate("x = 6", "x = 5") == 1 / 5
+    assert character_error_rate("", "abcd") == 1.0
+    assert character_error_rate("ab", "") == 1.0
+
+
+def test_reading_order_follows_boxes():
+    boxes = [[[50, 40], [90, 40], [90, 60], [50, 60]], [[10, 10], [90, 10], [90, 30], [10, 30]]]
+    texts = [("second", 0.9), ("first", 0.9)]
+    assert reading_order_text(boxes, texts) == "first second"
+
+
+def test_regression_gates():
+    baseline = fixture_results(detect_ms=100.0)
+    assert compare(fixture_results(110.0), baseline, 20, 1.0, 0.02) == []
+    failures = compare(fixture_results(130.0), baseline, 20, 1.0, 0.02)
+    assert len(failures) == 1 and "detect" in failures[0]
+
+    # Doubling a sub-millisecond stage stays below the absolute floor
+    assert compare(fixture_results(100.0, equations_ms=0.5), baseline, 20, 1.0, 0.02) == []
+
+    failures = compare(fixture_results(100.0, cer=0.2), baseline, 20, 1.0, 0.02)
+    assert len(failures) == 1 and "CER" in failures[0]
+
+    # Fixtures and stages missing from the baseline are not judged
+    extra = copy.deepcopy(fixture_results(500.0))
+    extra["fixtures"]["new page"] = extra["fixtures"].pop("page")
+    assert compare(extra, baseline, 20, 1.0, 0.02) == []
+
+
+def test_crop_stage_is_gated_and_old_baselines_are_stale():
+    assert STAGES.index("resize") < STAGES.index("crop") < STAGES.index("preprocess")
+    results = {"config": {"pipeline": 7}}
+    assert not baseline_is_stale(results, {"config": {"pipeline": 7}})
+    # Baselines from before the crop stage carry no (or an older) pipeline version
+    assert baseline_is_stale(results, {"config": {"repeat": 5}})
+    assert baseline_is_stale(results, {"config": {"pipeline": 5}})
+
+
+def test_fixtures_have_reference_text():
+    fixtures = load_fixtures()
+    assert "generated page (PNG)" in fixtures
+    # The placeholder JPEG is not an image and is left out
+    assert "test_handwritten.jpg" not in fixtures
+    assert all(reference for _, reference in fixtures.values())
+
+
+if __name__ == "__main__":
+    print("🧪 Testing stage benchmark gates...")
+    test_character_error_rate()
+    test_reading_order_follows_boxes()
+    test_regression_gates()
+    test_crop_stage_is_gated_and_old_baselines_are_stale()
+    test_fixtures_have_reference_text()
+    print("✅ All stage benchmark tests passed!")
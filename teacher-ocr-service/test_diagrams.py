@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test budgeted diagram detection on the low-resolution pyramid
+"""
+import cv2
+import numpy as np
+
+from diagrams import (CIRCULAR_DIAGRAM, COORDINATE_SYSTEM, GEOMETRIC_FIGURE, build_pyramid,
+                      detect_diagrams, has_perpendicular_pair)
+
+
+def blank_page(height: int = 1600, width: int = 1200) -> np.ndarray:
+    return np.full((height, width, 3), 255, dtype=np.uint8)
+
+
+def test_pyramid_is_small_and_coarse_first():
+    pyramid = build_pyramid(blank_page(), max_side=512, levels=2)
+    assert [level.shape for level in pyramid] == [(256, 192), (512, 384)]
+
+
+def test_perpendicular_pair():
+    axes = np.array([[0, 0, 100, 0], [0, 0, 0, 100]])
+    parallel = np.array([[0, 0, 100, 0], [0, 10, 100, 10]])
+    assert has_perpendicular_pair(axes)
+    assert not has_perpendicular_pair(parallel)
+    assert not has_perpendicular_pair(axes[:1])
+
+
+def test_coordinate_axes():
+    page = blank_page()
+    cv2.line(page, (200, 1400), (1100, 1400), (0, 0, 0), 6)
+    cv2.line(page, (200, 1400), (200, 300), (0, 0, 0), 6)
+    found = detect_diagrams(page, budget=5.0)
+    assert COORDINATE_SYSTEM in found["diagrams"]
+    assert all(max(size) <= 512 for size in found["levels"])
+
+
+def test_circle():
+    page = blank_page()
+    cv2.circle(page, (600, 800), 250, (0, 0, 0), 8)
+    assert CIRCULAR_DIAGRAM in detect_diagrams(page, budget=5.0)["diagrams"]
+
+
+def test_blank_page_has_no_diagrams():
+    found = detect_diagrams(blank_page(), budget=5.0)
+    assert found["diagrams"] == []
+    assert not found["timed_out"]
+    assert GEOMETRIC_FIGURE not in found["diagrams"]
+
+
+def test_text_pages_have_no_diagrams():
+    from PIL import Image
+
+    from create_test_image import render_student_work
+
+    pages = [np.asarray(Image.open(name).convert("RGB"))
+             for name in ("test_student_note.png", "comprehensive_student_work.png", "debug_test.png")]
+    pages.append(np.asarray(render_student_work()))
+    for page in pages:
+        assert detect_diagrams(page, budget=5.0)["diagrams"] == []
+
+
+def test_axes_next_to_text():
+    from create_test_image import render_student_work
+
+    page = np.asarray(render_student_work().resize((1400, 1000))).copy()
+    cv2.line(page, (900, 900), (1350, 900), (0, 0, 0), 3)
+    cv2.line(page, (900, 900), (900, 500), (0, 0, 0), 3)
+    assert detect_diagrams(page, budget=5.0)["diagrams"] == [COORDINATE_SYSTEM]
+
+
+def test_budget_stops_early():
+    found = detect_diagrams(blank_page(), budget=0.0)
+    assert found["timed_out"]
+    assert found["levels"] == []
+    assert found["diagrams"] == []
+
+
+if __name__ == "__main__":
+    print("🧪 Testing diagram detection...")
+    test_pyramid_is_small_and_coarse_first()
+    test_perpendicular_pair()
+    test_coordinate_axes()
+    test_circle()
+    test_blank_page_has_no_diagrams()
+    test_text_pages_have_no_diagrams()
+    test_axes_next_to_text()
+    test_budget_stops_early()
+    print("✅ All diagram detection tests passed!")
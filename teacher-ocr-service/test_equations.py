@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test single-pass math expression extraction
+"""
+import time
+
+from equations import extract_equations
+
+
+def test_sample_texts():
+    assert extract_equations(
+        "Solving quadratic equation: x² + 3x - 4 = 0. Using factoring method: (x + 4)(x - 1) = 0. "
+        "Therefore x = -4 or x = 1."
+    ) == ["x² + 3x - 4 = 0", "(x + 4)(x - 1) = 0", "x = -4", "x = 1"]
+    assert extract_equations(
+        "Find the derivative of f(x) = x³ + 2x² - 5x + 1. Answer: f'(x) = 3x² + 4x - 5"
+    ) == ["f(x) = x³ + 2x² - 5x + 1", "f'(x) = 3x² + 4x - 5"]
+    assert extract_equations("Balance the equation H₂ + O₂ → H₂O. Molar ratio 2:1:2") == ["H₂ + O₂ → H₂O"]
+    assert extract_equations("Student essay on Shakespeare's themes in Hamlet. The protagonist faces...") == []
+
+
+def test_standalone_shapes():
+    assert extract_equations("Compute √(x+1) and ∫f(x)dx, the matrix [1, 2, 3] and 3/4 of sin(2x). Area is a^2") == [
+        "√(x+1)", "∫f(x)dx", "[1, 2, 3]", "3/4", "sin(2x)", "a^2"
+    ]
+
+
+def test_nested_groups_stay_whole():
+    # From create_test_image.STUDENT_WORK_TEXT
+    assert extract_equations("Using quadratic formula: x = (-b ± √(b² - 4ac)) / 2a") == ["x = (-b ± √(b² - 4ac)) / 2a"]
+    assert extract_equations("Then √(b² - 4ac) and sin(2x + (3)) = y") == ["√(b² - 4ac)", "sin(2x + (3)) = y"]
+    # A bracket that never closes does not swallow what follows
+    assert extract_equations("f(x = 2 and (((y = 3") == ["x = 2", "y = 3"]
+
+
+def test_prose_is_not_math():
+    assert extract_equations("I'm the 3rd and 10th student, don't worry - it is a test") == []
+    assert extract_equations("area and (a+b)(a-b)") == ["(a+b)(a-b)"]
+
+
+def test_order_dedupe_and_limit():
+    text = "x = 1. y = 2. x = 1. z = 3. y = 2."
+    assert extract_equations(text) == ["x = 1", "y = 2", "z = 3"]
+    assert extract_equations(text, limit=2) == ["x = 1", "y = 2"]
+    assert extract_equations("") == []
+
+
+def test_linear_on_adversarial_input():
+    for text in ("1" * 20000 + "x", "(a)" * 20000, "2x" * 20000, "x+" * 20000, "(" * 20000 + "x", "√(" * 20000):
+        start = time.perf_counter()
+        extract_equations(text, limit=None)
+        assert time.perf_counter() - start < 1.0
+
+
+if __name__ == "__main__":
+    print("🧪 Testing equation extraction...")
+    test_sample_texts()
+    test_standalone_shapes()
+    test_nested_groups_stay_whole()
+    test_prose_is_not_math()
+    test_order_dedupe_and_limit()
+    test_linear_on_adversarial_input()
+    print("✅ All equation extraction tests passed!")
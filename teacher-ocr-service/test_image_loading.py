@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test reduced-resolution decoding, EXIF orientation and alpha flattening
+"""
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from image_loading import EXIF_ORIENTATION, load_image
+from preprocessing import resize_for_ocr
+
+
+def page(size=(4000, 3000), mode="RGB") -> Image.Image:
+    image = Image.new(mode, size, "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(size[1] // 4, size[1] // 2, size[1] // 20):
+        draw.rectangle([size[0] // 4, y, size[0] // 2, y + size[1] // 60], fill="black")
+    return image
+
+
+def encode(image: Image.Image, fmt: str, orientation=None) -> bytes:
+    buffer = io.BytesIO()
+    options = {"quality": 90} if fmt == "JPEG" else {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        options["exif"] = exif
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def test_large_jpeg_decodes_at_draft_scale():
+    decoded = load_image(encode(page(), "JPEG"), max_side=1024)
+    # 1/2 would leave 2000, 1/4 leaves 1000 < 1024, so the decoder stops at 1/2
+    assert decoded.image.size == (2000, 1500)
+    assert decoded.original_size == (4000, 3000)
+    assert decoded.scale == 0.5
+    report = decoded.report()
+    assert report["decoded_pixels"] == 2000 * 1500
+    assert report["pixels_skipped"] == 4000 * 3000 - 2000 * 1500
+    assert report["bytes"] > 0 and report["format"] == "JPEG"
+
+    # The resize stage still ends at exactly the size a full decode would give
+    resized, resize_scale = resize_for_ocr(decoded.image, 1024)
+    full, _ = resize_for_ocr(load_image(encode(page(), "JPEG")).image, 1024)
+    assert resized.size == full.size == (1024, 768)
+    assert decoded.scale * resize_scale == 1024 / 4000
+
+
+def test_min_side_limits_the_draft():
+    decoded = load_image(encode(page(), "JPEG"), max_side=512, min_side=960)
+    assert decoded.image.size == (1000, 750)
+
+
+def test_small_and_non_jpeg_images_decode_in_full():
+    assert load_image(encode(page((800, 600)), "JPEG"), max_side=1024).image.size == (800, 600)
+    decoded = load_image(encode(page(), "PNG"), max_side=1024)
+    assert decoded.image.size == (4000, 3000) and decoded.scale == 1.0
+
+
+def test_exif_orientation_is_applied_after_draft():
+    decoded = load_image(encode(page(), "JPEG", orientation=6), max_side=1024)
+    assert decoded.original_size == (3000, 4000)
+    assert decoded.image.size == (1500, 2000)
+    assert decoded.scale == 0.5
+    assert decoded.report()["orientation"] == 6
+
+
+def test_alpha_is_flattened_onto_white():
+    image = page((200, 100), "RGBA")
+    image.putpixel((0, 0), (0, 0, 0, 0))
+    decoded = load_image(encode(image, "PNG"))
+    assert decoded.image.mode == "RGB"
+    pixels = np.asarray(decoded.image)
+    assert tuple(pixels[0, 0]) == (255, 255, 255)
+
+    grey = load_image(encode(page((200, 100), "L"), "PNG"))
+    assert grey.image.mode == "L"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing image loading...")
+    test_large_jpeg_decodes_at_draft_scale()
+    test_min_side_limits_the_draft()
+    test_small_and_non_jpeg_images_decode_in_full()
+    test_exif_orientation_is_applied_after_draft()
+    test_alpha_is_flattened_onto_white()
+    print("✅ All image loading tests passed!")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test upload ingestion: magic-byte sniffing, size limits, spooling and the request size middleware
+"""
+import asyncio
+import tempfile
+
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from ingest import RequestSizeLimitMiddleware, ingest_upload, sniff_image_kind
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+
+def make_upload(filename: str, data: bytes, spool_size: int = 1024) -> UploadFile:
+    """An upload spooled the way the multipart parser does, rolling to disk past ``spool_size``"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename=filename)
+
+
+def ingest(filename: str, data: bytes, max_size: int = 1024 * 1024):
+    return asyncio.run(ingest_upload(make_upload(filename, data), max_size))
+
+
+def expect_status(filename: str, data: bytes, status: int, **kwargs):
+    try:
+        ingest(filename, data, **kwargs)
+    except HTTPException as e:
+        assert e.status_code == status, e.detail
+        return
+    raise AssertionError(f"expected HTTP {status}")
+
+
+def test_sniff_image_kind():
+    assert sniff_image_kind(b"\xff\xd8\xff\xe0rest") == "jpeg"
+    assert sniff_image_kind(PNG_HEAD + b"rest") == "png"
+    assert sniff_image_kind(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert sniff_image_kind(b"%PDF-1.7") == "pdf"
+    assert sniff_image_kind(b"<html>") is None
+
+
+def test_small_upload_stays_in_memory():
+    upload = ingest("notes.png", PNG_HEAD + b"x" * 100)
+    assert upload.kind == "png"
+    assert not upload.spilled
+    assert upload.read_bytes() == PNG_HEAD + b"x" * 100
+    upload.close()
+
+
+def test_large_upload_is_used_in_place():
+    data = PNG_HEAD + b"x" * 300_000
+    file = make_upload("notes.png", data)
+    upload = asyncio.run(ingest_upload(file, 1024 * 1024))
+    # No second copy: the upload reads straight from the parser's spooled file
+    assert upload.spilled and upload._spooled is file.file
+    assert upload.size == len(data)
+    assert upload.read_bytes() == data
+    upload.close()
+
+
+def test_rejections():
+    expect_status("notes.png", PNG_HEAD + b"x" * 5000, 413, max_size=4096)
+    expect_status("notes.jpg", PNG_HEAD + b"x", 400)
+    expect_status("notes.png", b"not an image at all", 400)
+    expect_status("notes.png", b"", 400)
+
+
+def size_limited_app(limit: int) -> TestClient:
+    app = FastAPI()
+    reached = []
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        reached.append(len(await request.body()))
+        return {"size": reached[-1]}
+
+    app.add_middleware(RequestSizeLimitMiddleware, default_limit=limit)
+    client = TestClient(app)
+    client.reached = reached
+    return client
+
+
+def test_middleware_rejects_oversized_content_length():
+    client = size_limited_app(limit=1000)
+    response = client.post("/upload", content=b"x" * 1001)
+    assert response.status_code == 413 and response.json() == {"detail": "File too large"}
+    assert client.reached == []
+    assert client.post("/upload", content=b"x" * 1000).json() == {"size": 1000}
+
+
+def test_middleware_rejects_oversized_chunked_body():
+    client = size_limited_app(limit=1000)
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 300
+
+    # A generator body is sent chunked, with no Content-Length to check up front
+    response = client.post("/upload", content=chunks())
+    assert response.status_code == 413 and response.json() == {"detail": "File too large"}
+    assert client.reached == []
+
+
+if __name__ == "__main__":
+    print("🧪 Testing upload ingestion...")
+    test_sniff_image_kind()
+    test_small_upload_stays_in_memory()
+    test_large_upload_is_used_in_place()
+    test_rejections()
+    test_middleware_rejects_oversized_content_length()
+    test_middleware_rejects_oversized_chunked_body()
+    print("✅ All ingestion tests passed!")
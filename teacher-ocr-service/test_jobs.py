@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test the background OCR job scheduler: TTL expiry, the pending limit and SSE streams
+"""
+import asyncio
+import json
+
+from jobs import JOB_COMPLETED, JOB_FAILED, JOB_RUNNING, Job, JobQueueFull, JobScheduler, stream_job_events
+
+
+def frames_to_events(frames):
+    return [json.loads(frame.split("data: ", 1)[1]) for frame in frames if frame.startswith("event:")]
+
+
+async def collect(job, heartbeat_seconds=15.0):
+    return [frame async for frame in stream_job_events(job, heartbeat_seconds)]
+
+
+def test_results_expire_after_ttl():
+    async def scenario():
+        scheduler = JobScheduler(ttl_seconds=0.1)
+
+        async def run(job):
+            job.report_stage("decode")
+            return {"text": "x = 2"}
+
+        job = scheduler.submit("page.png", run)
+        await asyncio.sleep(0.02)
+        assert scheduler.get(job.id).status == JOB_COMPLETED
+        assert job.to_dict()["result"] == {"text": "x = 2"}
+        await asyncio.sleep(0.15)
+        return scheduler, job
+
+    scheduler, job = asyncio.run(scenario())
+    assert scheduler.get(job.id) is None
+
+
+def test_pending_limit_rejects_new_jobs():
+    async def scenario():
+        scheduler = JobScheduler(concurrency=1, max_jobs=2)
+        release = asyncio.Event()
+
+        async def run(job):
+            await release.wait()
+            return {}
+
+        jobs = [scheduler.submit(f"page{i}.png", run) for i in range(2)]
+        try:
+            scheduler.submit("page3.png", run)
+        except JobQueueFull:
+            pass
+        else:
+            raise AssertionError("expected the third job to be rejected")
+        await asyncio.sleep(0.01)
+        # Only one runs at a time; the other waits its turn
+        assert [job.status for job in jobs] == [JOB_RUNNING, "queued"]
+
+        release.set()
+        await asyncio.sleep(0.02)
+        assert scheduler.active_jobs == 0
+        scheduler.submit("page3.png", run)
+        scheduler.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_late_subscriber_replays_events_and_stream_ends():
+    async def scenario():
+        scheduler = JobScheduler()
+
+        async def run(job):
+            for stage in ("decode", "detect", "recognize"):
+                job.report_stage(stage)
+            return {"text": "done"}
+
+        async def crash(job):
+            job.report_stage("decode")
+            raise RuntimeError("bad image")
+
+        finished = scheduler.submit("a.png", run)
+        failed = scheduler.submit("b.png", crash)
+        await asyncio.sleep(0.02)
+        # Both jobs are over before anyone subscribes; the streams still replay and terminate
+        return (await asyncio.wait_for(collect(finished), 1),
+                await asyncio.wait_for(collect(failed), 1), failed)
+
+    finished_frames, failed_frames, failed = asyncio.run(scenario())
+    events = frames_to_events(finished_frames)
+    assert [e["event"] for e in events] == ["queued", "started", "stage", "stage", "stage", JOB_COMPLETED]
+    assert [e["stage"] for e in events if e["event"] == "stage"] == ["decode", "detect", "recognize"]
+    assert [e["event"] for e in frames_to_events(failed_frames)][-1] == JOB_FAILED
+    assert failed.error == "bad image" and failed._subscribers == []
+
+
+def test_live_stream_sends_heartbeats_until_done():
+    async def scenario():
+        job = Job("page.png")
+        job.emit("queued")
+        stream = asyncio.ensure_future(collect(job, heartbeat_seconds=0.02))
+        await asyncio.sleep(0.05)
+        job.report_stage("detect")
+        job.status = JOB_COMPLETED
+        job.emit(JOB_COMPLETED)
+        return await asyncio.wait_for(stream, 1)
+
+    frames = asyncio.run(scenario())
+    assert ": keep-alive\n\n" in frames
+    assert [e["event"] for e in frames_to_events(frames)] == ["queued", "stage", JOB_COMPLETED]
+
+
+def test_full_queue_answers_429():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    scheduler = JobScheduler(max_jobs=1)
+    busy = Job("busy.png")
+    busy.status = JOB_RUNNING
+    scheduler._jobs[busy.id] = busy
+    original, main.job_scheduler = main.job_scheduler, scheduler
+    try:
+        response = TestClient(main.app).post("/jobs", files={"file": ("page.png", PNG, "image/png")})
+    finally:
+        main.job_scheduler = original
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
+
+
+# Smallest valid PNG: 1x1 white pixel
+PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010802000000907753de"
+    "0000000c4944415408d763f8ffff3f0005fe02fea7d6a3b60000000049454e44ae426082"
+)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing OCR job scheduler...")
+    test_results_expire_after_ttl()
+    test_pending_limit_rejects_new_jobs()
+    test_late_subscriber_replays_events_and_stream_ends()
+    test_live_stream_sends_heartbeats_until_done()
+    test_full_queue_answers_429()
+    print("✅ All job scheduler tests passed!")
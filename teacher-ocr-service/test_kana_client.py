@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Test the pooled K.A.N.A. client against a local stand-in K.A.N.A. server:
+keep-alive reuse, retries, deadlines and the circuit breaker
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from kana_client import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, CircuitOpen, KanaClient
+
+
+class StandInKana(ThreadingHTTPServer):
+    """Serves K.A.N.A.'s analysis routes with a scripted sequence of status codes and a fixed delay"""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.statuses = []
+        self.delay = 0.0
+        self.requests = 0
+        self.client_ports = set()
+        self.bodies = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        server.requests += 1
+        server.client_ports.add(self.client_address[1])
+        server.bodies.append((self.path, self.headers.get("Content-Type"),
+                              self.rfile.read(int(self.headers.get("Content-Length", 0)))))
+        time.sleep(server.delay)
+
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({"analysis": "stand-in analysis", "knowledge_gaps": [], "recommendations": []}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def with_server(scenario):
+    server = StandInKana()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        return asyncio.run(scenario(server))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_connections_are_reused():
+    async def scenario(server):
+        client = KanaClient(server.url, retries=0)
+        for _ in range(5):
+            response = await client.analyze({"message": "x"}, deadline=5)
+            assert response.status_code == 200
+        await client.aclose()
+        return server
+
+    server = with_server(scenario)
+    assert server.requests == 5
+    assert len(server.client_ports) == 1
+
+
+def test_retries_transient_errors():
+    async def scenario(server):
+        server.statuses = [503, 503]
+        client = KanaClient(server.url, retries=2, backoff=0.01)
+        response = await client.analyze({"message": "x"}, deadline=5)
+        await client.aclose()
+        return client, response
+
+    client, response = with_server(scenario)
+    assert response.status_code == 200
+    assert client.stats["retries"] == 2
+    assert client.breaker.state == BREAKER_CLOSED
+
+
+def test_observer_sees_every_attempt():
+    attempts = []
+
+    async def scenario(server):
+        server.statuses = [503]
+        client = KanaClient(server.url, retries=1, backoff=0.01,
+                            observer=lambda path, status, seconds: attempts.append((path, status, seconds)))
+        await client.analyze({"message": "x"}, deadline=5)
+        await client.aclose()
+
+    with_server(scenario)
+    assert [(path, status) for path, status, _ in attempts] == [("/api/kana/analyze", 503), ("/api/kana/analyze", 200)]
+    assert all(seconds >= 0 for _, _, seconds in attempts)
+
+
+def test_deadline_bounds_slow_backend():
+    async def scenario(server):
+        server.delay = 1.0
+        client = KanaClient(server.url, retries=3, backoff=0.01)
+        start = time.perf_counter()
+        try:
+            await client.analyze({"message": "x"}, deadline=0.3)
+        except httpx.TimeoutException:
+            pass
+        else:
+            raise AssertionError("expected a timeout")
+        await client.aclose()
+        return time.perf_counter() - start
+
+    elapsed = with_server(scenario)
+    assert elapsed < 0.9
+
+
+def test_image_upload_is_multipart():
+    async def scenario(server):
+        client = KanaClient(server.url, retries=0)
+        response = await client.analyze_image(b"\xff\xd8\xff-jpeg-bytes", "image/jpeg", "work.jpg",
+                                              fields={"conversationId": "c1", "message": "hi"}, deadline=5)
+        await client.aclose()
+        return server, response
+
+    server, response = with_server(scenario)
+    assert response.status_code == 200
+    path, content_type, body = server.bodies[0]
+    assert path == "/api/analyze-image"
+    assert content_type.startswith("multipart/form-data")
+    assert b"\xff\xd8\xff-jpeg-bytes" in body and b'name="imageFile"' in body and b"conversationId" in body
+
+
+def test_breaker_opens_and_fails_fast():
+    async def scenario(server):
+        server.statuses = [500] * 10
+        client = KanaClient(server.url, retries=0, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+        for _ in range(3):
+            response = await client.analyze({"message": "x"}, deadline=5)
+            assert response.status_code == 500
+        assert client.breaker.state == BREAKER_OPEN
+
+        requests_before = server.requests
+        try:
+            await client.analyze({"message": "x"}, deadline=5)
+        except CircuitOpen:
+            pass
+        else:
+            raise AssertionError("expected the breaker to reject the call")
+        assert server.requests == requests_before
+
+        # After the reset timeout one probe goes through and closes the breaker
+        server.statuses = []
+        await asyncio.sleep(0.25)
+        response = await client.analyze({"message": "x"}, deadline=5)
+        await client.aclose()
+        return client, response
+
+    client, response = with_server(scenario)
+    assert response.status_code == 200
+    assert client.breaker.state == BREAKER_CLOSED
+    assert client.breaker.times_opened == client.breaker.times_closed == 1
+    assert client.stats["circuit_rejections"] == 1
+
+
+def test_cancelled_or_crashed_probe_does_not_wedge_the_breaker():
+    async def scenario(server):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        client = KanaClient(server.url, retries=0, breaker=breaker)
+        breaker.record_failure()
+        await asyncio.sleep(0.15)
+
+        # The client disconnects while the probe is waiting on K.A.N.A.
+        server.delay = 0.5
+        probe = asyncio.ensure_future(client.analyze({"message": "x"}, deadline=5))
+        await asyncio.sleep(0.1)
+        assert breaker.state == BREAKER_HALF_OPEN and not breaker.allow()
+        probe.cancel()
+        try:
+            await probe
+        except asyncio.CancelledError:
+            pass
+        assert breaker.state == BREAKER_HALF_OPEN
+
+        # A probe failing with an unexpected error reopens the breaker instead of sticking
+        server.delay = 0.0
+        try:
+            await client.post("/api/kana/analyze", deadline=5, json={"bad": object()})
+        except TypeError:
+            pass
+        else:
+            raise AssertionError("expected the unserializable payload to fail")
+        assert breaker.state == BREAKER_OPEN
+
+        await asyncio.sleep(0.15)
+        response = await client.analyze({"message": "x"}, deadline=5)
+        await client.aclose()
+        return breaker, response
+
+    breaker, response = with_server(scenario)
+    assert response.status_code == 200
+    assert breaker.state == BREAKER_CLOSED
+
+
+if __name__ == "__main__":
+    print("🧪 Testing K.A.N.A. client against a stand-in server...")
+    test_connections_are_reused()
+    test_retries_transient_errors()
+    test_observer_sees_every_attempt()
+    test_deadline_bounds_slow_backend()
+    test_image_upload_is_multipart()
+    test_breaker_opens_and_fails_fast()
+    test_cancelled_or_crashed_probe_does_not_wedge_the_breaker()
+    print("✅ All K.A.N.A. client tests passed!")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the compact image transport used for /kana-direct
+"""
+import io
+
+from PIL import Image, ImageDraw
+
+from kana_transport import EXIF_ORIENTATION, prepare_image
+
+
+def photo_bytes(size=(3000, 2000), fmt="JPEG", orientation=None) -> bytes:
+    """A white page with a block of "writing" in the middle"""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(800, 1200, 60):
+        draw.rectangle([900, y, 2100, y + 25], fill="black")
+    buffer = io.BytesIO()
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        image.save(buffer, format=fmt, quality=95, exif=exif)
+    else:
+        image.save(buffer, format=fmt, quality=95)
+    return buffer.getvalue()
+
+
+def test_downscales_crops_and_reports_savings():
+    original = photo_bytes()
+    prepared = prepare_image(original, max_side=800, quality=80, crop_to_content=True)
+
+    assert prepared.content_type == "image/jpeg"
+    assert max(prepared.size) <= 800
+    assert prepared.bytes_saved > 0
+    left, top, right, bottom = prepared.crop_box
+    assert 800 < left < 900 and right > 2100 and 700 < top < 800 and bottom > 1160
+
+    report = prepared.report()
+    assert report["sent_bytes"] == len(prepared.data)
+    assert report["original_bytes"] == len(original)
+    assert report["original_size"] == [3000, 2000]
+
+    with Image.open(io.BytesIO(prepared.data)) as sent:
+        assert sent.size == prepared.size
+
+
+def test_exif_orientation_is_applied():
+    prepared = prepare_image(photo_bytes(orientation=6), max_side=0, crop_to_content=False)
+    assert prepared.size == (2000, 3000)
+
+
+def test_small_images_are_sent_unchanged():
+    buffer = io.BytesIO()
+    Image.new("L", (64, 32), 255).save(buffer, format="PNG")
+    original = buffer.getvalue()
+
+    prepared = prepare_image(original, max_side=1600, crop_to_content=True)
+    assert prepared.data == original
+    assert prepared.content_type == "image/png"
+    assert prepared.bytes_saved == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Testing K.A.N.A. image transport...")
+    test_downscales_crops_and_reports_savings()
+    test_exif_orientation_is_applied()
+    test_small_images_are_sent_unchanged()
+    print("✅ All K.A.N.A. transport tests passed!")
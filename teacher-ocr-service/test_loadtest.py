@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the load-test harness: the fake K.A.N.A. server, the report summary and
+both load modes against a small in-process service
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from loadtest import FakeKana, generate_page, parse_metrics, run_load, stage_means, summarize
+
+
+def test_fake_kana_latency_and_errors():
+    kana = FakeKana(latency=0.1, jitter=0.0, error_rate=0.5, seed=1).start()
+    try:
+        statuses = []
+        started = time.perf_counter()
+        for _ in range(6):
+            response = httpx.post(f"{kana.url}/api/kana/analyze", json={"message": "x"}, timeout=5)
+            statuses.append(response.status_code)
+        elapsed = time.perf_counter() - started
+        assert elapsed >= 0.6
+        assert set(statuses) <= {200, 503}
+        assert kana.stats["requests"] == 6
+        assert kana.stats["errors_injected"] == statuses.count(503) > 0
+        ok = httpx.post(f"{kana.url}/api/analyze-image", content=b"x", timeout=5)
+        if ok.status_code == 200:
+            assert {"analysis", "knowledge_gaps", "recommendations"} <= set(ok.json())
+        assert httpx.post(f"{kana.url}/elsewhere", content=b"x", timeout=5).status_code == 404
+    finally:
+        kana.shutdown()
+
+
+def test_summary_percentiles_and_errors():
+    results = [{"endpoint": "ocr", "status": 200, "ok": True, "latency": i / 1000} for i in range(1, 101)]
+    results[0] = {"endpoint": "ocr", "status": 503, "ok": False, "latency": 0.001}
+    summary = summarize(results, elapsed=10.0)
+    assert summary["requests"] == 100
+    assert summary["throughput_rps"] == 10.0
+    assert summary["error_rate"] == 0.01
+    assert 50 <= summary["latency_ms"]["p50"] <= 51
+    assert 95 <= summary["latency_ms"]["p95"] <= 96
+    assert 99 <= summary["latency_ms"]["p99"] <= 100
+    assert summary["statuses"] == {"200": 99, "503": 1}
+    assert summarize([], 1.0)["requests"] == 0
+
+
+def test_stage_means_from_metrics():
+    before = parse_metrics('ocr_stage_duration_seconds_count{stage="recognize"} 2\n'
+                           'ocr_stage_duration_seconds_sum{stage="recognize"} 1.0\n')
+    after = parse_metrics('# HELP x\n'
+                          'ocr_stage_duration_seconds_count{stage="recognize"} 6\n'
+                          'ocr_stage_duration_seconds_sum{stage="recognize"} 3.0\n'
+                          'kana_request_duration_seconds_count{path="/api/kana/analyze"} 1\n'
+                          'kana_request_duration_seconds_sum{path="/api/kana/analyze"} 0.25\n')
+    assert stage_means(before, after) == {
+        "kana /api/kana/analyze": {"count": 1, "mean_ms": 250.0},
+        "recognize": {"count": 4, "mean_ms": 500.0}
+    }
+
+
+def test_generated_pages_differ():
+    assert generate_page(1) != generate_page(2)
+    assert generate_page(3)[:2] == b"\xff\xd8"
+
+
+def serve_tiny_app():
+    app = FastAPI()
+    calls = {"count": 0}
+
+    @app.post("/ocr")
+    async def ocr(file: UploadFile):
+        await file.read()
+        calls["count"] += 1
+        await asyncio.sleep(0.02)
+        if calls["count"] % 10 == 0:
+            return JSONResponse({"detail": "busy"}, status_code=503)
+        return {"text": "ok"}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse("")
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def test_open_and_closed_loop_load():
+    server, url = serve_tiny_app()
+    images = [("a.jpg", generate_page(0), "image/jpeg")]
+    try:
+        results, elapsed, skipped = asyncio.run(run_load(url, ["ocr"], images, duration=1.0, rps=20))
+        assert 15 <= len(results) <= 21
+        assert skipped == 0
+        summary = summarize(results, elapsed)
+        assert 0 < summary["error_rate"] < 0.2
+
+        results, elapsed, _ = asyncio.run(run_load(url, ["ocr"], images, duration=0.5, concurrency=4))
+        # Four clients at ~20 ms per request finish far more than one would
+        assert len(results) > 0.5 / 0.02
+        assert all(r["endpoint"] == "ocr" for r in results)
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    print("🧪 Testing load-test harness...")
+    test_fake_kana_latency_and_errors()
+    test_summary_percentiles_and_errors()
+    test_stage_means_from_metrics()
+    test_generated_pages_differ()
+    test_open_and_closed_loop_load()
+    print("✅ All load-test harness tests passed!")
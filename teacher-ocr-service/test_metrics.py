@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the Prometheus metrics registry, text rendering and multi-process merging
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from metrics import MetricsRegistry, MultiProcessMetrics, mark_process_dead
+
+
+def sample_lines(text: str) -> dict:
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+            for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def build_registry():
+    registry = MetricsRegistry()
+    stages = registry.histogram("stage_seconds", "Stage time", ["stage"], buckets=(0.1, 1.0))
+    statuses = registry.counter("responses_total", "Responses", ["status"])
+    depth = {"value": 3}
+    registry.callback("queue_depth", "Queue depth", "gauge", lambda: [({"queue": "ocr"}, depth["value"])], ["queue"])
+    return registry, stages, statuses
+
+
+def test_render_text_format():
+    registry, stages, statuses = build_registry()
+    stages.labels(stage="detect").observe(0.05)
+    stages.labels(stage="detect").observe(0.5)
+    stages.labels(stage="detect").observe(5.0)
+    statuses.labels(status=200).inc()
+    statuses.labels(status="transport_error").inc(2)
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert "# HELP responses_total Responses" in text
+    assert "# TYPE queue_depth gauge" in text
+    samples = sample_lines(text)
+    assert samples['stage_seconds_bucket{le="0.1",stage="detect"}'] == 1
+    assert samples['stage_seconds_bucket{le="1.0",stage="detect"}'] == 2
+    assert samples['stage_seconds_bucket{le="+Inf",stage="detect"}'] == 3
+    assert samples['stage_seconds_count{stage="detect"}'] == 3
+    assert abs(samples['stage_seconds_sum{stage="detect"}'] - 5.55) < 1e-9
+    assert samples['responses_total{status="transport_error"}'] == 2
+    assert samples['queue_depth{queue="ocr"}'] == 3
+    assert not any(name.endswith("_created") for name in samples)
+
+
+def test_labels_are_checked_and_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("paths_total", "Paths with \\ and\nnewline", ["path"])
+    counter.labels(path='a"b\\c\nd').inc()
+    text = registry.render()
+    # Backslash, double quote and newline are escaped in label values, backslash and newline in help
+    assert 'paths_total{path="a\\"b\\\\c\\nd"} 1.0' in text
+    assert "# HELP paths_total Paths with \\\\ and\\nnewline" in text
+    try:
+        counter.labels(route="/ocr")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected unknown labels to be rejected")
+
+
+def test_callback_counters_never_go_backwards():
+    registry = MetricsRegistry()
+    source = {"hits": 2}
+    registry.callback("lookups_total", "Lookups", "counter", lambda: [({"result": "hit"}, source["hits"])],
+                      ["result"])
+    seen = []
+    # The source is replaced after 5 (its count restarts at 0), then counts up to 3
+    for hits in (2, 5, 1, 3):
+        source["hits"] = hits
+        seen.append(sample_lines(registry.render())['lookups_total{result="hit"}'])
+    assert seen == [2, 5, 5, 7]
+
+
+def multi_process_scenario():
+    """Run with PROMETHEUS_MULTIPROC_DIR set: a worker that has exited, then a live one renders"""
+    registry, stages, statuses = build_registry()
+    pid = os.fork()
+    if pid == 0:
+        statuses.labels(status=200).inc(4)
+        registry.refresh()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    mark_process_dead(pid)
+
+    stages.labels(stage="detect").observe(0.05)
+    statuses.labels(status=200).inc()
+    print(json.dumps(sample_lines(MultiProcessMetrics(registry, os.environ["PROMETHEUS_MULTIPROC_DIR"]).render())))
+
+
+def test_multi_process_merge_keeps_dead_counters_only():
+    with tempfile.TemporaryDirectory() as directory:
+        # prometheus_client picks its multiprocess storage on import, so this needs a fresh interpreter
+        output = subprocess.run(
+            [sys.executable, "-c", "import test_metrics; test_metrics.multi_process_scenario()"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory},
+            capture_output=True, text=True, check=True
+        ).stdout
+    samples = json.loads(output.strip().splitlines()[-1])
+    # The exited worker's counters still count, its gauges do not
+    assert samples['responses_total{status="200"}'] == 5
+    assert samples['queue_depth{queue="ocr"}'] == 3
+    assert samples['stage_seconds_count{stage="detect"}'] == 1
+
+
+def test_service_exports_breaker_and_pool_state():
+    from fastapi.testclient import TestClient
+
+    import main
+    from kana_client import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+
+    original, main.kana_client.breaker = main.kana_client.breaker, breaker
+    main.ocr_pool.restarts += 2
+    try:
+        samples = sample_lines(TestClient(main.app).get("/metrics").text)
+    finally:
+        main.kana_client.breaker = original
+        main.ocr_pool.restarts -= 2
+
+    assert samples['kana_circuit_breaker_state{state="open"}'] == 1
+    assert samples['kana_circuit_breaker_state{state="closed"}'] == 0
+    assert samples['kana_circuit_breaker_transitions_total{to="open"}'] == 2
+    assert samples['kana_circuit_breaker_transitions_total{to="closed"}'] == 1
+    assert samples["kana_circuit_breaker_consecutive_failures"] == 1
+    assert samples["ocr_pool_restarts_total"] == 2
+    assert samples["ocr_pool_workers"] == main.ocr_pool.workers
+    assert samples['ocr_queue_depth{queue="ocr_pool"}'] == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Testing metrics...")
+    test_render_text_format()
+    test_labels_are_checked_and_escaped()
+    test_callback_counters_never_go_backwards()
+    test_multi_process_merge_keeps_dead_counters_only()
+    test_service_exports_breaker_and_pool_state()
+    print("✅ All metrics tests passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed OCR result cache (memory LRU + disk tier)
+"""
+import tempfile
+from pathlib import Path
+
+from ocr_cache import OCRResultCache
+
+SETTINGS = {"preprocess": {"contrast": 1.2, "sharpness": 1.1}, "engine": {"lang": "en"}}
+ENTRY = {"text": "x = 2", "confidence": 0.93, "bounding_boxes": []}
+
+
+def test_settings_change_key():
+    """Same bytes with different settings must not share a cache entry"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRResultCache(Path(tmp))
+        key_a = cache.make_key(b"image", SETTINGS)
+        key_b = cache.make_key(b"image", {**SETTINGS, "engine": {"lang": "fr"}})
+        assert key_a != key_b
+        assert key_a == cache.make_key(b"image", dict(SETTINGS))
+
+
+def test_memory_and_disk_tiers():
+    """A miss, then a memory hit, then a disk hit after the memory tier is dropped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRResultCache(Path(tmp), memory_items=2)
+        key = cache.make_key(b"image", SETTINGS)
+
+        assert cache.get(key) is None
+        cache.put(key, ENTRY)
+        assert cache.get(key) == ENTRY
+
+        fresh = OCRResultCache(Path(tmp), memory_items=2)
+        assert fresh.get(key) == ENTRY
+        assert fresh.get(key) == ENTRY
+
+        assert cache.snapshot()["misses"] == 1
+        assert cache.snapshot()["memory_hits"] == 1
+        assert fresh.snapshot()["disk_hits"] == 1
+        assert fresh.snapshot()["memory_hits"] == 1
+
+
+def test_memory_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRResultCache(Path(tmp), memory_items=2, disk_bytes=0)
+        keys = [cache.make_key(bytes([i]), SETTINGS) for i in range(3)]
+        for key in keys:
+            cache.put(key, ENTRY)
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) == ENTRY
+
+
+def test_disk_budget_enforced():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = OCRResultCache(Path(tmp), memory_items=0, disk_bytes=2000)
+        for i in range(50):
+            cache.put(cache.make_key(bytes([i]), SETTINGS), {**ENTRY, "text": "x" * 100})
+        used = sum(p.stat().st_size for p in Path(tmp).glob("*/*.json"))
+        assert used <= 2000
+        assert cache.snapshot()["disk_evictions"] > 0
+
+
+if __name__ == "__main__":
+    print("🧪 Testing OCR result cache...")
+    test_settings_change_key()
+    test_memory_and_disk_tiers()
+    test_memory_lru_eviction()
+    test_disk_budget_enforced()
+    print("✅ All OCR cache tests passed!")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test the OCR worker pool: shared-memory hand-off, the bounded queue and recovery from a dead worker
+"""
+import asyncio
+import os
+import threading
+
+import numpy as np
+
+from ocr_pool import OCRQueueFull, OCRWorkerPool, _pack_arrays, _with_shared_arrays
+
+
+def _describe_task(arrays):
+    """Runs in a worker: report what arrived through shared memory"""
+    return [(a.shape, a.dtype.str, float(a.sum()), os.getpid()) for a in arrays]
+
+
+def _crash_task(arrays):
+    os._exit(1)
+
+
+def test_arrays_round_trip_through_shared_memory():
+    arrays = [np.arange(12, dtype=np.uint8).reshape(3, 4), np.full((2, 2, 3), 0.5, dtype=np.float32)]
+    shm, specs = _pack_arrays(arrays)
+    try:
+        copies = _with_shared_arrays(shm.name, specs, lambda views: [np.array(v) for v in views])
+    finally:
+        shm.close()
+        shm.unlink()
+    for original, copy in zip(arrays, copies):
+        assert copy.dtype == original.dtype and np.array_equal(copy, original)
+
+
+def test_worker_processes_read_shared_arrays():
+    async def scenario():
+        pool = OCRWorkerPool(workers=1, queue_size=1)
+        try:
+            image = np.ones((480, 640, 3), dtype=np.uint8)
+            return await pool._run(_describe_task, [image, np.zeros(5, dtype=np.float32)])
+        finally:
+            pool.shutdown()
+
+    (image, empty) = asyncio.run(scenario())
+    assert image[:3] == ((480, 640, 3), "|u1", 480 * 640 * 3)
+    assert empty[:3] == ((5,), "<f4", 0.0)
+    assert image[3] != os.getpid()
+
+
+def test_full_queue_rejects_submissions():
+    release = threading.Event()
+
+    def blocking_task(arrays):
+        release.wait(5)
+        return len(arrays)
+
+    async def scenario():
+        pool = OCRWorkerPool(workers=0, queue_size=1)
+        first = asyncio.ensure_future(pool._run(blocking_task, [np.zeros(1)]))
+        second = asyncio.ensure_future(pool._run(blocking_task, [np.zeros(1)]))
+        await asyncio.sleep(0.05)
+        assert pool.queue_depth == pool.capacity == 2
+        try:
+            await pool._run(blocking_task, [np.zeros(1)])
+        except OCRQueueFull:
+            rejected = True
+        else:
+            rejected = False
+        release.set()
+        results = await asyncio.gather(first, second)
+        pool.shutdown()
+        return rejected, results, pool.queue_depth
+
+    rejected, results, depth = asyncio.run(scenario())
+    assert rejected and results == [1, 1] and depth == 0
+
+
+def test_pool_restarts_after_a_worker_dies():
+    from concurrent.futures.process import BrokenProcessPool
+
+    async def scenario():
+        pool = OCRWorkerPool(workers=1, queue_size=1)
+        try:
+            try:
+                await pool._run(_crash_task, [np.zeros(1)])
+            except BrokenProcessPool:
+                pass
+            else:
+                raise AssertionError("expected the crashed worker to break the pool")
+            # The pool replaced its executor and serves the next job
+            return await pool._run(_describe_task, [np.ones(3)])
+        finally:
+            pool.shutdown()
+
+    result = asyncio.run(scenario())
+    assert result[0][2] == 3.0
+
+
+def test_concurrent_failures_restart_the_pool_once():
+    from concurrent.futures.process import BrokenProcessPool
+
+    async def scenario():
+        pool = OCRWorkerPool(workers=2, queue_size=2)
+        try:
+            crashes = await asyncio.gather(*(pool._run(_crash_task, [np.zeros(1)]) for _ in range(3)),
+                                           return_exceptions=True)
+            assert all(isinstance(e, BrokenProcessPool) for e in crashes)
+            # A caller still holding the old generation does not replace the new executor
+            executor = pool._executor
+            pool._restart(pool._generation - 1)
+            assert pool._executor is executor
+            return pool.restarts, await pool._run(_describe_task, [np.ones(3)]), pool.queue_depth
+        finally:
+            pool.shutdown()
+
+    restarts, result, depth = asyncio.run(scenario())
+    assert restarts == 1 and result[0][2] == 3.0 and depth == 0
+
+
+def test_cancelled_caller_keeps_its_slot_until_the_work_ends():
+    release = threading.Event()
+
+    def blocking_task(arrays):
+        release.wait(5)
+        return len(arrays)
+
+    async def scenario():
+        pool = OCRWorkerPool(workers=0, queue_size=0)
+        caller = asyncio.ensure_future(pool._run(blocking_task, [np.zeros(1)]))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        # The job is still running in the worker thread, so the pool is still full
+        depth_after_cancel = pool.queue_depth
+        release.set()
+        await asyncio.sleep(0.05)
+        pool.shutdown()
+        return depth_after_cancel, pool.queue_depth
+
+    assert asyncio.run(scenario()) == (1, 0)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing OCR worker pool...")
+    test_arrays_round_trip_through_shared_memory()
+    test_worker_processes_read_shared_arrays()
+    test_full_queue_rejects_submissions()
+    test_pool_restarts_after_a_worker_dies()
+    test_concurrent_failures_restart_the_pool_once()
+    test_cancelled_caller_keeps_its_slot_until_the_work_ends()
+    print("✅ All OCR worker pool tests passed!")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test PDF OCR: text-layer pages, rasterized pages, stamped scans, per-page errors and corrupt input
+"""
+import asyncio
+import io
+
+from PIL import Image
+
+from pdf_ocr import InvalidPDF, iter_pdf_pages, open_pdf, pymupdf
+
+
+def scanned_png(size=(400, 200)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_pdf(pages, stamp: str = None, logo: bool = False) -> bytes:
+    """One page per entry: a string becomes a text layer, None an image-only scan.
+
+    ``stamp`` is written as text over every scan, ``logo`` adds a small image to every text page.
+    """
+    doc = pymupdf.open()
+    for content in pages:
+        page = doc.new_page(width=300, height=200)
+        if content is None:
+            page.insert_image(page.rect, stream=scanned_png())
+            if stamp:
+                page.insert_text((20, 190), stamp)
+        else:
+            page.insert_text((20, 50), content)
+            if logo:
+                page.insert_image(pymupdf.Rect(240, 10, 290, 30), stream=scanned_png((50, 20)))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def collect(pdf_bytes: bytes, ocr_page, **options):
+    async def run():
+        document = await asyncio.to_thread(open_pdf, pdf_bytes)
+        return [record async for record in iter_pdf_pages(document, "test.pdf", ocr_page, **options)]
+    return asyncio.run(run())
+
+
+def test_text_layer_pages_skip_ocr():
+    seen = []
+
+    async def ocr_page(image, label):
+        seen.append((image.size, label))
+        return {"text": "scanned answer", "confidence": 0.9, "bounding_boxes": []}
+
+    records = collect(make_pdf(["Solve 2x + 3 = 7 for x please", None]), ocr_page, dpi=144)
+    pages = sorted((r for r in records if r["event"] == "page"), key=lambda r: r["page"])
+    assert [r["source"] for r in pages] == ["text_layer", "ocr"]
+    assert pages[0]["text"] == "Solve 2x + 3 = 7 for x please" and pages[0]["confidence"] == 1.0
+    # Text-layer boxes are in pixels at the requested DPI (2x the 72 dpi user space)
+    x0, y0 = pages[0]["bounding_boxes"][0]["bbox"][0]
+    assert 35 <= x0 <= 45 and y0 < 100
+    assert pages[1]["text"] == "scanned answer"
+    # Only the scanned page reached OCR, rasterized at 144 dpi
+    assert seen == [((600, 400), "test.pdf#page2")]
+
+    done = records[-1]
+    assert done["event"] == "done" and done["pages"] == 2
+    assert done["text_layer_pages"] == 1 and done["ocr_pages"] == 1
+
+
+def test_stamped_scans_are_still_ocred():
+    seen = []
+
+    async def ocr_page(image, label):
+        seen.append(label)
+        return {"text": "handwritten answer", "confidence": 0.9, "bounding_boxes": []}
+
+    # The stamp alone is well over min_text_chars, but the page is a full-page raster
+    records = collect(make_pdf([None], stamp="Scanned by CamScanner - Worksheet 4, Algebra"), ocr_page)
+    assert [r["source"] for r in records if r["event"] == "page"] == ["ocr"]
+    assert seen == ["test.pdf#page1"]
+
+    # A small logo does not turn a typed page into a scan
+    records = collect(make_pdf(["Solve 2x + 3 = 7 for x please"], logo=True), ocr_page)
+    assert [r["source"] for r in records if r["event"] == "page"] == ["text_layer"]
+    assert seen == ["test.pdf#page1"]
+
+
+def test_failed_page_does_not_end_the_stream():
+    async def ocr_page(image, label):
+        if label.endswith("#page1"):
+            raise RuntimeError("recognizer crashed")
+        return {"text": "fine", "confidence": 0.8, "bounding_boxes": []}
+
+    records = collect(make_pdf([None, None]), ocr_page, concurrency=1)
+    errors = [r for r in records if r["event"] == "page_error"]
+    assert errors == [{"event": "page_error", "page": 1, "pages": 2, "error": "recognizer crashed"}]
+    assert [r["page"] for r in records if r["event"] == "page"] == [2]
+    assert records[-1]["event"] == "done" and records[-1]["ocr_pages"] == 1
+
+
+def test_corrupt_pdf_is_rejected_before_streaming():
+    for data in (b"%PDF-1.4 not really a pdf", b"", make_pdf(["ok"])[:100]):
+        try:
+            open_pdf(data)
+        except InvalidPDF:
+            continue
+        raise AssertionError(f"expected {data[:20]!r} to be rejected")
+
+
+if __name__ == "__main__":
+    print("🧪 Testing PDF OCR...")
+    test_text_layer_pages_skip_ocr()
+    test_stamped_scans_are_still_ocred()
+    test_failed_page_does_not_end_the_stream()
+    test_corrupt_pdf_is_rejected_before_streaming()
+    print("✅ All PDF OCR tests passed!")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test the pre-fork launcher: shared preloaded memory, request-count and SIGHUP recycling
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+import requests
+
+from prefork import PreforkLauncher, read_process_memory
+
+# Stands in for the OCR weights: allocated and touched once in the parent
+SHARED_MB = 128
+
+
+def load_tiny_app():
+    from fastapi import FastAPI
+
+    weights = np.ones(SHARED_MB * 1024 * 1024 // 8)
+    app = FastAPI()
+
+    @app.get("/")
+    async def whoami():
+        return {"pid": os.getpid(), "weights": float(weights[-1]), **read_process_memory(os.getpid())}
+
+    return app
+
+
+def launch(port: int, max_requests: int):
+    PreforkLauncher(load_tiny_app, workers=2, host="127.0.0.1", port=port, max_requests=max_requests,
+                    graceful_timeout=5, report_interval=3600).run()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_serving(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            return requests.get(url, timeout=2).json()
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise AssertionError("launcher did not start serving")
+
+
+def start_launcher(port: int, max_requests: int = 0) -> subprocess.Popen:
+    code = f"import test_prefork; test_prefork.launch({port}, {max_requests})"
+    return subprocess.Popen([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def collect_pids(url: str, requests_count: int) -> set:
+    pids = set()
+    for _ in range(requests_count):
+        try:
+            pids.add(requests.get(url, timeout=5).json()["pid"])
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    return pids
+
+
+def stop_launcher(launcher: subprocess.Popen):
+    launcher.send_signal(signal.SIGTERM)
+    assert launcher.wait(timeout=20) == 0
+
+
+def test_read_process_memory():
+    memory = read_process_memory(os.getpid())
+    if memory["rss_mb"] is None:
+        return  # no /proc on this platform
+    assert memory["rss_mb"] > 0
+    assert memory["private_mb"] <= memory["rss_mb"]
+    assert read_process_memory(2 ** 22 + 1)["rss_mb"] is None
+
+
+def test_workers_share_preloaded_memory_and_recycle_on_sighup():
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    launcher = start_launcher(port)
+    try:
+        first = wait_until_serving(url)
+        assert first["pid"] != launcher.pid
+        if first["rss_mb"] is not None:
+            # The parent's pages count towards the worker's RSS but are not private to it
+            assert first["rss_mb"] > SHARED_MB
+            assert first["private_mb"] < SHARED_MB / 2
+
+        before = collect_pids(url, 40)
+        launcher.send_signal(signal.SIGHUP)
+        time.sleep(3)
+        after = collect_pids(url, 40)
+        assert after and not after & before
+    finally:
+        stop_launcher(launcher)
+
+
+def test_request_limit_recycles_workers():
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    launcher = start_launcher(port, max_requests=3)
+    try:
+        wait_until_serving(url)
+        assert len(collect_pids(url, 30)) > 2
+    finally:
+        stop_launcher(launcher)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the pre-fork launcher...")
+    test_read_process_memory()
+    test_workers_share_preloaded_memory_and_recycle_on_sighup()
+    test_request_limit_recycles_workers()
+    print("✅ All pre-fork launcher tests passed!")
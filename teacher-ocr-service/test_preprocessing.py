@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test the fused enhancement kernel, the resize and margin crop ahead of detection
+and the box mapping back to the page
+"""
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance
+
+from preprocessing import choose_scale, crop_to_content, offset_boxes, preprocess_array, resize_for_ocr, scale_boxes
+
+# The fused kernel may differ from the PIL chain by rounding only
+MAX_PIXEL_DIFF = 2
+MAX_MEAN_DIFF = 1.0
+
+
+def worksheet(size=(2000, 1500), ink=(600, 400, 1400, 900)) -> Image.Image:
+    """A white page with lines of "writing" inside ``ink``"""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = ink
+    for y in range(top, bottom, 50):
+        draw.rectangle([left, y, right, min(bottom, y + 20)], fill="black")
+    return image
+
+
+def test_crops_to_inked_region_with_padding():
+    cropped, box, skipped = crop_to_content(worksheet(), padding=0.02)
+    left, top, right, bottom = box
+    assert 540 <= left <= 600 and 350 <= top <= 400
+    assert 1400 <= right <= 1460 and 880 <= bottom <= 960
+    assert cropped.size == (right - left, bottom - top)
+    assert abs(skipped - (1 - cropped.size[0] * cropped.size[1] / (2000 * 1500))) < 1e-9
+    assert skipped > 0.7
+
+
+def test_full_and_blank_pages_are_not_cropped():
+    full = worksheet(ink=(10, 10, 1990, 1490))
+    image, box, skipped = crop_to_content(full, min_saving=0.05)
+    assert image is full and box is None and skipped == 0.0
+
+    blank = Image.new("RGB", (800, 600), "white")
+    image, box, skipped = crop_to_content(blank)
+    assert image is blank and box is None and skipped == 0.0
+
+
+def test_boxes_map_back_through_crop_and_resize():
+    # A box found at (10, 20) on a crop starting at (300, 200) of a page resized by 0.5
+    box = [[10.0, 20.0], [110.0, 20.0], [110.0, 40.0], [10.0, 40.0]]
+    shifted = offset_boxes([box], 300, 200)[0]
+    assert shifted[0] == [310.0, 220.0]
+    original = scale_boxes([shifted], 0.5)[0]
+    assert original[0] == [620.0, 440.0] and original[2] == [820.0, 480.0]
+    assert offset_boxes([box], 0, 0)[0] is box
+
+
+def test_scale_never_enlarges_and_caps_large_inputs():
+    # Small inputs are never upscaled, whatever the limits
+    assert choose_scale(800, 600, max_side=2048) == 1.0
+    assert choose_scale(800, 600, max_side=2048, target_text_height=40, text_height=10) == 1.0
+    # Phone photos shrink to the longest-side cap
+    assert choose_scale(4032, 3024, max_side=2016) == 0.5
+    # Large text shrinks further, but not below min_side
+    assert choose_scale(4000, 3000, max_side=2000, target_text_height=30, text_height=120) == 0.25
+    assert choose_scale(4000, 3000, max_side=2000, target_text_height=30, text_height=120, min_side=1600) == 0.4
+    # Savings under 5% are not worth a resize
+    assert choose_scale(2100, 1500, max_side=2048) == 1.0
+
+
+def test_resize_maps_boxes_back_to_original_pixels():
+    page = worksheet(size=(4000, 3000))
+    resized, scale = resize_for_ocr(page, 1000)
+    assert resized.size == (1000, 750) and scale == 0.25
+    unchanged, same = resize_for_ocr(worksheet(size=(800, 600)), 1000)
+    assert same == 1.0 and unchanged.size == (800, 600)
+
+    # A line detected at (150, 100)-(350, 105) on the resized page lies at 4x on the original
+    found = [[[150.0, 100.0], [350.0, 100.0], [350.0, 105.0], [150.0, 105.0]]]
+    assert scale_boxes(found, scale) == [[[600.0, 400.0], [1400.0, 400.0], [1400.0, 420.0], [600.0, 420.0]]]
+    assert scale_boxes(found, 1.0) is found
+
+
+def pil_reference(image: Image.Image, contrast: float, sharpness: float) -> np.ndarray:
+    """The ImageEnhance chain of main.preprocess_image that the fused kernel replaces"""
+    if image.mode in ("RGBA", "LA"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    image = ImageEnhance.Contrast(image).enhance(contrast)
+    return np.asarray(ImageEnhance.Sharpness(image).enhance(sharpness))
+
+
+def test_fused_kernel_matches_pil_chain():
+    rng = np.random.default_rng(7)
+    noisy = np.asarray(worksheet(size=(640, 480), ink=(100, 80, 540, 400)), dtype=np.int16)
+    noisy = Image.fromarray(np.clip(noisy + rng.integers(-40, 40, noisy.shape), 0, 255).astype(np.uint8))
+    speckled = Image.fromarray(rng.integers(0, 256, (120, 160, 4), dtype=np.uint8), "RGBA")
+    for image in (noisy, noisy.convert("L"), speckled):
+        for contrast, sharpness in ((1.2, 1.1), (1.5, 2.0), (0.8, 0.5), (1.0, 1.3), (1.4, 1.0)):
+            expected = pil_reference(image, contrast, sharpness).astype(np.int16)
+            actual = preprocess_array(image, contrast, sharpness).astype(np.int16)
+            diff = np.abs(actual - expected)
+            label = (image.mode, contrast, sharpness)
+            assert actual.shape == expected.shape, label
+            assert diff.max() <= MAX_PIXEL_DIFF, (label, int(diff.max()))
+            assert diff.mean() <= MAX_MEAN_DIFF, (label, float(diff.mean()))
+            # Sharpening leaves the one-pixel border alone, like PIL's SMOOTH filter
+            assert np.abs(actual[0] - expected[0]).max() <= MAX_PIXEL_DIFF, label
+
+
+if __name__ == "__main__":
+    print("🧪 Testing preprocessing...")
+    test_crops_to_inked_region_with_padding()
+    test_full_and_blank_pages_are_not_cropped()
+    test_boxes_map_back_through_crop_and_resize()
+    test_scale_never_enlarges_and_caps_large_inputs()
+    test_resize_maps_boxes_back_to_original_pixels()
+    test_fused_kernel_matches_pil_chain()
+    print("✅ All preprocessing tests passed!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test the cached readiness self-test and the /readyz and /livez probes
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from readiness import ReadinessProbe
+
+
+def probe_with(check, **options) -> ReadinessProbe:
+    return ReadinessProbe(check, interval=30.0, **options)
+
+
+async def passing_check():
+    return None
+
+
+def test_probe_records_outcomes():
+    async def failing_check():
+        raise RuntimeError("predictor crashed")
+
+    async def hanging_check():
+        await asyncio.sleep(1)
+
+    probe = probe_with(passing_check)
+    assert not probe.ok and probe.error == "self-test has not run yet"
+    asyncio.run(probe.run_once())
+    assert probe.ok and probe.error is None and probe.snapshot()["self_test_age"] is not None
+
+    probe.check = failing_check
+    asyncio.run(probe.run_once())
+    assert not probe.ok and probe.error == "predictor crashed"
+
+    slow = probe_with(hanging_check, timeout=0.05)
+    asyncio.run(slow.run_once())
+    assert not slow.ok and "timed out" in slow.error
+
+    # A saturated pool skips the self-test and keeps the previous outcome
+    calls = []
+
+    async def counting_check():
+        calls.append(1)
+
+    skipped = probe_with(counting_check, skip_check=lambda: True)
+    asyncio.run(skipped.run_once())
+    assert calls == [] and skipped.checked_at is None
+
+
+def with_service(probe: ReadinessProbe, paddle_available: bool, scenario):
+    """Call ``scenario(client)`` against main.app with the given probe, without starting the app"""
+    saved = main.readiness_probe, main.PADDLEOCR_AVAILABLE
+    main.readiness_probe, main.PADDLEOCR_AVAILABLE = probe, paddle_available
+    try:
+        return scenario(TestClient(main.app))
+    finally:
+        main.readiness_probe, main.PADDLEOCR_AVAILABLE = saved
+
+
+def test_readyz_waits_for_a_passing_self_test():
+    probe = probe_with(passing_check)
+
+    def scenario(client):
+        cold = client.get("/readyz")
+        asyncio.run(probe.run_once())
+        warm = client.get("/readyz")
+        main.ocr_pool._pending = main.ocr_pool.capacity
+        try:
+            saturated = client.get("/readyz")
+        finally:
+            main.ocr_pool._pending = 0
+        return cold, warm, saturated
+
+    cold, warm, saturated = with_service(probe, True, scenario)
+    assert cold.status_code == 503 and cold.json()["reasons"] == ["self-test has not run yet"]
+    assert warm.status_code == 200 and warm.json()["ready"] is True
+    assert saturated.status_code == 503 and "OCR queue saturated" in saturated.json()["reasons"]
+
+
+def test_livez_never_depends_on_the_models():
+    async def failing_check():
+        raise RuntimeError("models not loaded")
+
+    probe = probe_with(failing_check)
+    asyncio.run(probe.run_once())
+
+    def scenario(client):
+        return client.get("/livez"), client.get("/readyz")
+
+    for paddle_available in (False, True):
+        live, ready = with_service(probe, paddle_available, scenario)
+        assert live.status_code == 200 and live.json()["status"] == "alive"
+        assert ready.status_code == 503
+    assert not main.ocr_pool.running
+
+
+if __name__ == "__main__":
+    print("🧪 Testing readiness probes...")
+    test_probe_records_outcomes()
+    test_readyz_waits_for_a_passing_self_test()
+    test_livez_never_depends_on_the_models()
+    print("✅ All readiness tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test cross-request recognition micro-batching without a real recognizer
+"""
+import asyncio
+import gc
+
+import numpy as np
+
+from rec_batcher import RecognitionBatcher
+
+
+def make_crops(request_id: int, count: int):
+    """Crops whose first pixel identifies the request and line they came from"""
+    return [np.full((4, 8, 3), request_id * 10 + i, dtype=np.uint8) for i in range(count)]
+
+
+class FakeRecognizer:
+    def __init__(self):
+        self.batch_sizes = []
+
+    async def __call__(self, crops):
+        self.batch_sizes.append(len(crops))
+        await asyncio.sleep(0.01)
+        return [(f"line-{int(crop[0, 0, 0])}", 0.9) for crop in crops]
+
+
+def test_concurrent_requests_share_one_batch():
+    async def scenario():
+        recognizer = FakeRecognizer()
+        batcher = RecognitionBatcher(recognizer, max_batch=64, max_wait_ms=20)
+        results = await asyncio.gather(*[batcher.recognize(make_crops(r, 2)) for r in range(10)])
+        return recognizer, results
+
+    recognizer, results = asyncio.run(scenario())
+    assert recognizer.batch_sizes == [20]
+    # Every request gets back exactly its own lines, in order
+    for request_id, lines in enumerate(results):
+        assert [text for text, _ in lines] == [f"line-{request_id * 10}", f"line-{request_id * 10 + 1}"]
+
+
+def test_batch_cap_flushes_early():
+    async def scenario():
+        recognizer = FakeRecognizer()
+        batcher = RecognitionBatcher(recognizer, max_batch=4, max_wait_ms=10_000)
+        await asyncio.wait_for(
+            asyncio.gather(*[batcher.recognize(make_crops(r, 2)) for r in range(4)]),
+            timeout=2
+        )
+        return recognizer
+
+    recognizer = asyncio.run(scenario())
+    assert recognizer.batch_sizes == [4, 4]
+
+
+def test_errors_reach_every_waiting_request():
+    async def failing(crops):
+        raise RuntimeError("recognizer crashed")
+
+    async def scenario():
+        batcher = RecognitionBatcher(failing, max_batch=64, max_wait_ms=1)
+        return await asyncio.gather(
+            batcher.recognize(make_crops(1, 1)),
+            batcher.recognize(make_crops(2, 1)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_in_flight_batches_are_held_until_done():
+    async def scenario():
+        batcher = RecognitionBatcher(FakeRecognizer(), max_batch=4, max_wait_ms=1)
+        pending = asyncio.ensure_future(batcher.recognize(make_crops(1, 2)))
+        await asyncio.sleep(0.005)
+        gc.collect()
+        in_flight = len(batcher._tasks)
+        lines = await pending
+        return in_flight, lines, len(batcher._tasks)
+
+    in_flight, lines, after = asyncio.run(scenario())
+    assert in_flight == 1 and after == 0
+    assert [text for text, _ in lines] == ["line-10", "line-11"]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing recognition micro-batcher...")
+    test_concurrent_requests_share_one_batch()
+    test_batch_cap_flushes_early()
+    test_errors_reach_every_waiting_request()
+    test_in_flight_batches_are_held_until_done()
+    print("✅ All batcher tests passed!")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test parsing of client-supplied answer regions for recognition-only OCR
+"""
+import json
+
+import numpy as np
+from fastapi import HTTPException
+
+from regions import clip_quad, order_quad, parse_regions, region_quad
+
+
+def rejected(raw, max_regions=200) -> str:
+    try:
+        parse_regions(raw, max_regions)
+    except HTTPException as e:
+        assert e.status_code == 400
+        return e.detail
+    raise AssertionError(f"expected {raw!r} to be rejected")
+
+
+def test_rectangles_polygons_and_named_regions():
+    regions = parse_regions(json.dumps([
+        [100, 50, 400, 90],
+        [[500, 60], [800, 60], [800, 100], [500, 100]],
+        {"id": "q3", "bbox": [10, 200, 300, 240]},
+        {"id": "q4", "polygon": [[10, 300], [300, 300], [300, 340], [150, 350], [10, 340]]},
+    ]))
+    assert [region_id for region_id, _ in regions] == [0, 1, "q3", "q4"]
+    assert regions[0][1].tolist() == [[100, 50], [400, 50], [400, 90], [100, 90]]
+    assert regions[1][1].tolist() == [[500, 60], [800, 60], [800, 100], [500, 100]]
+    # Five points become their minimum-area rectangle
+    quad = regions[3][1]
+    assert quad.shape == (4, 2)
+    assert np.allclose(quad.min(axis=0), [10, 300]) and np.allclose(quad.max(axis=0), [300, 350])
+
+
+def test_rotated_quads_start_top_left_and_run_clockwise():
+    # A diamond (45 degrees) and a slightly tilted line, both given in scrambled order
+    diamond = order_quad(np.array([[100, 0], [0, 100], [100, 200], [200, 100]], dtype=np.float32))
+    assert diamond.tolist() == [[100, 0], [200, 100], [100, 200], [0, 100]]
+    tilted = region_quad([[400, 130], [10, 40], [12, 10], [402, 100]])
+    assert tilted.tolist() == [[12, 10], [402, 100], [400, 130], [10, 40]]
+
+
+def test_malformed_regions_are_rejected():
+    assert "JSON" in rejected("not json")
+    assert "non-empty" in rejected("[]")
+    assert "non-empty" in rejected('{"bbox": [0, 0, 1, 1]}')
+    assert "At most 2" in rejected("[[0,0,10,10],[0,0,10,10],[0,0,10,10]]", max_regions=2)
+    assert rejected("[[0,0,10,10],[50,10,20,40]]").startswith("Region 1:")
+    assert "Region q1" in rejected('[{"id": "q1"}]')
+    assert rejected('[[0, 0, "x", 10]]').startswith("Region 0:")
+    assert "finite" in rejected("[[0, 0, NaN, 10]]")
+    assert "area" in rejected("[[[0,0],[10,0],[20,0]]]")
+    assert "convex" in rejected("[[[0,0],[100,0],[10,10],[0,100]]]")
+    assert "Region 0" in rejected("[[1, 2]]")
+
+
+def test_clip_keeps_quads_on_the_page():
+    quad = region_quad([-20, 50, 1200, 90])
+    clipped = clip_quad(quad, 1000, 800)
+    assert clipped[:, 0].min() == 0 and clipped[:, 0].max() == 999
+    assert clipped[:, 1].tolist() == [50, 50, 90, 90]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing answer regions...")
+    test_rectangles_polygons_and_named_regions()
+    test_rotated_quads_start_top_left_and_run_clockwise()
+    test_malformed_regions_are_rejected()
+    test_clip_keeps_quads_on_the_page()
+    print("✅ All answer region tests passed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test OCR response format and compression negotiation
+"""
+import gzip
+import json
+
+import numpy as np
+from fastapi import HTTPException
+
+from response_formats import (encode_body, negotiate_encoding, negotiate_format, pack_boxes,
+                              render_ocr_response, unpack_boxes)
+
+PAYLOAD = {
+    "success": True,
+    "filename": "page.png",
+    "text": "2x + 3 = 7 x = 2",
+    "bounding_boxes": [
+        {"bbox": [[10.5, 20.25], [200.0, 20.25], [200.0, 45.0], [10.5, 45.0]], "text": "2x + 3 = 7", "confidence": 0.97},
+        {"bbox": [[12.0, 60.0], [90.75, 60.0], [90.75, 80.5], [12.0, 80.5]], "text": "x = 2 ✓", "confidence": 0.81},
+    ],
+    "processing_time": 0.5
+}
+
+
+def test_format_negotiation():
+    assert negotiate_format(None) == "json"
+    assert negotiate_format("text/html, application/x-ocr-boxes;q=0.9") == "binary"
+    assert negotiate_format("application/x-ocr-columnar+json") == "columnar"
+    assert negotiate_format("application/x-ocr-boxes", "json") == "json"
+    try:
+        negotiate_format(None, "xml")
+    except HTTPException as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError("expected an unknown format to be rejected")
+
+
+def test_encoding_negotiation():
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("deflate, gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip", "none") is None
+    assert negotiate_encoding(None, "gzip") == "gzip"
+
+
+def test_columnar_layout():
+    body = json.loads(encode_body(PAYLOAD, "columnar"))
+    columns = body["bounding_boxes"]
+    assert body["layout"] == "columnar"
+    assert columns["bbox"][0] == [10.5, 20.25, 200.0, 20.25, 200.0, 45.0, 10.5, 45.0]
+    assert columns["text"] == ["2x + 3 = 7", "x = 2 ✓"]
+    assert columns["confidence"] == [0.97, 0.81]
+    assert body["text"] == PAYLOAD["text"]
+
+
+def test_binary_round_trip():
+    decoded = unpack_boxes(pack_boxes(PAYLOAD))
+    assert decoded["filename"] == "page.png"
+    assert [box["text"] for box in decoded["bounding_boxes"]] == ["2x + 3 = 7", "x = 2 ✓"]
+    for original, box in zip(PAYLOAD["bounding_boxes"], decoded["bounding_boxes"]):
+        assert np.allclose(box["bbox"], original["bbox"])
+        assert abs(box["confidence"] - original["confidence"]) < 1e-6
+
+    empty = unpack_boxes(pack_boxes({**PAYLOAD, "bounding_boxes": []}))
+    assert empty["bounding_boxes"] == []
+
+
+def test_region_ids_survive_every_format():
+    boxes = [{**box, "region": region} for box, region in zip(PAYLOAD["bounding_boxes"], ["q1", 2])]
+    payload = {**PAYLOAD, "mode": "regions", "bounding_boxes": boxes}
+    columns = json.loads(encode_body(payload, "columnar"))["bounding_boxes"]
+    assert columns["region"] == ["q1", 2]
+    decoded = unpack_boxes(pack_boxes(payload))
+    assert [box["region"] for box in decoded["bounding_boxes"]] == ["q1", 2]
+    assert "regions" not in decoded
+
+    # Detected boxes carry no region column
+    assert "region" not in json.loads(encode_body(PAYLOAD, "columnar"))["bounding_boxes"]
+    assert "region" not in unpack_boxes(pack_boxes(PAYLOAD))["bounding_boxes"][0]
+
+
+def test_compression_only_above_threshold():
+    small = render_ocr_response(PAYLOAD, "json", "gzip")
+    assert "content-encoding" not in small.headers
+    assert json.loads(small.body) == PAYLOAD
+
+    large_payload = {**PAYLOAD, "bounding_boxes": PAYLOAD["bounding_boxes"] * 50}
+    large = render_ocr_response(large_payload, "binary", "gzip")
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.media_type == "application/x-ocr-boxes"
+    assert len(unpack_boxes(gzip.decompress(large.body))["bounding_boxes"]) == 100
+
+
+if __name__ == "__main__":
+    print("🧪 Testing response formats...")
+    test_format_negotiation()
+    test_encoding_negotiation()
+    test_columnar_layout()
+    test_binary_round_trip()
+    test_region_ids_survive_every_format()
+    test_compression_only_above_threshold()
+    print("✅ All response format tests passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test tile planning, duplicate suppression in the overlaps and reading order
+"""
+from tiling import merge_tile_boxes, plan_tiles, reading_order, tile_starts
+
+
+def rect(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def test_tiles_cover_the_page_with_overlap():
+    assert tile_starts(1000, 1536, 192) == [0]
+    starts = tile_starts(5000, 1536, 192)
+    assert starts[0] == 0 and starts[-1] == 5000 - 1536
+    assert all(b - a <= 1536 - 192 for a, b in zip(starts, starts[1:]))
+
+    tiles = plan_tiles(5000, 3000, 1536, 192)
+    assert len(tiles) == 4 * 3
+    assert max(t[2] for t in tiles) == 5000 and max(t[3] for t in tiles) == 3000
+    assert all(t[2] - t[0] <= 1536 and t[3] - t[1] <= 1536 for t in tiles)
+
+
+def test_cut_copies_in_the_overlap_are_dropped():
+    # Two tiles side by side sharing x 900..1000
+    tiles = [(0, 0, 1000, 500), (900, 0, 1900, 500)]
+    left_tile = [
+        rect(100, 50, 400, 80),      # only in the left tile
+        rect(850, 150, 1000, 180),   # a line cut by the left tile's right edge
+        rect(920, 250, 980, 280),    # a word inside the overlap, seen by both tiles
+    ]
+    right_tile = [
+        rect(-50, 150, 200, 180),    # the same line whole: page x 850..1100
+        rect(20, 250, 80, 280),      # the overlap word again
+        rect(500, 50, 700, 80),      # only in the right tile
+    ]
+    boxes, removed = merge_tile_boxes([left_tile, right_tile], tiles)
+    assert removed == 2
+    assert len(boxes) == 4
+    lefts = sorted(min(x for x, _ in box) for box in boxes)
+    assert lefts == [100, 850, 920, 1400]
+    # The whole line survived, not the cut piece
+    assert rect(850, 150, 1100, 180) in boxes
+
+
+def test_boxes_within_one_tile_are_never_merged():
+    tiles = [(0, 0, 1000, 500), (900, 0, 1900, 500)]
+    overlapping = [rect(920, 100, 990, 130), rect(930, 105, 985, 125)]
+    boxes, removed = merge_tile_boxes([overlapping, []], tiles)
+    assert removed == 0 and len(boxes) == 2
+
+
+def test_reading_order_rows_then_columns():
+    boxes = [
+        rect(600, 105, 900, 135),   # row 2, right
+        rect(50, 12, 300, 40),      # row 1, left (a little higher than its neighbour)
+        rect(50, 100, 300, 130),    # row 2, left
+        rect(400, 8, 700, 36),      # row 1, right
+    ]
+    assert reading_order(boxes) == [1, 3, 2, 0]
+    assert reading_order([]) == []
+
+
+if __name__ == "__main__":
+    print("🧪 Testing tiled OCR merging...")
+    test_tiles_cover_the_page_with_overlap()
+    test_cut_copies_in_the_overlap_are_dropped()
+    test_boxes_within_one_tile_are_never_merged()
+    test_reading_order_rows_then_columns()
+    print("✅ All tiling tests passed!")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Overlapping tiles for OCR of very large scans.
+
+A3 posters, whiteboard photos and stitched pages are too large for a single
+detection pass: downscaling them to ``OCR_MAX_SIDE`` makes the text too
+small to read, and detecting at full size runs on one core for a long time.
+Instead the page is split into overlapping tiles that are detected in
+parallel across the OCR worker pool. The overlap is wide enough that a text
+line cut by one tile's edge lies whole inside its neighbour, so the cut
+copies can be dropped afterwards:
+
+* only boxes that reach into an overlap band can be duplicates, so the
+  pairwise comparison is limited to those;
+* overlap is measured as intersection over the smaller box rather than IoU,
+  because a cut-off piece lies almost entirely inside the whole line while
+  their IoU can be small;
+* whole boxes win over boxes that touch an inner tile edge, then larger
+  boxes over smaller ones.
+
+The surviving lines are put in reading order: rows top to bottom, each row
+left to right.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+Tile = Tuple[int, int, int, int]
+
+
+def tile_starts(length: int, tile: int, overlap: int) -> List[int]:
+    """Evenly spaced tile offsets along one axis, covering ``length`` with at least ``overlap`` shared"""
+    if length <= tile:
+        return [0]
+    count = int(np.ceil((length - overlap) / (tile - overlap)))
+    return np.linspace(0, length - tile, count).round().astype(int).tolist()
+
+
+def plan_tiles(width: int, height: int, tile: int = 1536, overlap: int = 192) -> List[Tile]:
+    """``(left, top, right, bottom)`` of every tile, row by row"""
+    overlap = min(overlap, tile // 2)
+    return [
+        (left, top, min(width, left + tile), min(height, top + tile))
+        for top in tile_starts(height, tile, overlap)
+        for left in tile_starts(width, tile, overlap)
+    ]
+
+
+def _rects(boxes: np.ndarray) -> np.ndarray:
+    """Axis-aligned ``(x0, y0, x1, y1)`` of (N, 4, 2) quadrilaterals"""
+    return np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1)
+
+
+def _overlap_bands(tiles: Sequence[Tile], axis: int) -> np.ndarray:
+    """Ranges along ``axis`` (0 for x, 1 for y) covered by more than one tile"""
+    starts = sorted({tile[axis] for tile in tiles})
+    ends = sorted({tile[axis + 2] for tile in tiles})
+    bands = [(start, end) for start, end in zip(starts[1:], ends[:-1]) if end > start]
+    return np.asarray(bands, dtype=np.float64).reshape(-1, 2)
+
+
+def merge_tile_boxes(tile_boxes: Sequence[Sequence[list]], tiles: Sequence[Tile],
+                     threshold: float = 0.6, edge: float = 2.0) -> Tuple[List[list], int]:
+    """Shift each tile's boxes into page coordinates and drop the copies found twice.
+
+    Returns the kept boxes and the number removed.
+    """
+    page_width = max(tile[2] for tile in tiles)
+    page_height = max(tile[3] for tile in tiles)
+    shifted, truncated, sources = [], [], []
+    for number, (boxes, (left, top, right, bottom)) in enumerate(zip(tile_boxes, tiles)):
+        if not boxes:
+            continue
+        quads = np.asarray(boxes, dtype=np.float64) + (left, top)
+        rects = _rects(quads)
+        # A box touching a tile edge inside the page may be cut off
+        cut = np.zeros(len(quads), dtype=bool)
+        if left > 0:
+            cut |= rects[:, 0] <= left + edge
+        if top > 0:
+            cut |= rects[:, 1] <= top + edge
+        if right < page_width:
+            cut |= rects[:, 2] >= right - edge
+        if bottom < page_height:
+            cut |= rects[:, 3] >= bottom - edge
+        shifted.append(quads)
+        truncated.append(cut)
+        sources.append(np.full(len(quads), number))
+    if not shifted:
+        return [], 0
+
+    quads = np.concatenate(shifted)
+    truncated = np.concatenate(truncated)
+    sources = np.concatenate(sources)
+    rects = _rects(quads)
+
+    # Only boxes reaching into a band shared by two tiles can have been seen twice
+    candidates = np.zeros(len(quads), dtype=bool)
+    for axis in (0, 1):
+        for start, end in _overlap_bands(tiles, axis):
+            candidates |= (rects[:, axis] < end) & (rects[:, axis + 2] > start)
+    index = np.flatnonzero(candidates)
+
+    keep = np.ones(len(quads), dtype=bool)
+    if len(index) > 1:
+        sub = rects[index]
+        areas = np.maximum(sub[:, 2] - sub[:, 0], 0) * np.maximum(sub[:, 3] - sub[:, 1], 0)
+        width = np.minimum(sub[:, None, 2], sub[None, :, 2]) - np.maximum(sub[:, None, 0], sub[None, :, 0])
+        height = np.minimum(sub[:, None, 3], sub[None, :, 3]) - np.maximum(sub[:, None, 1], sub[None, :, 1])
+        intersection = np.clip(width, 0, None) * np.clip(height, 0, None)
+        smaller = np.minimum(areas[:, None], areas[None, :])
+        overlap = np.divide(intersection, smaller, out=np.zeros_like(intersection), where=smaller > 0)
+
+        # Greedy suppression: whole boxes first, then larger ones; a tile never duplicates itself
+        overlap[sources[index][:, None] == sources[index][None, :]] = 0.0
+        order = np.lexsort((-areas, truncated[index]))
+        suppressed = np.zeros(len(index), dtype=bool)
+        for i in order:
+            if suppressed[i]:
+                continue
+            suppressed |= overlap[i] >= threshold
+        keep[index[suppressed]] = False
+
+    return quads[keep].round(2).tolist(), int((~keep).sum())
+
+
+def reading_order(boxes: Sequence[list]) -> List[int]:
+    """Indices of ``boxes`` in reading order: rows top to bottom, each left to right.
+
+    Boxes whose vertical centres are closer than half the median line height
+    to the previous box share its row.
+    """
+    if len(boxes) == 0:
+        return []
+    rects = _rects(np.asarray(boxes, dtype=np.float64))
+    centres = (rects[:, 1] + rects[:, 3]) / 2
+    line_height = max(1.0, float(np.median(rects[:, 3] - rects[:, 1])))
+
+    by_centre = np.argsort(centres, kind="stable")
+    new_row = np.diff(centres[by_centre]) > line_height / 2
+    rows = np.concatenate([[0], np.cumsum(new_row)])
+    order = np.lexsort((rects[by_centre, 0], rows))
+    return by_centre[order].tolist()